@@ -0,0 +1,41 @@
+"""Add blog post revisions
+
+Revision ID: 0b7d3e5f9a21
+Revises: f2c6d8e14a37
+Create Date: 2026-10-19 21:14:05.529317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7d3e5f9a21'
+down_revision: Union[str, None] = 'f2c6d8e14a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('blog_post_revisions',
+    sa.Column('id', sa.Integer(), nullable=False, comment='Primary key revision id'),
+    sa.Column('blog_id', sa.Integer(), nullable=False, comment='Foreign key referencing the revised BlogPost'),
+    sa.Column('revision', sa.Integer(), nullable=False, comment='Revision number of the post, from 1'),
+    sa.Column('base_revision', sa.Integer(), nullable=False, comment='Snapshot revision the content is rebuilt from'),
+    sa.Column('version', sa.Integer(), nullable=False, comment='Version of the post with this content'),
+    sa.Column('title', sa.String(length=150), nullable=False, comment='Title of the post at this revision'),
+    sa.Column('kind', sa.String(length=10), nullable=False, comment='snapshot or delta'),
+    sa.Column('data', sa.LargeBinary(), nullable=False, comment='Compressed content or delta against the previous revision'),
+    sa.Column('size', sa.Integer(), nullable=False, comment='Length of the content in characters'),
+    sa.Column('checksum', sa.BigInteger(), nullable=False, comment='CRC-32 of the content'),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False, comment='Time the revision was stored'),
+    sa.ForeignKeyConstraint(['blog_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('blog_id', 'revision', name='uq_blog_post_revisions_blog_id_revision')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('blog_post_revisions')
@@ -0,0 +1,27 @@
+"""Add blog post version
+
+Revision ID: 3f1c2d9e8a10
+Revises: aa9c8b197490
+Create Date: 2026-10-19 09:12:41.520317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2d9e8a10'
+down_revision: Union[str, None] = 'aa9c8b197490'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False, comment='Row version, bumped on every update'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('blog_posts') as batch_op:
+        batch_op.drop_column('version')
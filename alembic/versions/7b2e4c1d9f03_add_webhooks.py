@@ -0,0 +1,32 @@
+"""Add webhooks
+
+Revision ID: 7b2e4c1d9f03
+Revises: 3f1c2d9e8a10
+Create Date: 2026-10-19 10:02:17.284913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4c1d9f03'
+down_revision: Union[str, None] = '3f1c2d9e8a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('webhook_url', sa.String(length=2048), nullable=True, comment='Default callback URL for generation webhooks'))
+    op.add_column('users', sa.Column('webhook_secret', sa.String(length=64), nullable=True, comment="HMAC secret signing the user's webhooks"))
+    op.add_column('blog_posts', sa.Column('callback_url', sa.String(length=2048), nullable=True, comment='Callback URL for the generation webhook of this post'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('blog_posts') as batch_op:
+        batch_op.drop_column('callback_url')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('webhook_secret')
+        batch_op.drop_column('webhook_url')
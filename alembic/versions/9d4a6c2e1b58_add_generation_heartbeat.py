@@ -0,0 +1,27 @@
+"""Add the generation heartbeat of blog posts
+
+Revision ID: 9d4a6c2e1b58
+Revises: 0b7d3e5f9a21
+Create Date: 2026-10-19 21:14:08.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6c2e1b58'
+down_revision: Union[str, None] = '0b7d3e5f9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('heartbeat_at', sa.DateTime(), nullable=True, comment='Last heartbeat of the process generating the post, UTC'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('blog_posts') as batch_op:
+        batch_op.drop_column('heartbeat_at')
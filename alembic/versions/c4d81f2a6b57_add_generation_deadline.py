@@ -0,0 +1,27 @@
+"""Add generation deadline
+
+Revision ID: c4d81f2a6b57
+Revises: 7b2e4c1d9f03
+Create Date: 2026-10-19 14:21:08.517302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81f2a6b57'
+down_revision: Union[str, None] = '7b2e4c1d9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('deadline_seconds', sa.Integer(), nullable=True, comment='Generation deadline of this post in seconds, overrides GENERATION_DEADLINE_SECONDS'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('blog_posts') as batch_op:
+        batch_op.drop_column('deadline_seconds')
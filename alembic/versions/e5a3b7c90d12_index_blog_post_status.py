@@ -0,0 +1,26 @@
+"""Index blog post status
+
+Revision ID: e5a3b7c90d12
+Revises: c4d81f2a6b57
+Create Date: 2026-10-19 16:08:42.730164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a3b7c90d12'
+down_revision: Union[str, None] = 'c4d81f2a6b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_blog_posts_status'), 'blog_posts', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_blog_posts_status'), table_name='blog_posts')
@@ -0,0 +1,31 @@
+"""Add rendered HTML, table of contents and reading time
+
+Revision ID: f2c6d8e14a37
+Revises: e5a3b7c90d12
+Create Date: 2026-10-19 18:02:44.310958
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8e14a37'
+down_revision: Union[str, None] = 'e5a3b7c90d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('content_html', sa.Text(), nullable=True, comment='Sanitized HTML rendering of the content'))
+    op.add_column('blog_posts', sa.Column('toc', sa.JSON(), nullable=True, comment='Table of contents of the content'))
+    op.add_column('blog_posts', sa.Column('reading_time_minutes', sa.Integer(), nullable=True, comment='Estimated reading time of the content in minutes'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('blog_posts') as batch_op:
+        batch_op.drop_column('reading_time_minutes')
+        batch_op.drop_column('toc')
+        batch_op.drop_column('content_html')
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.schemas import UserOut
+from app.core.cache import profile_reports
+from app.core.profiling import is_admin
+from app.api.v1.endpoints.blogs import get_current_user
+
+router = APIRouter()
+
+# Dependency to restrict an endpoint to administrators
+async def get_current_admin(current_user: UserOut = Depends(get_current_user)):
+    """
+    Dependency to get the current user, who must be listed in ADMIN_USERNAMES.
+
+    Args:
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        UserOut: Current authenticated administrator.
+
+    Raises:
+        HTTPException: If the user is not an administrator.
+    """
+    if not is_admin(current_user.username):
+        raise HTTPException( # Raise exception if the user is not an administrator
+            status_code=status.HTTP_403_FORBIDDEN, # Set the status code
+            detail="Administrator access required" # Provide detailed error message
+        )
+    return current_user
+
+@router.get(
+    "/profiles/{profile_id}", # GET route for a stored profiling report
+    summary="Retrieve a request profile", # Provide a summary description
+    description="Returns the profiling report of a request sent with an X-Profile header or profile=1 query flag, by the id returned in its X-Profile-Id header." # Provide detailed description
+)
+async def get_profile(profile_id: str, current_admin: UserOut = Depends(get_current_admin)):
+    """
+    Retrieves a profiling report.
+
+    Reports are kept in memory by the worker process that served the
+    profiled request, up to PROFILE_REPORTS_SIZE reports.
+
+    Args:
+        profile_id (str): Id from the X-Profile-Id response header.
+        current_admin (UserOut, optional): Current authenticated administrator.
+
+    Returns:
+        dict: The report: timings, dependency and span durations, SQL statements and sampled stacks.
+
+    Raises:
+        HTTPException: If the report does not exist (or was evicted).
+    """
+    report = profile_reports.get(profile_id) # Look up the report
+    if report is None: # Check if the report exists
+        raise HTTPException( # Raise exception if the report doesn't exist
+            status_code=status.HTTP_404_NOT_FOUND, # Set the status code
+            detail="Profile not found" # Provide detailed error message
+        )
+    return report # Return the report
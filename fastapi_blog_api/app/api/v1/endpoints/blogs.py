@@ -1,16 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Header
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Header, Response, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer
+from datetime import datetime
+from typing import List, Optional
+import hashlib
+import json
+import tempfile
+import time
+import zlib
 from jose import JWTError
 from fastapi.security import OAuth2PasswordBearer
-from app.models import BlogPost, User
-from app.schemas import BlogPostCreate, BlogPostOut, BlogPostUpdate
+from app.models import BlogPost, BlogPostRevision, User
+from app.schemas import UserOut, BlogPostCreate, BlogPostOut, BlogPostUpdate, BlogPostBulkDelete, BlogPostBulkUpdate, BlogPostBulkResult, BlogPostImportResult, BlogPostHtmlOut, BlogPostRevisionOut, BlogPostRevisionContent
 from app.database import SessionLocal
-from app.core import ai_agent, security
+from app.core import ai_agent, security, webhooks
+from app.core.cache import post_cache, principal_cache, invalidate_post
 from app.core.config import settings
+from app.core.generation import admit_generation, admit_generations, generation_registry, generate_and_update_blog, run_scheduled_generation
+from app.core.importer import CorruptUpload, import_posts, iter_ndjson_posts, iter_tar_posts
+from app.core.responses import FastJSONResponse, RangeNotSatisfiable, dump_json, parse_byte_range
+from app.core.compression import encode_cached_body, identity_etag
+from app.core.content import content_info, read_content
+from app.core.profiling import profiled
+from app.core.rendering import render_markdown
+from app.core.revisions import get_revision, record_revision
 
 router = APIRouter()
 
+BULK_MAX_IDS = 1000 # Upper bound on IDs per bulk request, keeps statements under database parameter limits
+IMPORT_READERS = { # Content type of an import upload -> record reader
+    "application/x-ndjson": iter_ndjson_posts,
+    "application/ndjson": iter_ndjson_posts,
+    "application/jsonl": iter_ndjson_posts,
+    "application/x-tar": iter_tar_posts,
+    "application/gzip": iter_tar_posts,
+    "application/x-gzip": iter_tar_posts,
+    "application/x-gtar": iter_tar_posts,
+}
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024 # Uploads larger than this are spooled to disk
+POST_COLUMNS = (BlogPost.id, BlogPost.title, BlogPost.content, BlogPost.status, BlogPost.owner_id, BlogPost.version) # Columns selected by list reads, no ORM objects needed
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"/api/v1/users/login")
 
 # Dependency to get DB session
@@ -27,21 +59,170 @@ def get_db():
     finally:
         db.close() # Close the session in the finally block
 
+def make_etag(blog_id: int, version: int) -> str:
+    """
+    Builds the strong ETag of a single blog post.
+
+    Args:
+        blog_id (int): Blog post id.
+        version (int): Row version of the blog post.
+
+    Returns:
+        str: Quoted ETag value.
+    """
+    return f'"{blog_id}-{version}"' # Id and version identify the representation
+
+def make_list_etag(versions) -> str:
+    """
+    Builds the strong ETag of a list of blog posts.
+
+    Args:
+        versions (Iterable[Tuple[int, int]]): (id, version) pairs of the listed posts, in response order.
+
+    Returns:
+        str: Quoted ETag value.
+    """
+    digest = hashlib.sha1() # Hash the ids and versions so that adds, edits and deletes all change the tag
+    for blog_id, version in versions:
+        digest.update(f"{blog_id}-{version};".encode())
+    return f'"list-{digest.hexdigest()}"'
+
+def serialize_post(blog: BlogPost) -> dict:
+    """
+    Converts a blog post row into a BlogPostOut payload.
+
+    The columns already have the types of BlogPostOut, so the payload is
+    returned in a FastJSONResponse without a second validation pass.
+
+    Args:
+        blog (Union[BlogPost, Row]): Blog post ORM object or row of POST_COLUMNS.
+
+    Returns:
+        dict: The fields of BlogPostOut.
+    """
+    return {"id": blog.id, "title": blog.title, "content": blog.content, "status": blog.status, "owner_id": blog.owner_id}
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an If-None-Match header against an ETag.
+
+    Uses the weak comparison required for If-None-Match (RFC 9110, 13.1.2).
+    ETags of compressed representations match the ETag of the identity
+    one: they only differ by their content coding.
+
+    Args:
+        if_none_match (Optional[str]): Raw If-None-Match header value.
+        etag (str): Current ETag of the resource.
+
+    Returns:
+        bool: True if the client copy is still current.
+    """
+    if not if_none_match: # No conditional header sent
+        return False
+    if if_none_match.strip() == "*": # Any current representation matches
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")] # Header may list several tags
+    return any(identity_etag(tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates) # Ignore weak prefix and coding suffix when comparing
+
+def check_bulk_size(ids):
+    """
+    Validates the number of IDs of a bulk request.
+
+    Args:
+        ids (List[int]): Requested blog post IDs.
+
+    Raises:
+        HTTPException: If more than BULK_MAX_IDS IDs are given.
+    """
+    if len(ids) > BULK_MAX_IDS:
+        raise HTTPException( # Raise exception if the request is too large
+            status_code=status.HTTP_400_BAD_REQUEST, # Set the status code
+            detail=f"At most {BULK_MAX_IDS} IDs per request" # Provide detailed error message
+        )
+
+def schedule_generation(background_tasks: BackgroundTasks, blog_id: int, title: str):
+    """
+    Schedules content generation for a pending blog post.
+
+    In "inline" generation mode the post is generated by a background task of
+    this process. In "worker" mode nothing is scheduled: the pending row is
+    the job, and the generation worker processes started by serve.py claim it.
+
+    Args:
+        background_tasks (BackgroundTasks): Background task manager of the request.
+        blog_id (int): Blog post id.
+        title (str): Blog post topic for AI agent.
+    """
+    if settings.GENERATION_MODE == "inline": # Generate in this process after the response is sent
+        generation_registry.add_scheduled(blog_id) # Counted by admission control until the task finishes, and kept alive by heartbeats
+        background_tasks.add_task(run_scheduled_generation, blog_id, title) # Add a background task for content generation
+
+def replace_content(db: Session, blog: BlogPost, content: str):
+    """
+    Replaces the content of a post, recording the edit in its revision history and rendering the new content.
+
+    Diffing against the previous revision and rendering are CPU work proportional
+    to the content size, so endpoints run this in the threadpool.
+
+    Args:
+        db (Session): SQLAlchemy database session, committed by the caller.
+        blog (BlogPost): Post being edited.
+        content (str): New content.
+    """
+    record_revision(db, blog, content) # Keep the content being replaced and the edit in the history
+    blog.content = content
+    for name, value in render_markdown(content).items(): # Render the new content once, for GET /{blog_id}/html
+        setattr(blog, name, value)
+
+def render_stored_content(db: Session, blog_id: int, version: int) -> dict:
+    """
+    Renders the stored markdown of a post that was never rendered and stores the result.
+
+    Rendering is CPU work proportional to the content size and the result is
+    committed, so endpoints run this in the threadpool. The rendering is not
+    stored if the post changed since version was read.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog_id (int): Blog post id.
+        version (int): Version of the post the caller read.
+
+    Returns:
+        dict: content_html, toc and reading_time_minutes of the post.
+    """
+    content = db.query(BlogPost.content).filter(BlogPost.id == blog_id).scalar() # Load the markdown
+    rendered = render_markdown(content or "")
+    db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.version == version).update( # Skip if the post changed meanwhile
+        {**rendered, "version": BlogPost.version}, synchronize_session=False # Same representation, keep the version
+    )
+    db.commit() # Commit the rendering
+    return rendered
+
 # Dependency to get the current user from token
+@profiled("auth", resolves_dependencies=True) # Last dependency of every blog endpoint
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Dependency to get the current user from JWT access token.
 
+    Verified tokens are cached with their resolved principal until the token
+    expires or AUTH_CACHE_TTL_SECONDS pass, so repeated requests skip JWT
+    verification and the user lookup. Cached principals are invalidated when
+    the user is changed or deleted.
+
     Args:
         token (str): The JWT token from authorization header
         db (Session, optional): SQLAlchemy database session.
 
     Returns:
-        User: Current authenticated user.
+        UserOut: Current authenticated user.
 
     Raises:
         HTTPException: If the token is invalid or user is not found.
     """
+    principal = principal_cache.get(token) # Look up a previously verified token
+    if principal is not None:
+        return principal # Return the cached principal
+    since = principal_cache.snapshot() # Before the read, so a user updated or deleted meanwhile is not cached
     try:
         payload = security.decode_access_token(token) # Decodes the token using security utils
         if not payload:
@@ -61,7 +242,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
                 status_code=status.HTTP_401_UNAUTHORIZED, # Set the status code
                 detail="User not found" # Provide detailed error message
             )
-        return user # Return the user
+        principal = UserOut(id=user.id, username=user.username) # Detached snapshot, safe to share between requests
+        ttl = min(settings.AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time()) # Never outlive the token
+        if ttl > 0:
+            principal_cache.set(token, principal, ttl=ttl, since=since) # Cache the verified token, skipped if invalidated during the read
+        return principal # Return the user
     except JWTError: # Catch JWT Errors during decoding
         raise HTTPException( # Raise exception if token is invalid
             status_code=status.HTTP_401_UNAUTHORIZED, # Set the status code
@@ -73,76 +258,228 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     "", # POST route at root path for creating a blog post
     response_model=BlogPostOut, # Set the expected response model for the endpoint
     summary="Create a new blog post", # Provide a summary description
-    description="Creates a blog post entry with a title. A background task then generates the blog content using the AI-powered multi-agent system." # Provide a detailed description
+    description="Creates a blog post entry with a title. A background task then generates the blog content using the AI-powered multi-agent system. If a callback_url is given (or the user has a default webhook), a signed webhook is sent when the generation completes or fails. When too many generations are in progress, the post is either queued or rejected with 429, depending on the admission policy.", # Provide a detailed description
+    responses={429: {"description": "Too many generations in progress, retry after the Retry-After delay"}} # Document the admission control rejection
 )
 async def create_blog_post(
     blog: BlogPostCreate, # Request body data for creating blog post
     background_tasks: BackgroundTasks, # BackgroundTasks object for background task scheduling
     db: Session = Depends(get_db), # Injected DB session for the handler
-    current_user: User = Depends(get_current_user) # Injected current user for the handler
+    current_user: UserOut = Depends(get_current_user) # Injected current user for the handler
 ):
     """
     Creates a new blog post with pending status and initiates a background task to generate content.
 
+    A callback URL makes sure the user has a webhook signing secret, which
+    GET /api/v1/users/me/webhook returns.
+
+    Admission control bounds the generations in progress (see
+    admit_generation): over capacity the post is stored as "queued" and
+    generated once capacity frees up, or rejected, depending on ADMISSION_POLICY.
+
     Args:
         blog (BlogPostCreate): Blog post data from request.
         background_tasks (BackgroundTasks): Background task manager.
         db (Session, optional): SQLAlchemy database session.
-        current_user (User, optional): Current authenticated user.
+        current_user (UserOut, optional): Current authenticated user.
 
     Returns:
         BlogPostOut: Newly created blog post data.
+
+    Raises:
+        HTTPException: If the callback URL resolves to a non-public address, or too many generations are in progress and the post cannot be queued.
     """
-    # Create a new blog post entry with a pending status.
-    new_blog = BlogPost(title=blog.title, content="", status="pending", owner_id=current_user.id) # Create blog post with pending status
+    callback_url = str(blog.callback_url) if blog.callback_url else None # Optional per-post webhook
+    if callback_url:
+        try:
+            await run_in_threadpool(webhooks.check_webhook_url, callback_url) # Resolves the host, blocking
+        except webhooks.UnsafeWebhookURL as e:
+            raise HTTPException( # Raise exception rather than call the internal network later
+                status_code=status.HTTP_400_BAD_REQUEST, # Set the status code
+                detail=f"Callback URL rejected: {e}" # Provide detailed error message
+            )
+    decision = admit_generation(db) # "admitted", "queued" or "rejected"
+    if decision == "rejected":
+        raise HTTPException( # Raise exception to shed load before storing anything
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, # Set the status code
+            detail="Too many blog posts are being generated, retry later", # Provide detailed error message
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)} # Tell the client when to retry
+        )
+    # Create a new blog post entry with a pending or queued status.
+    if callback_url:
+        webhooks.ensure_webhook_secret(db, current_user.id) # Webhooks are signed with the owner's secret
+    new_blog = BlogPost( # Create blog post with pending or queued status
+        title=blog.title, content="", status="pending" if decision == "admitted" else "queued", owner_id=current_user.id, callback_url=callback_url, deadline_seconds=blog.deadline_seconds,
+        heartbeat_at=datetime.utcnow() # Not abandoned, the background task scheduled below sends heartbeats from now on
+    )
     db.add(new_blog) # Add new blog post to session
-    db.commit() # Commit changes
-    db.refresh(new_blog) # Refresh the object to get server generated values
+    db.flush() # Insert the row to get its id
+    payload = serialize_post(new_blog) # Every returned field is known once the id is assigned
+    db.commit() # Commit changes, releasing the connection instead of holding it until the response is sent
     
-    # Schedule background task for AI content generation using the new blog writer logic.
-    background_tasks.add_task(generate_and_update_blog, new_blog.id, blog.title) # Add a background task for content generation
+    # Schedule AI content generation using the new blog writer logic.
+    if decision == "admitted": # Queued posts are picked up when a generation finishes
+        schedule_generation(background_tasks, payload["id"], blog.title) # Hand the post to the generation pipeline
     
-    return new_blog # Return newly created blog post
+    return FastJSONResponse(payload) # Return newly created blog post
 
-from app.database import SessionLocal
-from app.models import BlogPost
-from app.core import ai_agent
+@router.post(
+    "/import", # POST route for importing existing posts
+    response_model=BlogPostImportResult, # Set the expected response model for the endpoint
+    summary="Import existing blog posts", # Provide a summary description
+    description="Imports an NDJSON file (title/content objects) or a tar archive of markdown files as completed blog posts, without AI generation." # Provide a detailed description
+)
+async def import_blog_posts(request: Request, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+    """
+    Imports existing posts of the authenticated user as completed blog posts.
+
+    The upload is spooled to a temporary file and then inserted in chunks of
+    IMPORT_CHUNK_SIZE rows, one multi-row INSERT and transaction per chunk.
+
+    Args:
+        request (Request): Incoming request, its body is the NDJSON file or tar archive.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        BlogPostImportResult: Counts, first errors and throughput of the import.
 
-def generate_and_update_blog(blog_id: int, topic: str):
+    Raises:
+        HTTPException: If the content type is not supported, or the upload is truncated or corrupt.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower() # Drop parameters such as charset
+    reader = IMPORT_READERS.get(content_type) # Pick the reader for the upload format
+    if reader is None:
+        raise HTTPException( # Raise exception if the format is unknown
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, # Set the status code
+            detail="Upload application/x-ndjson or a tar archive (application/x-tar, application/gzip)" # Provide detailed error message
+        )
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as upload: # Buffer the body without holding large uploads in memory
+        async for chunk in request.stream(): # Read the body as it arrives
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            return await run_in_threadpool( # Parse and insert off the event loop
+                import_posts, db, current_user.id, reader(upload), settings.IMPORT_CHUNK_SIZE
+            )
+        except CorruptUpload as e: # Chunks before the error are committed, tell the client how many
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, # Set the status code
+                detail=f"Upload is truncated or corrupt ({e}), {e.imported} posts were imported before the error" # Provide detailed error message
+            )
+
+@router.post(
+    "/bulk-delete", # POST route for deleting many blog posts at once
+    response_model=BlogPostBulkResult, # Set the expected response model for the endpoint
+    summary="Delete several blog posts", # Provide a summary description
+    description="Deletes the given blog posts of the authenticated user in one statement and returns the IDs that were deleted. Running generations for these posts are cancelled." # Provide a detailed description
+)
+async def bulk_delete_blog_posts(bulk: BlogPostBulkDelete, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
     """
-    Background task that calls the multi-agent AI blog writer to generate content and updates the blog post.
+    Deletes several blog posts of the authenticated user with a single DELETE statement.
 
     Args:
-         blog_id (int): Blog post id to update
-         topic (str): Blog post topic for AI agent
+        bulk (BlogPostBulkDelete): IDs of the posts to delete.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        BlogPostBulkResult: IDs of the deleted posts. IDs not owned by the user are ignored.
+
+    Raises:
+        HTTPException: If too many IDs are given.
     """
-    # Create a new session for the background task.
-    db = SessionLocal() # Create a new DB session
-    try: # Use a try-finally block for proper cleanup
-        blog = db.query(BlogPost).filter(BlogPost.id == blog_id).first() # Query the blog post with given id
-        if not blog: # Check if the blog post exists
-            return  # Blog post not found, exit
-        try: # Use try except block to catch AI agent errors
-            # Call the new blog writer logic; adjust the filename if needed.
-            content = ai_agent.write_blog_post(topic, output_file=f"blog_post_{blog_id}.md") # Get the content from AI agent
-            if isinstance(content, dict):  # Handle case when agent returns a dictionary
-                if "answer" in content: # Check for "answer" key
-                    blog.content = content["answer"] # If answer is present set blog content to it
-                else:
-                    blog.content = str(content) # if there is no answer set blog content to string representation of content
-            elif isinstance(content, str): # Handle case when agent returns a string
-                 blog.content = content # Set blog content to returned string
-            else: # Handle other types with string representation
-                blog.content = str(content) # Fallback to string if content type is unknown
-
-            blog.status = "completed"  # Update status to completed
-        except Exception as e: # Catch any errors during content generation
-            blog.content = f"Error generating content: {str(e)}"  # Set error message in blog content
-            blog.status = "failed" # Set status to failed
-
-        db.commit() # Commit changes to DB
-    finally: # Always close the DB session
-        db.close() # Close the DB session
+    check_bulk_size(bulk.ids) # Reject oversized requests
+    statement = (
+        delete(BlogPost)
+        .where(BlogPost.owner_id == current_user.id, BlogPost.id.in_(bulk.ids)) # Scope the statement to the owner
+        .returning(BlogPost.id) # Report which rows were actually deleted
+    )
+    deleted_ids = [row.id for row in db.execute(statement)] # Run the set-based delete
+    if deleted_ids:
+        db.execute(delete(BlogPostRevision).where(BlogPostRevision.blog_id.in_(deleted_ids))) # Drop their history
+    db.commit() # Commit the changes
+    generation_registry.cancel(deleted_ids) # Discard results of running generations
+    for blog_id in deleted_ids:
+        invalidate_post(current_user.id, blog_id) # Drop any cached copy of the post
+    return {"ids": sorted(deleted_ids)} # Return the deleted IDs
+
+@router.post(
+    "/bulk-update", # POST route for updating many blog posts at once
+    response_model=BlogPostBulkResult, # Set the expected response model for the endpoint
+    summary="Update several blog posts", # Provide a summary description
+    description="Sets the title and/or status of the given blog posts of the authenticated user in one statement and returns the IDs that were updated. Setting the status to pending schedules a new generation for each post, subject to admission control: over capacity a post is set to queued, or left unchanged and reported as rejected." # Provide a detailed description
+)
+async def bulk_update_blog_posts(
+    bulk: BlogPostBulkUpdate, # Request body with the IDs and new values
+    background_tasks: BackgroundTasks, # BackgroundTasks object for regenerating posts set back to pending
+    db: Session = Depends(get_db),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Updates several blog posts of the authenticated user with a single UPDATE statement.
+
+    Posts set back to "pending" go through admission control, like new posts
+    (see admit_generations): the first ones admitted are set to "pending" and
+    scheduled, the next ones are set to "queued" when ADMISSION_POLICY allows
+    it, and the rest are rejected and left unchanged. That takes one UPDATE
+    statement per outcome.
+
+    Args:
+        bulk (BlogPostBulkUpdate): IDs of the posts and the new title and/or status.
+        background_tasks (BackgroundTasks): Background task manager.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        BlogPostBulkResult: IDs of the updated posts, and of the posts rejected by admission control. IDs not owned by the user are ignored.
+
+    Raises:
+        HTTPException: If too many IDs are given or there is nothing to update.
+    """
+    check_bulk_size(bulk.ids) # Reject oversized requests
+    values = {}
+    if bulk.title is not None: # Update title if provided
+        values["title"] = bulk.title
+    if bulk.status is not None: # Update status if provided
+        values["status"] = bulk.status
+    if not values:
+        raise HTTPException( # Raise exception if there is nothing to update
+            status_code=status.HTTP_400_BAD_REQUEST, # Set the status code
+            detail="Nothing to update" # Provide detailed error message
+        )
+    groups = {bulk.status: bulk.ids} # New status -> IDs to set it on
+    rejected = []
+    if bulk.status == "pending": # Regenerations are admitted like new posts
+        owned = db.execute(
+            select(BlogPost.id).where(BlogPost.owner_id == current_user.id, BlogPost.id.in_(bulk.ids)).order_by(BlogPost.id)
+        ).scalars().all()
+        admitted, queued = admit_generations(db, len(owned))
+        groups = {"pending": owned[:admitted], "queued": owned[admitted:admitted + queued]}
+        rejected = owned[admitted + queued:]
+    updated = []
+    for new_status, ids in groups.items():
+        if not ids:
+            continue
+        group_values = {**values, "status": new_status} if new_status else values
+        if new_status == "pending": # Scheduled below, not abandoned
+            group_values["heartbeat_at"] = datetime.utcnow()
+        statement = (
+            update(BlogPost)
+            .where(BlogPost.owner_id == current_user.id, BlogPost.id.in_(ids)) # Scope the statement to the owner
+            .values(group_values)
+            .returning(BlogPost.id, BlogPost.title, BlogPost.status) # Report which rows were actually updated
+        )
+        updated += db.execute(statement).all() # Run the set-based update
+    db.commit() # Commit the changes
+    updated_ids = [row.id for row in updated]
+    if bulk.status is not None: # A manual status change supersedes running generations
+        generation_registry.cancel(updated_ids)
+    for row in updated:
+        invalidate_post(current_user.id, row.id) # Drop any cached copy of the post
+        if row.status == "pending": # Regenerate posts put back in the queue, queued posts wait for capacity
+            schedule_generation(background_tasks, row.id, row.title)
+    return {"ids": sorted(updated_ids), "rejected": rejected} # Return the updated and rejected IDs
 
 @router.get(
     "",  # Define GET route to retrieve all blog posts at root path
@@ -150,19 +487,154 @@ def generate_and_update_blog(blog_id: int, topic: str):
     summary="Retrieve all blog posts", # Provide a summary description
     description="Fetches all blog posts associated with the authenticated user." # Provide detailed description
 )
-async def get_blog_posts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_blog_posts(
+    if_none_match: Optional[str] = Header(default=None), # ETag the client already holds
+    db: Session = Depends(get_db),
+    current_user: UserOut = Depends(get_current_user)
+):
     """
     Retrieves all blog posts for the authenticated user.
 
+    Returns 304 Not Modified without loading any post content when the
+    client's ETag still matches the ids and versions of the user's posts.
+    Posts are read as plain column rows and encoded straight to JSON,
+    skipping ORM object construction and response model validation.
+
     Args:
+        if_none_match (Optional[str]): If-None-Match request header.
         db (Session, optional): SQLAlchemy database session.
-        current_user (User, optional): Current authenticated user.
+        current_user (UserOut, optional): Current authenticated user.
 
     Returns:
         List[BlogPostOut]: List of user's blog posts.
     """
-    blogs = db.query(BlogPost).filter(BlogPost.owner_id == current_user.id).all() # Query blog posts for current user
-    return blogs # Return the blog posts
+    if if_none_match: # Only pay for the version query when the client can use it
+        versions = db.query(BlogPost.id, BlogPost.version).filter(BlogPost.owner_id == current_user.id).order_by(BlogPost.id).all() # Query ids and versions only
+        etag = make_list_etag(versions) # Build the ETag of the current list
+        if etag_matches(if_none_match, etag): # Client copy is still current
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}) # Return empty 304
+    rows = db.query(*POST_COLUMNS).filter(BlogPost.owner_id == current_user.id).order_by(BlogPost.id).all() # Query blog post columns for current user
+    etag = make_list_etag((row.id, row.version) for row in rows) # Build the ETag of the returned list
+    return FastJSONResponse([serialize_post(row) for row in rows], headers={"ETag": etag}) # Return the blog posts
+
+def iter_export_lines(owner_id: int, compress: bool = False):
+    """
+    Yields the posts of a user as NDJSON, one batch of rows at a time.
+
+    Rows are read through a streaming (server-side) cursor in batches of
+    EXPORT_BATCH_SIZE, so memory use does not grow with the number of posts.
+    The generator owns its session because it runs after the request
+    dependencies have been torn down.
+
+    Args:
+        owner_id (int): ID of the user whose posts are exported.
+        compress (bool): Whether to gzip the stream.
+
+    Yields:
+        bytes: Chunks of NDJSON, gzipped if requested.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None # gzip container
+    db = SessionLocal() # Create a new DB session for the stream
+    try:
+        statement = (
+            select(BlogPost.id, BlogPost.title, BlogPost.content, BlogPost.status, BlogPost.owner_id) # Plain rows, no ORM identity map
+            .where(BlogPost.owner_id == owner_id)
+            .order_by(BlogPost.id)
+            .execution_options(stream_results=True, yield_per=settings.EXPORT_BATCH_SIZE) # Server-side cursor
+        )
+        for batch in db.execute(statement).partitions(): # One batch of rows per iteration
+            chunk = "".join(json.dumps(row._asdict()) + "\n" for row in batch).encode() # Serialize the batch
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush() # Write the gzip trailer
+    finally:
+        db.close() # Close the DB session
+
+def iter_content_chunks(blog_id: int, version: int, first: int, last: int):
+    """
+    Yields bytes first to last (inclusive) of the content of a post, one database read per chunk.
+
+    Each chunk is CONTENT_CHUNK_SIZE bytes read with read_content, so
+    neither the database driver nor the response holds the whole post. The
+    session commits after every chunk, so a slow client does not keep a
+    pooled connection. Reads are pinned to the version the response headers
+    were built from: if the post changes or is deleted mid-stream the body
+    stops short, and the client sees fewer bytes than Content-Length.
+
+    Args:
+        blog_id (int): Blog post id.
+        version (int): Row version the response describes.
+        first (int): First byte position.
+        last (int): Last byte position, inclusive.
+
+    Yields:
+        bytes: Chunks of the UTF-8 content.
+    """
+    db = SessionLocal() # Create a new DB session for the stream
+    try:
+        offset = first
+        while offset <= last:
+            size = min(settings.CONTENT_CHUNK_SIZE, last - offset + 1)
+            chunk = read_content(db, blog_id, version, offset, size)
+            db.commit() # Release the connection between chunks
+            if not chunk: # Changed or deleted since the headers were sent
+                return
+            yield chunk
+            offset += size
+    finally:
+        db.close() # Close the DB session
+
+@router.get(
+    "/export", # GET route for exporting all posts, declared before /{blog_id}
+    response_class=StreamingResponse, # Body is streamed, not validated against a model
+    summary="Export all blog posts", # Provide a summary description
+    description="Streams every blog post of the authenticated user as newline-delimited JSON, optionally gzipped." # Provide detailed description
+)
+async def export_blog_posts(
+    gzip: bool = Query(default=False, description="Return a gzipped .ndjson.gz download"), # Compression flag
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Streams all blog posts of the authenticated user as NDJSON.
+
+    Args:
+        gzip (bool): Whether to gzip the export.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        StreamingResponse: One JSON object per line with the BlogPostOut fields.
+    """
+    if gzip:
+        return StreamingResponse(
+            iter_export_lines(current_user.id, compress=True), # Stream compressed batches
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="blog_posts.ndjson.gz"'},
+        )
+    return StreamingResponse(
+        iter_export_lines(current_user.id), # Stream plain batches
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="blog_posts.ndjson"'},
+    )
+
+@router.get(
+    "/cache/stats", # GET route for the read cache statistics, declared before /{blog_id}
+    summary="Read cache statistics", # Provide a summary description
+    description="Returns the hit ratio and size of this worker's single-post read cache." # Provide detailed description
+)
+async def get_cache_stats(current_user: UserOut = Depends(get_current_user)):
+    """
+    Returns the statistics of the single-post read cache of this worker.
+
+    Args:
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        dict: hits, misses, hit_ratio, size and maxsize.
+    """
+    return post_cache.stats() # Return the cache counters
 
 @router.get(
     "/{blog_id}", # GET route for retrieving a blog post by id
@@ -170,14 +642,29 @@ async def get_blog_posts(db: Session = Depends(get_db), current_user: User = Dep
     summary="Retrieve a single blog post", # Provide a summary description
     description="Fetches a specific blog post by its ID for the authenticated user."  # Provide detailed description
 )
-async def get_blog_post(blog_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_blog_post(
+    blog_id: int,
+    if_none_match: Optional[str] = Header(default=None), # ETag the client already holds
+    accept_encoding: Optional[str] = Header(default=None), # Content codings the client accepts
+    db: Session = Depends(get_db),
+    current_user: UserOut = Depends(get_current_user)
+):
     """
     Retrieves a specific blog post by ID for the authenticated user.
 
+    Completed posts are served from a per-worker LRU cache of encoded JSON
+    bodies, invalidated on update, delete and generation completion. Each
+    entry also keeps its brotli/gzip variants, so a cached post is compressed
+    once per coding instead of on every read. When
+    an If-None-Match header is sent, the content column is deferred so a
+    304 Not Modified answer never loads the post body.
+
     Args:
-         blog_id (int): Blog post id to retrieve
+        blog_id (int): Blog post id to retrieve
+        if_none_match (Optional[str]): If-None-Match request header.
+        accept_encoding (Optional[str]): Accept-Encoding request header.
         db (Session, optional): SQLAlchemy database session.
-        current_user (User, optional): Current authenticated user.
+        current_user (UserOut, optional): Current authenticated user.
 
     Returns:
         BlogPostOut: The requested blog post.
@@ -185,13 +672,254 @@ async def get_blog_post(blog_id: int, db: Session = Depends(get_db), current_use
     Raises:
         HTTPException: If the blog post not found.
     """
-    blog = db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id).first() # Query DB for blog post with given id and owner
+    cache_key = (current_user.id, blog_id) # Cache entries are scoped to the owner
+    cached = post_cache.get(cache_key) # Look up the serialized post
+    if cached is not None: # Cache hit, no database access needed
+        etag = make_etag(blog_id, cached["version"]) # Build the ETag of the cached version
+        if etag_matches(if_none_match, etag): # Client copy is still current
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}) # Return empty 304
+        body, encoding_headers = encode_cached_body(cached["body"], accept_encoding, cached["encoded"], etag) # Reuse the compressed variant if any
+        return Response(content=body, media_type="application/json", headers={"ETag": etag, "X-Cache": "HIT", **encoding_headers}) # Return the cached body
+
+    since = post_cache.snapshot() # Before the read, so a post invalidated meanwhile is not cached
+    query = db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id) # Query DB for blog post with given id and owner
+    if if_none_match: # Conditional request, content is only loaded if it is actually sent
+        query = query.options(defer(BlogPost.content))
+    blog = query.first() # Fetch the blog post
     if not blog: # Check if blog post exists
         raise HTTPException(  # Raise exception if blog post doesn't exist
             status_code=status.HTTP_404_NOT_FOUND,  # Set the status code
             detail="Blog post not found" # Provide detailed error message
         )
-    return blog # Return the blog post
+    etag = make_etag(blog.id, blog.version) # Build the ETag of the current version
+    if etag_matches(if_none_match, etag): # Client copy is still current
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}) # Return empty 304
+    body = dump_json(serialize_post(blog)) # Encode the post once
+    headers = {"ETag": etag, "X-Cache": "MISS"}
+    if blog.status == "completed": # Only completed posts are stable enough to cache
+        entry = {"version": blog.version, "body": body, "encoded": {}}
+        post_cache.set(cache_key, entry, since=since) # Skipped if a newer version was invalidated during the read
+        body, encoding_headers = encode_cached_body(body, accept_encoding, entry["encoded"], etag) # Compress now and keep the variant
+        headers.update(encoding_headers)
+    return Response(content=body, media_type="application/json", headers=headers) # Return the blog post
+
+@router.get(
+    "/{blog_id}/html", # GET route for the rendered HTML of a blog post
+    response_model=BlogPostHtmlOut, # Set the expected response model as BlogPostHtmlOut
+    summary="Retrieve the rendered HTML of a blog post", # Provide a summary description
+    description="Returns the sanitized HTML of a blog post, rendered from its markdown when it was generated or updated, with its table of contents and reading time." # Provide detailed description
+)
+async def get_blog_post_html(
+    blog_id: int,
+    if_none_match: Optional[str] = Header(default=None), # ETag the client already holds
+    db: Session = Depends(get_db),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Retrieves the stored HTML rendering of a blog post for the authenticated user.
+
+    The HTML is rendered when the content is written, so reads only load it.
+    Completed posts stored before rendering existed, or imported, are
+    rendered on their first read and the result is stored, unless the post
+    changed meanwhile. A conditional request that matches only reads the version.
+
+    Args:
+        blog_id (int): Blog post id to retrieve.
+        if_none_match (Optional[str]): If-None-Match request header.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        BlogPostHtmlOut: The rendered blog post.
+
+    Raises:
+        HTTPException: If the blog post not found, or has never been rendered and is not completed.
+    """
+    query = db.query(BlogPost.id, BlogPost.version).filter(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id) # Query the version only
+    if if_none_match: # Conditional request, check the version before loading the HTML
+        current = query.first()
+        etag = make_etag(current.id, current.version) if current else None # Build the ETag of the current version
+        if etag and etag_matches(if_none_match, etag): # Client copy is still current
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}) # Return empty 304
+    blog = query.add_columns(BlogPost.title, BlogPost.status, BlogPost.content_html, BlogPost.toc, BlogPost.reading_time_minutes).first() # Fetch the rendering
+    if not blog: # Check if blog post exists
+        raise HTTPException( # Raise exception if blog post doesn't exist
+            status_code=status.HTTP_404_NOT_FOUND, # Set the status code
+            detail="Blog post not found" # Provide detailed error message
+        )
+    rendered = {"content_html": blog.content_html, "toc": blog.toc, "reading_time_minutes": blog.reading_time_minutes}
+    if blog.content_html is None: # Never rendered
+        if blog.status != "completed": # Nothing to render before the generation completes
+            raise HTTPException( # Raise exception rather than store an empty rendering
+                status_code=status.HTTP_409_CONFLICT, # Set the status code
+                detail=f"Blog post has no content to render yet (status {blog.status})" # Provide detailed error message
+            )
+        rendered = await run_in_threadpool(render_stored_content, db, blog_id, blog.version) # Render it now and keep the result
+    payload = {
+        "id": blog.id, "title": blog.title, "status": blog.status,
+        "html": rendered["content_html"], "toc": rendered["toc"], "reading_time_minutes": rendered["reading_time_minutes"],
+    }
+    return FastJSONResponse(payload, headers={"ETag": make_etag(blog.id, blog.version)}) # Return the rendered post
+
+@router.get(
+    "/{blog_id}/content", # GET route for the raw markdown of a blog post
+    response_class=StreamingResponse, # Body is streamed, not validated against a model
+    summary="Retrieve the markdown of a blog post", # Provide a summary description
+    description="Streams the raw markdown content of a blog post. Supports single byte Range requests (206 Partial Content), If-Range and If-None-Match.", # Provide detailed description
+    responses={206: {"description": "The requested byte range"}, 416: {"description": "The range starts past the end of the content"}} # Document the range answers
+)
+async def get_blog_post_content(
+    blog_id: int,
+    range_header: Optional[str] = Header(default=None, alias="Range"), # Byte range the client asks for
+    if_range: Optional[str] = Header(default=None), # ETag the range request is conditional on
+    if_none_match: Optional[str] = Header(default=None), # ETag the client already holds
+    db: Session = Depends(get_db),
+    current_user: UserOut = Depends(get_current_user)
+):
+    """
+    Streams the markdown content of a blog post, whole or a byte range of it.
+
+    Only the length and version of the content are read up front. The body
+    is then read from the database chunk by chunk as it is sent (see
+    iter_content_chunks), so time to first byte and memory do not grow with
+    the size of the post, and a client showing the first screen can ask for
+    the first bytes only. Byte positions refer to the UTF-8 encoding, so a
+    range may cut a multi-byte character.
+
+    Args:
+        blog_id (int): Blog post id to retrieve.
+        range_header (Optional[str]): Range request header, e.g. bytes=0-16383.
+        if_range (Optional[str]): If-Range request header, the range is ignored unless it matches the ETag.
+        if_none_match (Optional[str]): If-None-Match request header.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        StreamingResponse: 200 with the whole content, or 206 with the requested range.
+
+    Raises:
+        HTTPException: If the blog post is not found, or the range is not satisfiable.
+    """
+    blog = content_info(db, blog_id, current_user.id) # Version and size, not the content
+    db.commit() # End the read transaction, the stream uses its own session
+    if not blog: # Check if blog post exists
+        raise HTTPException( # Raise exception if blog post doesn't exist
+            status_code=status.HTTP_404_NOT_FOUND, # Set the status code
+            detail="Blog post not found" # Provide detailed error message
+        )
+    version, size = blog
+    etag = make_etag(blog_id, version) # Build the ETag of the current version
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if etag_matches(if_none_match, etag): # Client copy is still current
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers) # Return empty 304
+    byte_range = None
+    if range_header and (if_range is None or if_range.strip() == etag): # A stale If-Range asks for the whole content
+        try:
+            byte_range = parse_byte_range(range_header, size) # None when the header is ignored
+        except RangeNotSatisfiable:
+            raise HTTPException( # Raise exception if the range is past the end
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, # Set the status code
+                detail="Range not satisfiable", # Provide detailed error message
+                headers={**headers, "Content-Range": f"bytes */{size}"} # Tell the client the actual length
+            )
+    first, last = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(last - first + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return StreamingResponse(
+        iter_content_chunks(blog_id, version, first, last), # Read from the database as it is sent
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type="text/markdown; charset=utf-8",
+        headers=headers,
+    )
+
+def check_post_owner(db: Session, blog_id: int, owner_id: int):
+    """
+    Raises 404 unless the blog post exists and belongs to the user.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog_id (int): Blog post id.
+        owner_id (int): Id of the authenticated user.
+
+    Raises:
+        HTTPException: If the blog post does not exist.
+    """
+    if db.query(BlogPost.id).filter(BlogPost.id == blog_id, BlogPost.owner_id == owner_id).first() is None:
+        raise HTTPException( # Raise exception if blog post doesn't exist
+            status_code=status.HTTP_404_NOT_FOUND, # Set the status code
+            detail="Blog post not found" # Provide detailed error message
+        )
+
+@router.get(
+    "/{blog_id}/revisions", # GET route for the revision history of a blog post
+    response_model=List[BlogPostRevisionOut], # Set the expected response model as a List of BlogPostRevisionOut
+    summary="List the revisions of a blog post", # Provide a summary description
+    description="Lists the stored revisions of the content of a blog post, newest first, without their content." # Provide detailed description
+)
+async def get_blog_post_revisions(blog_id: int, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+    """
+    Lists the revisions of a blog post of the authenticated user.
+
+    A post has no revisions until its content is first edited. The first
+    edit records the content it replaces, e.g. the generated draft, as
+    revision 1.
+
+    Args:
+        blog_id (int): Blog post id.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        List[BlogPostRevisionOut]: Revisions, newest first.
+
+    Raises:
+        HTTPException: If the blog post does not exist.
+    """
+    check_post_owner(db, blog_id, current_user.id) # 404 for posts of other users
+    rows = db.query(
+        BlogPostRevision.revision, BlogPostRevision.version, BlogPostRevision.title, BlogPostRevision.kind,
+        BlogPostRevision.size, func.length(BlogPostRevision.data).label("stored_bytes"), BlogPostRevision.created_at,
+    ).filter(BlogPostRevision.blog_id == blog_id).order_by(BlogPostRevision.revision.desc()).all() # Query everything but the data
+    return [row._asdict() for row in rows] # Return the revisions
+
+@router.get(
+    "/{blog_id}/revisions/{revision}", # GET route for one revision of a blog post
+    response_model=BlogPostRevisionContent, # Set the expected response model as BlogPostRevisionContent
+    summary="Retrieve a revision of a blog post", # Provide a summary description
+    description="Returns the content of a blog post at the given revision, rebuilt from the closest snapshot and the deltas since." # Provide detailed description
+)
+async def get_blog_post_revision(blog_id: int, revision: int, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+    """
+    Retrieves the content of a blog post of the authenticated user at a revision.
+
+    The content is rebuilt from one query: the snapshot the revision's delta
+    chain starts from and the deltas up to the revision.
+
+    Args:
+        blog_id (int): Blog post id.
+        revision (int): Revision number, from 1.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        BlogPostRevisionContent: The revision with its content.
+
+    Raises:
+        HTTPException: If the blog post or the revision does not exist.
+    """
+    check_post_owner(db, blog_id, current_user.id) # 404 for posts of other users
+    found = await run_in_threadpool(get_revision, db, blog_id, revision) # Decompressing and applying deltas is CPU work
+    if found is None:
+        raise HTTPException( # Raise exception if the revision doesn't exist
+            status_code=status.HTTP_404_NOT_FOUND, # Set the status code
+            detail="Revision not found" # Provide detailed error message
+        )
+    row, content = found
+    return {
+        "revision": row.revision, "version": row.version, "title": row.title, "kind": row.kind,
+        "size": row.size, "stored_bytes": len(row.data), "created_at": row.created_at, "content": content,
+    }
 
 @router.put(
     "/{blog_id}",  # PUT route for updating the blog post by id
@@ -199,21 +927,25 @@ async def get_blog_post(blog_id: int, db: Session = Depends(get_db), current_use
     summary="Update a blog post", # Provide a summary description
     description="Updates the title and/or content of a blog post for the authenticated user." # Provide detailed description
 )
-async def update_blog_post(blog_id: int, blog_update: BlogPostUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_blog_post(blog_id: int, blog_update: BlogPostUpdate, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
     """
     Updates a blog post by ID for the authenticated user.
 
+    New content is rendered to HTML and stored with its table of contents
+    and reading time. Changed content is recorded in the revision history,
+    with the content it replaces.
+
     Args:
         blog_id (int): Blog post ID to update.
         blog_update (BlogPostUpdate): Updated blog data.
         db (Session, optional): SQLAlchemy database session.
-        current_user (User, optional): Current authenticated user.
+        current_user (UserOut, optional): Current authenticated user.
 
     Returns:
         BlogPostOut: Updated blog post.
 
     Raises:
-        HTTPException: If the blog post does not exist.
+        HTTPException: If the blog post does not exist, or was updated concurrently.
     """
     blog = db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id).first() # Query the blog post with the given id and owner
     if not blog: # Check if the blog post exists
@@ -224,12 +956,20 @@ async def update_blog_post(blog_id: int, blog_update: BlogPostUpdate, db: Sessio
     
     if blog_update.title is not None:  # Update title if provided
         blog.title = blog_update.title
-    if blog_update.content is not None:  # Update content if provided
-        blog.content = blog_update.content
+    if blog_update.content is not None and blog_update.content != (blog.content or ""):  # Update content if provided and changed
+        await run_in_threadpool(replace_content, db, blog, blog_update.content) # Diffing and rendering large content would block the event loop
     
-    db.commit() # Commit changes to the DB
+    try:
+        db.commit() # Commit changes to the DB
+    except IntegrityError: # Another edit stored the same revision number first
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, # Set the status code
+            detail="Blog post was updated concurrently, retry the update" # Provide detailed error message
+        )
+    invalidate_post(current_user.id, blog_id) # Drop any cached copy of the post
     db.refresh(blog) # Refresh the object to get server generated changes
-    return blog # Return the blog post
+    return FastJSONResponse(serialize_post(blog), headers={"ETag": make_etag(blog.id, blog.version)}) # Return the blog post with the ETag of the new version
 
 @router.delete(
     "/{blog_id}",  # Define DELETE route to delete blog post
@@ -237,24 +977,29 @@ async def update_blog_post(blog_id: int, blog_update: BlogPostUpdate, db: Sessio
     summary="Delete a blog post", # Provide a summary description
     description="Deletes a blog post by its ID for the authenticated user." # Provide detailed description
 )
-async def delete_blog_post(blog_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_blog_post(blog_id: int, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
     """
     Deletes a blog post by ID for the authenticated user.
 
     Args:
         blog_id (int): Blog post ID to delete.
         db (Session, optional): SQLAlchemy database session.
-        current_user (User, optional): Current authenticated user.
+        current_user (UserOut, optional): Current authenticated user.
 
     Raises:
         HTTPException: If the blog post does not exist.
     """
-    blog = db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id).first()  # Query the blog post with the given id and user owner
-    if not blog: # Check if the blog post exists
+    statement = (
+        delete(BlogPost)
+        .where(BlogPost.id == blog_id, BlogPost.owner_id == current_user.id) # Scope the statement to the owner
+        .returning(BlogPost.id) # Tell whether the post existed
+    )
+    if db.execute(statement).first() is None: # Check if the blog post exists
         raise HTTPException( # Raise exception if the blog post doesn't exist
             status_code=status.HTTP_404_NOT_FOUND, # Set the status code
             detail="Blog post not found" # Provide detailed error message
         )
-    db.delete(blog) # Delete blog post from DB
+    db.execute(delete(BlogPostRevision).where(BlogPostRevision.blog_id == blog_id)) # Drop its history
     db.commit() # Commit the changes
+    invalidate_post(current_user.id, blog_id) # Drop any cached copy of the post
     return # Return empty body
\ No newline at end of file
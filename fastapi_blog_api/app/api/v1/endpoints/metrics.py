@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func
+from app.models import BlogPost
+from app.database import SessionLocal
+from app.core import metrics
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8" # Prometheus text exposition format
+POST_STATUSES = ("pending", "queued", "generating", "completed", "failed", "timed_out") # Reported even without posts, so a count dropping to zero shows
+
+def count_posts_by_status() -> dict:
+    """
+    Counts blog posts per status with a single GROUP BY query.
+
+    Returns:
+        dict: Post count keyed by status.
+    """
+    db = SessionLocal() # Create a new DB session
+    try:
+        rows = db.query(BlogPost.status, func.count(BlogPost.id)).group_by(BlogPost.status).all() # One row per status
+        return dict(rows)
+    finally:
+        db.close() # Close the DB session
+
+@router.get(
+    "/metrics", # GET route for Prometheus scrapes
+    response_class=PlainTextResponse, # Body is Prometheus text, not JSON
+    summary="Prometheus metrics", # Provide a summary description
+    description="Exposes request latency, database, queue and generation metrics in Prometheus text format, added up across processes when PROMETHEUS_MULTIPROC_DIR is set." # Provide detailed description
+)
+async def get_metrics():
+    """
+    Renders the metrics registry in Prometheus text format.
+
+    Post counts are queried once per scrape, never on the request path, and
+    set on the labelled gauges.
+    With PROMETHEUS_MULTIPROC_DIR, the metrics of the other processes (API
+    and generation workers) are added to those of this one.
+
+    Returns:
+        PlainTextResponse: The exposition text.
+    """
+    counts = await run_in_threadpool(count_posts_by_status) # Query the database off the event loop
+    for status, count in {**dict.fromkeys(POST_STATUSES, 0), **counts}.items():
+        metrics.blog_posts.labels(status).set(count)
+    metrics.generation_queue_depth.set(counts.get("pending", 0) + counts.get("queued", 0)) # Both wait for a generation slot
+    text = await run_in_threadpool(metrics.render) # Reading the other processes' files is I/O
+    return PlainTextResponse(text, media_type=PROMETHEUS_CONTENT_TYPE) # Return the exposition
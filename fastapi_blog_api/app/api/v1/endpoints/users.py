@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from app.schemas import UserCreate, UserOut, Token
+from app.schemas import UserCreate, UserOut, Token, RefreshTokenRequest, WebhookUpdate, WebhookOut
 from app.models import User
 from app.database import SessionLocal
-from app.core import security
+from app.core import security, webhooks
 from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.api.v1.endpoints.blogs import get_current_user
 
 router = APIRouter()
 
@@ -23,16 +26,50 @@ def get_db():
     finally:
         db.close() # Close the session in the finally block
 
+def find_user(db: Session, username: str):
+    """
+    Looks up a user by username.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        username (str): Username to look up.
+
+    Returns:
+        Optional[User]: The user, or None.
+    """
+    return db.query(User).filter(User.username == username).first()
+
+def add_user(db: Session, username: str, hashed_password: str) -> User:
+    """
+    Stores a new user.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        username (str): Username of the user.
+        hashed_password (str): bcrypt hash of the password.
+
+    Returns:
+        User: The stored user.
+    """
+    new_user = User(username=username, hashed_password=hashed_password) # Create new User model
+    db.add(new_user) # Add new user to DB session
+    db.commit() # Commit changes
+    db.refresh(new_user) # Refresh the new user object
+    return new_user
+
 @router.post(
     "/register", # Define the POST route for /register
     response_model=UserOut, # Set expected response model for the endpoint
     summary="Register a new user", # Set summary description
     description="Creates a new user with a username and password. Returns the user information excluding the password." # Set detailed description
 )
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Registers a new user.
 
+    The password is hashed on the bounded password hashing executor and the
+    queries run in the threadpool, so neither blocks the event loop.
+
     Args:
         user (UserCreate): The user creation data.
         db (Session, optional): SQLAlchemy database session. Defaults to dependency injection via `get_db`.
@@ -44,18 +81,15 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         HTTPException: If the username already exists.
     """
     # Check if user exists
-    existing_user = db.query(User).filter(User.username == user.username).first() # Check for existing users with the same username
+    existing_user = await run_in_threadpool(find_user, db, user.username) # Check for existing users with the same username
     if existing_user:
         raise HTTPException( # Raise exception if user exists
             status_code=status.HTTP_400_BAD_REQUEST, # Set status code
             detail="Username already registered" # Provide exception message
         )
-    hashed_password = security.get_password_hash(user.password) # Get hashed password
-    new_user = User(username=user.username, hashed_password=hashed_password) # Create new User model
-    db.add(new_user) # Add new user to DB session
-    db.commit() # Commit changes
-    db.refresh(new_user) # Refresh the new user object
-    return new_user # Return new user data
+    hashed_password = await security.get_password_hash_async(user.password) # Get hashed password off the event loop
+    new_user = await run_in_threadpool(add_user, db, user.username, hashed_password) # Store the user off the event loop
+    return FastJSONResponse({"id": new_user.id, "username": new_user.username}) # Return new user data
 
 @router.post(
     "/login", # Define the POST route for /login
@@ -63,9 +97,13 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     summary="User login", # Set summary description
     description="Authenticates an existing user and returns a JWT token for further requests." # Set detailed description
 )
-def login(user: UserCreate, db: Session = Depends(get_db)):
+async def login(user: UserCreate, db: Session = Depends(get_db)):
     """
-    Authenticates a user and returns a JWT token.
+    Authenticates a user and returns a JWT access token and refresh token.
+
+    The password is verified on the bounded password hashing executor, and
+    the queries run in the threadpool. Hashes created with another work
+    factor than BCRYPT_ROUNDS are transparently replaced.
 
     Args:
         user (UserCreate): The user login data.
@@ -77,16 +115,131 @@ def login(user: UserCreate, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the credentials are invalid.
     """
-    db_user = db.query(User).filter(User.username == user.username).first() # Query for the user using username
-    if not db_user or not security.verify_password(user.password, db_user.hashed_password): # Check if user exists and if provided password matches
-        raise HTTPException( # Raise exception if user does not exists or password does not match
+    db_user = await run_in_threadpool(find_user, db, user.username) # Query for the user using username
+    if not db_user: # Check if user exists
+        raise HTTPException( # Raise exception if user does not exists
             status_code=status.HTTP_401_UNAUTHORIZED, # Set status code
             detail="Invalid credentials" # Provide error message
         )
-    
+    valid, new_hash = await security.verify_and_update_password_async(user.password, db_user.hashed_password) # Check if provided password matches
+    if not valid:
+        raise HTTPException( # Raise exception if password does not match
+            status_code=status.HTTP_401_UNAUTHORIZED, # Set status code
+            detail="Invalid credentials" # Provide error message
+        )
+    if new_hash: # Stored hash uses an outdated work factor
+        db_user.hashed_password = new_hash # Replace it with a hash using the configured one
+        await run_in_threadpool(db.commit) # Commit changes off the event loop
+    return FastJSONResponse(issue_tokens(db_user.username)) # Return the generated tokens
+
+@router.post(
+    "/refresh", # Define the POST route for /refresh
+    response_model=Token, # Set expected response model for the endpoint
+    summary="Refresh access token", # Set summary description
+    description="Exchanges a refresh token for a new access token and refresh token, without a password check." # Set detailed description
+)
+def refresh(body: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Issues new tokens from a refresh token.
+
+    Renewing a session this way costs a JWT verification and a user lookup
+    instead of a bcrypt verification.
+
+    Args:
+        body (RefreshTokenRequest): The refresh token returned by login.
+        db (Session, optional): SQLAlchemy database session. Defaults to dependency injection via `get_db`.
+
+    Returns:
+        Token: New access and refresh tokens.
+
+    Raises:
+        HTTPException: If the refresh token is invalid or the user no longer exists.
+    """
+    payload = security.decode_refresh_token(body.refresh_token) # Verify the refresh token
+    username = payload.get("sub") if payload else None # Get the token subject
+    if not username or not db.query(User.id).filter(User.username == username).first(): # Check the user still exists
+        raise HTTPException( # Raise exception if the token cannot be used
+            status_code=status.HTTP_401_UNAUTHORIZED, # Set status code
+            detail="Invalid refresh token" # Provide error message
+        )
+    return FastJSONResponse(issue_tokens(username)) # Return the generated tokens
+
+@router.get(
+    "/me/webhook", # Define the GET route for the webhook settings
+    response_model=WebhookOut, # Set expected response model for the endpoint
+    summary="Get webhook settings", # Set summary description
+    description="Returns the default webhook URL of the authenticated user and the secret signing all of the user's webhooks, creating the secret on first use." # Set detailed description
+)
+async def get_webhook(db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+    """
+    Returns the webhook settings of the current user.
+
+    Args:
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        WebhookOut: Default callback URL and signing secret.
+    """
+    secret = webhooks.ensure_webhook_secret(db, current_user.id) # Create the secret if needed
+    url = db.query(User.webhook_url).filter(User.id == current_user.id).scalar() # Get the default callback URL
+    return FastJSONResponse({"url": url, "secret": secret}) # Return the webhook settings
+
+@router.put(
+    "/me/webhook", # Define the PUT route for the webhook settings
+    response_model=WebhookOut, # Set expected response model for the endpoint
+    summary="Set webhook settings", # Set summary description
+    description="Sets or removes the default webhook URL notified when any generation of the user completes or fails, and optionally rotates the signing secret." # Set detailed description
+)
+async def set_webhook(webhook: WebhookUpdate, db: Session = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
+    """
+    Updates the webhook settings of the current user.
+
+    Posts created with their own callback_url keep using it; the default URL
+    applies to every other post of the user.
+
+    Args:
+        webhook (WebhookUpdate): New default URL and whether to rotate the secret.
+        db (Session, optional): SQLAlchemy database session.
+        current_user (UserOut, optional): Current authenticated user.
+
+    Returns:
+        WebhookOut: Default callback URL and signing secret.
+
+    Raises:
+        HTTPException: If the URL resolves to a loopback, private or otherwise non-public address.
+    """
+    url = str(webhook.url) if webhook.url else None # Normalized URL, or None to remove it
+    if url:
+        try:
+            await run_in_threadpool(webhooks.check_webhook_url, url) # Resolves the host, blocking
+        except webhooks.UnsafeWebhookURL as e:
+            raise HTTPException( # Raise exception rather than call the internal network later
+                status_code=status.HTTP_400_BAD_REQUEST, # Set the status code
+                detail=f"Webhook URL rejected: {e}" # Provide detailed error message
+            )
+    values = {"webhook_url": url} # Columns to update
+    if webhook.rotate_secret: # Replace the secret, webhooks already queued keep the old signature
+        values["webhook_secret"] = webhooks.generate_secret()
+    db.query(User).filter(User.id == current_user.id).update(values, synchronize_session=False) # Update the user
+    db.commit() # Commit changes
+    secret = webhooks.ensure_webhook_secret(db, current_user.id) # Create the secret if needed
+    return FastJSONResponse({"url": url, "secret": secret}) # Return the webhook settings
+
+def issue_tokens(username: str) -> dict:
+    """
+    Creates the access and refresh tokens of a user.
+
+    Args:
+        username (str): Username used as the token subject.
+
+    Returns:
+        dict: The Token payload.
+    """
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES) # Set access token validity time
     access_token = security.create_access_token( # create the access token
-        data={"sub": db_user.username},  # Set token subject
+        data={"sub": username},  # Set token subject
         expires_delta=access_token_expires # Set token validity
     )
-    return {"access_token": access_token, "token_type": "bearer"} # Return the generated token
\ No newline at end of file
+    refresh_token = security.create_refresh_token(data={"sub": username}) # create the refresh token
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token} # Return the generated tokens
\ No newline at end of file
@@ -2,72 +2,117 @@
 from smolagents import (
     CodeAgent,
     ToolCallingAgent,
-    LiteLLMModel,
     ManagedAgent,
-    DuckDuckGoSearchTool,
 )
+from .smoltools.duckduckgo import DedupDuckDuckGoSearchTool
 from .smoltools.jinaai import scrape_page_with_jina_ai, search_facts_with_jina_ai
+from .smoltools.sources import research_sources
+from app.core import deadline, metrics
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.llm import build_model
+from app.core.config import settings
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
 from dotenv import load_dotenv
+from typing import Optional
+import logging
 import os
+import time
 
 load_dotenv()
 
-# Initialize the model
-model = LiteLLMModel(model_id="gpt-4o-mini")
+logger = logging.getLogger(__name__)
+
+# Initialize one model per stage (model, max tokens, temperature and fallback from STAGE_MODELS)
+models = {stage: build_model(stage) for stage in settings.STAGE_MODELS}
+
+@contextmanager
+def timed_stage(name: str):
+    """
+    Records the duration of a block as a generation stage metric.
+
+    Args:
+        name (str): Stage name, the name of the managed agent running it.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.generation_stage_duration_seconds.labels(name).observe(time.perf_counter() - start)
+
+class TimedManagedAgent(ManagedAgent):
+    """ManagedAgent that records the duration of every call as a generation stage metric."""
+
+    def __call__(self, request, **kwargs):
+        with timed_stage(self.name):
+            return super().__call__(request, **kwargs)
+
+class DeadlineStepsMixin:
+    """Agent mixin checking the generation deadline before every step, so a looping agent stops when the time is up."""
+
+    def step(self, memory_step):
+        deadline.check(f"{type(self).__name__} step {memory_step.step_number}")
+        return super().step(memory_step)
+
+class DeadlineToolCallingAgent(DeadlineStepsMixin, ToolCallingAgent):
+    """ToolCallingAgent bounded by the generation deadline."""
+
+class DeadlineCodeAgent(DeadlineStepsMixin, CodeAgent):
+    """CodeAgent bounded by the generation deadline."""
 
 # Research Agent
-research_agent = ToolCallingAgent(
-    tools=[scrape_page_with_jina_ai, search_facts_with_jina_ai, DuckDuckGoSearchTool()],
-    model=model,
+research_agent = DeadlineToolCallingAgent(
+    tools=[scrape_page_with_jina_ai, search_facts_with_jina_ai, DedupDuckDuckGoSearchTool()],
+    model=models["researcher"],
     max_steps=10,
 )
 
-managed_research_agent = ManagedAgent(
+managed_research_agent = TimedManagedAgent(
     agent=research_agent,
     name="super_researcher",
     description="Researches topics thoroughly using web searches and content scraping. Provide the research topic as input.",
 )
 
 # Research Checker Agent
-research_checker_agent = ToolCallingAgent(
+research_checker_agent = DeadlineToolCallingAgent(
     tools=[],
-    model=model
+    model=models["checker"]
 )
 
-managed_research_checker_agent = ManagedAgent(
+managed_research_checker_agent = TimedManagedAgent(
     agent=research_checker_agent,
     name="research_checker",
     description="Checks the research for relevance to the original task request. If the research is not relevant, it will ask for more research.",
 )
 
 # Writer Agent
-writer_agent = ToolCallingAgent(
+writer_agent = DeadlineToolCallingAgent(
     tools=[],
-    model=model
+    model=models["writer"]
 )
 
-managed_writer_agent = ManagedAgent(
+managed_writer_agent = TimedManagedAgent(
     agent=writer_agent,
     name="writer",
     description="Writes blog posts based on the checked research. Provide the research findings and desired tone/style.",
 )
 
 # Copy Editor Agent
-copy_editor_agent = ToolCallingAgent(
+copy_editor_agent = DeadlineToolCallingAgent(
     tools=[],
-    model=model
+    model=models["editor"]
 )
 
-managed_copy_editor = ManagedAgent(
+managed_copy_editor = TimedManagedAgent(
     agent=copy_editor_agent,
     name="editor",
     description="Reviews and polishes the blog post based on the research and original task request. Order the final blog post and any lists in a way that is most engaging to someone working in AI. Provides the final, edited version in markdown.",
 )
 
 # Main Blog Writer Manager
-blog_manager = CodeAgent(
+blog_manager = DeadlineCodeAgent(
     tools=[],
-    model=model,
+    model=models["manager"],
     managed_agents=[
         managed_research_agent,
         managed_research_checker_agent,
@@ -77,13 +122,240 @@ blog_manager = CodeAgent(
     additional_authorized_imports=["re"],
 )
 
-def write_blog_post(topic: str, output_file: str = "blog_post.md") -> str:
+# Staged pipeline prompts, the stages always run in this order
+RESEARCH_PROMPT = """Research this blog post topic thoroughly, focusing on specific products and sources: {topic}
+Return your findings as concise notes, with the source URL of every fact."""
+RESEARCH_FEEDBACK_PROMPT = """
+
+A reviewer found the research gathered so far insufficient: {feedback}
+Research what is missing; do not repeat these findings:
+{findings}"""
+CHECK_PROMPT = """You check the research for a blog post about: {topic}
+
+Research:
+{findings}
+
+Is this research relevant to the topic and specific enough (named products, sources) to write the post?
+If it is, answer APPROVED on the first line. Otherwise answer REJECTED on the first line, followed by what is missing."""
+WRITE_PROMPT = """Write an engaging blog post (not just a list) in markdown about: {topic}
+Base it only on this checked research:
+{findings}"""
+EDIT_PROMPT = """Review and polish this blog post about: {topic}
+Check it against the research, order the post and any lists in a way that is most engaging to someone working in AI, and reply with only the final, edited version in markdown.
+
+Research:
+{findings}
+
+Draft:
+{draft}"""
+
+@dataclass
+class Research:
     """
-    Creates a blog post on the given topic using multiple agents.
+    Research hand-off between the research, checking and writing stages.
+
+    Attributes:
+        topic (str): Blog post topic.
+        findings (str): Notes gathered by the researcher, across rounds.
+        rounds (int): Research rounds run so far.
+        complete (bool): False when the last round was stopped early because its time ran out.
+    """
+    topic: str
+    findings: str
+    rounds: int
+    complete: bool = True
+
+@dataclass
+class ResearchReview:
+    """
+    Verdict of the research checker.
+
+    Attributes:
+        approved (bool): Whether the research is good enough to write the post.
+        feedback (str): What is missing, empty when approved.
+    """
+    approved: bool
+    feedback: str
+
+def complete(agent, prompt: str) -> str:
+    """
+    Sends a single prompt to the model of an agent, without the agent loop.
+
+    Stages without tools need one answer, not a ReAct loop ending in a
+    final_answer tool call.
 
     Args:
-        topic (str): The blog post topic or title.
-        output_file (str): The filename to save the markdown post.
+        agent (MultiStepAgent): Agent whose model answers.
+        prompt (str): User prompt.
+
+    Returns:
+        str: The model answer.
+    """
+    message = agent.model([{"role": "user", "content": [{"type": "text", "text": prompt}]}])
+    return (message.content or "").strip()
+
+def new_research_agent() -> DeadlineToolCallingAgent:
+    """
+    Builds a research agent for one run of the research stage.
+
+    Agent memory is per instance, so concurrent generations sharing
+    research_agent would see, or reset, each other's steps. The new agent
+    has the tools, model and step limit of research_agent and its own memory.
+
+    Returns:
+        DeadlineToolCallingAgent: Agent with an empty memory.
+    """
+    return DeadlineToolCallingAgent(
+        tools=[tool for name, tool in research_agent.tools.items() if name != "final_answer"], # Added by every agent
+        model=research_agent.model,
+        max_steps=research_agent.max_steps,
+        verbosity_level=research_agent.logger.level,
+    )
+
+def gathered_observations(agent) -> str:
+    """
+    Returns the tool results an agent gathered so far, for a run stopped before its final answer.
+
+    Args:
+        agent (MultiStepAgent): Agent whose last run was interrupted.
+
+    Returns:
+        str: Observations of its steps, oldest first.
+    """
+    return "\n\n".join(step.observations for step in agent.memory.steps if getattr(step, "observations", None))
+
+def research(topic: str, previous: Research = None, review: ResearchReview = None, budget: Optional[Deadline] = None) -> Research:
+    """
+    Research stage: runs the research agent and its tools.
+
+    When the research budget runs out, the round stops early and keeps the
+    tool results gathered so far, so the writer can proceed with them.
+
+    Args:
+        topic (str): Blog post topic.
+        previous (Research, optional): Research of the previous round, when the checker rejected it.
+        review (ResearchReview, optional): The rejection, whose feedback guides the new round.
+        budget (Deadline, optional): Time allowed for research across rounds.
+
+    Returns:
+        Research: Findings of every round so far.
+
+    Raises:
+        DeadlineExceeded: If the generation itself is out of time.
+    """
+    task = RESEARCH_PROMPT.format(topic=topic)
+    if previous is not None:
+        task += RESEARCH_FEEDBACK_PROMPT.format(feedback=review.feedback, findings=previous.findings)
+    finished = True
+    agent = new_research_agent() # Its memory holds only this round's steps
+    with timed_stage(managed_research_agent.name):
+        try:
+            with deadline.deadline(budget.remaining()) if budget is not None else nullcontext():
+                findings = str(agent.run(task))
+        except DeadlineExceeded:
+            deadline.check("research") # Only the research budget ran out if this passes
+            logger.warning("Research on %r stopped early, its time ran out", topic)
+            metrics.generation_degraded_total.labels("research").inc()
+            findings = gathered_observations(agent) or "No findings were gathered in time."
+            finished = False
+    if previous is not None:
+        findings = f"{previous.findings}\n\n{findings}"
+    return Research(topic=topic, findings=findings, rounds=previous.rounds + 1 if previous else 1, complete=finished)
+
+def check_research(research: Research) -> ResearchReview:
+    """
+    Checking stage: asks the checker whether the research is sufficient.
+
+    Answers that are neither APPROVED nor REJECTED count as approved, another
+    research round is only worth its cost on an explicit rejection.
+
+    Args:
+        research (Research): Research to check.
+
+    Returns:
+        ResearchReview: The verdict.
+    """
+    with timed_stage(managed_research_checker_agent.name):
+        answer = complete(research_checker_agent, CHECK_PROMPT.format(topic=research.topic, findings=research.findings))
+    verdict, _, feedback = answer.partition("\n")
+    if verdict.strip().strip("*").upper().startswith("REJECTED"):
+        return ResearchReview(approved=False, feedback=feedback.strip() or verdict.strip())
+    return ResearchReview(approved=True, feedback="")
+
+def write_draft(research: Research) -> str:
+    """
+    Writing stage: drafts the post from the checked research.
+
+    Args:
+        research (Research): Checked research.
+
+    Returns:
+        str: Markdown draft.
+    """
+    with timed_stage(managed_writer_agent.name):
+        return complete(writer_agent, WRITE_PROMPT.format(topic=research.topic, findings=research.findings))
+
+def edit_draft(research: Research, draft: str) -> str:
+    """
+    Editing stage: polishes the draft against the research.
+
+    The draft is already a full post, so it is returned unedited when the
+    generation runs out of time while editing.
+
+    Args:
+        research (Research): Checked research.
+        draft (str): Markdown draft.
+
+    Returns:
+        str: Final markdown post.
+    """
+    with timed_stage(managed_copy_editor.name):
+        try:
+            return complete(copy_editor_agent, EDIT_PROMPT.format(topic=research.topic, findings=research.findings, draft=draft))
+        except DeadlineExceeded:
+            logger.warning("Editing of %r skipped, the generation ran out of time", research.topic)
+            metrics.generation_degraded_total.labels("editor").inc()
+            return draft
+
+def run_staged_pipeline(topic: str, max_research_rounds: int = None) -> str:
+    """
+    Writes a blog post by calling the stages directly: research, check, write, edit.
+
+    Unlike the manager, no LLM call is spent planning or deciding which agent
+    runs next. Research is repeated only when the checker rejects it, at most
+    max_research_rounds times in total; the writer then proceeds with the
+    research gathered so far.
+
+    Under a generation deadline, research may use the time left minus the
+    GENERATION_WRITE_RESERVE share kept for writing and editing. When that
+    runs out, research stops early and the writer proceeds without another
+    check.
+
+    Args:
+        topic (str): Blog post topic.
+        max_research_rounds (int, optional): Research rounds allowed, defaults to PIPELINE_MAX_RESEARCH_ROUNDS.
+
+    Returns:
+        str: The final markdown post.
+    """
+    max_rounds = max(1, settings.PIPELINE_MAX_RESEARCH_ROUNDS if max_research_rounds is None else max_research_rounds)
+    left = deadline.remaining()
+    budget = None if left is None else Deadline(left * (1 - settings.GENERATION_WRITE_RESERVE)) # Research share of the time left
+    findings = research(topic, budget=budget)
+    while findings.complete: # Out of research time, the writer proceeds with what exists
+        review = check_research(findings)
+        if review.approved or findings.rounds >= max_rounds:
+            break
+        findings = research(topic, findings, review, budget)
+    draft = write_draft(findings)
+    return edit_draft(findings, draft)
+
+def run_manager(topic: str) -> str:
+    """
+    Writes a blog post by letting the CodeAgent manager orchestrate the managed agents.
+
+    Args:
+        topic (str): Blog post topic.
 
     Returns:
         str: The generated blog post content.
@@ -94,6 +366,26 @@ def write_blog_post(topic: str, output_file: str = "blog_post.md") -> str:
 3. Finally, edit and polish the content.
 """
     # Run the multi-agent blog manager
-    result = blog_manager.run(prompt)
-    
-    return result
+    return blog_manager.run(prompt)
+
+PIPELINES = {"manager": run_manager, "staged": run_staged_pipeline} # GENERATION_PIPELINE -> implementation
+
+def write_blog_post(topic: str, output_file: str = "blog_post.md") -> str:
+    """
+    Creates a blog post on the given topic using multiple agents.
+
+    GENERATION_PIPELINE selects the orchestration: "manager" lets the
+    CodeAgent manager decide which agent to call, "staged" runs the fixed
+    research, check, write, edit sequence directly. Search results and
+    scraped pages are deduplicated across the whole generation (see
+    app/core/smoltools/sources.py).
+
+    Args:
+        topic (str): The blog post topic or title.
+        output_file (str): The filename to save the markdown post.
+
+    Returns:
+        str: The generated blog post content.
+    """
+    with research_sources():
+        return PIPELINES[settings.GENERATION_PIPELINE](topic)
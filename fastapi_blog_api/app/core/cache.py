@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.models import User
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with optional per-entry TTL.
+
+    Attributes:
+        maxsize (int): Maximum number of entries. 0 disables the cache.
+        ttl (Optional[float]): Default time to live of an entry in seconds, None for no expiry.
+        hits (int): Number of successful lookups.
+        misses (int): Number of failed lookups.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict() # key -> (expires_at, value), oldest first
+        self._sequence = 0 # Bumped by every delete, see snapshot()
+        self._deleted = OrderedDict() # key -> sequence of its latest delete, oldest first, at most maxsize keys
+        self._forgotten = 0 # Latest sequence dropped from _deleted
+        self._swept = 0 # Sequence of the latest delete_where, which may have removed any key
+        self._lock = threading.Lock() # Endpoints and background tasks share the cache across threads
+
+    def get(self, key):
+        """
+        Looks up a key and marks it as most recently used.
+
+        Args:
+            key (Hashable): Cache key.
+
+        Returns:
+            Optional[Any]: The cached value, or None on a miss or expired entry.
+        """
+        if self.maxsize <= 0: # Cache disabled
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic(): # Entry expired
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key) # Mark as most recently used
+            self.hits += 1
+            return entry[1]
+
+    def snapshot(self) -> int:
+        """
+        Returns the position of the cache in its sequence of deletes.
+
+        Take it before reading a value from its source, and pass it to set:
+        a value read before the key was invalidated is then not stored.
+
+        Returns:
+            int: Sequence number of the latest delete.
+        """
+        with self._lock:
+            return self._sequence
+
+    def set(self, key, value, ttl: float = None, since: int = None):
+        """
+        Stores a value, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to store.
+            ttl (Optional[float]): Time to live in seconds, defaults to the cache TTL.
+            since (Optional[int]): snapshot() taken before the value was read. The
+                value is not stored if the key was deleted since, it may be stale.
+
+        Returns:
+            bool: False if the value was not stored.
+        """
+        if self.maxsize <= 0: # Cache disabled
+            return False
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if since is not None and max(self._deleted.get(key, 0), self._forgotten, self._swept) > since: # Invalidated while it was read
+                return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: # Evict least recently used entries
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        """
+        Removes a key if present.
+
+        Args:
+            key (Hashable): Cache key.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._sequence += 1
+            self._deleted[key] = self._sequence
+            self._deleted.move_to_end(key)
+            while len(self._deleted) > max(self.maxsize, 1): # Forget the oldest deletes, set() then refuses reads older than them
+                self._forgotten = self._deleted.popitem(last=False)[1]
+
+    def delete_where(self, predicate):
+        """
+        Removes every entry matching a predicate.
+
+        Scans the whole cache, meant for rare invalidations by value. The keys
+        it would have matched are unknown, so set() then refuses every value
+        read before it.
+
+        Args:
+            predicate (Callable[[Hashable, Any], bool]): Called with each key and value.
+        """
+        with self._lock:
+            self._sequence += 1
+            self._swept = self._sequence
+            for key in [key for key, (_, value) in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: hits, misses, hit_ratio, size and maxsize.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class InvalidationChannel:
+    """
+    Delivers cache invalidations to the caches of this process and, when a
+    Redis URL is configured, to every other worker process through pub/sub.
+
+    Attributes:
+        url (str): Redis URL of the shared channel, empty for process-local only.
+        channel_name (str): Redis pub/sub channel used for invalidation messages.
+    """
+
+    def __init__(self, url: str = "", channel_name: str = "blog-api:cache-invalidation"):
+        self.url = url
+        self.channel_name = channel_name
+        self._handlers = {} # Cache name -> list of callbacks taking the key
+        self._origin = uuid.uuid4().hex # Identifies messages sent by this process
+        self._redis = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, handler):
+        """
+        Registers a callback invoked with the key of every invalidation for a cache.
+
+        Args:
+            name (str): Cache name, e.g. "posts".
+            handler (Callable[[Hashable], None]): Callback removing the key from the cache.
+        """
+        self._handlers.setdefault(name, []).append(handler)
+        if self.url: # Start listening for other workers once something is registered
+            self._connect()
+
+    def publish(self, name: str, key):
+        """
+        Invalidates a key locally and announces it to the other workers.
+
+        Args:
+            name (str): Cache name.
+            key (Hashable): Key to invalidate, tuples are sent as JSON lists.
+        """
+        self._deliver(name, key)
+        if self.url:
+            message = json.dumps({"origin": self._origin, "name": name, "key": key})
+            self._connect().publish(self.channel_name, message)
+
+    def _deliver(self, name: str, key):
+        for handler in self._handlers.get(name, []):
+            handler(key)
+
+    def _connect(self):
+        with self._lock:
+            if self._redis is None:
+                try:
+                    import redis # Optional dependency, only needed for multi-worker deployments
+                except ImportError as e:
+                    raise RuntimeError("CACHE_INVALIDATION_URL requires the 'redis' package") from e
+                self._redis = redis.Redis.from_url(self.url)
+                listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+                listener.start()
+            return self._redis
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel_name)
+        for message in pubsub.listen():
+            payload = json.loads(message["data"])
+            if payload["origin"] == self._origin: # Already delivered locally
+                continue
+            key = payload["key"]
+            self._deliver(payload["name"], tuple(key) if isinstance(key, list) else key)
+
+
+invalidation_channel = InvalidationChannel(settings.CACHE_INVALIDATION_URL)
+
+# Serialized BlogPostOut payloads keyed by (owner_id, blog_id)
+post_cache = LRUCache(settings.POST_CACHE_SIZE)
+invalidation_channel.register("posts", post_cache.delete)
+
+def invalidate_post(owner_id: int, blog_id: int):
+    """
+    Drops a blog post from the read cache of every worker.
+
+    Args:
+        owner_id (int): ID of the user owning the post.
+        blog_id (int): Blog post id.
+    """
+    invalidation_channel.publish("posts", (owner_id, blog_id))
+
+# Verified access tokens -> resolved principal (UserOut), expiring with the token
+principal_cache = LRUCache(settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+invalidation_channel.register("principals", lambda username: principal_cache.delete_where(lambda _, principal: principal.username == username))
+
+def invalidate_user(username: str):
+    """
+    Drops every cached principal of a user in every worker.
+
+    Args:
+        username (str): Username of the user that changed or was deleted.
+    """
+    invalidation_channel.publish("principals", username)
+
+PENDING_USER_INVALIDATIONS = "invalidated_usernames" # Session.info key of the users changed in the current transaction
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_changed_user(mapper, connection, target):
+    """Remembers users changed or deleted through the ORM, their principals are invalidated once the change is committed."""
+    history = inspect(target).attrs.username.history # Renames must invalidate the old username
+    session = object_session(target)
+    session.info.setdefault(PENDING_USER_INVALIDATIONS, set()).update(set(history.deleted or ()) | {target.username})
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    """
+    Invalidates the principals of the users changed by the committed transaction.
+
+    Invalidating at flush would let other workers cache the old principal
+    again before the commit, and would invalidate changes that are rolled back.
+    """
+    for username in session.info.pop(PENDING_USER_INVALIDATIONS, ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    """Drops the invalidations of a rolled back transaction."""
+    session.info.pop(PENDING_USER_INVALIDATIONS, None)
+
+# Request profiling reports keyed by profile id, see app/core/profiling.py
+profile_reports = LRUCache(settings.PROFILE_REPORTS_SIZE)
+
+# LLM answers keyed by a hash of the prompt and sampling parameters, see app/core/llm.py
+llm_cache = LRUCache(settings.LLM_CACHE_SIZE, ttl=settings.LLM_CACHE_TTL_SECONDS)
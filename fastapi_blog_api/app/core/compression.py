@@ -0,0 +1,196 @@
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import settings
+from app.core.profiling import profile_span
+
+try:
+    import brotli # Optional dependency, brotli is only offered when it is installed
+except ImportError: # pragma: no cover - exercised only without brotli
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/") # Content types worth compressing
+
+def supported_encodings():
+    """
+    Returns the content codings this process can produce, in order of preference.
+
+    Returns:
+        Tuple[str, ...]: "br" (when brotli is installed) and "gzip".
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Negotiates the content coding of a response from an Accept-Encoding header.
+
+    The server preference (brotli, then gzip) breaks ties between codings the
+    client accepts with the same q-value.
+
+    Args:
+        accept_encoding (Optional[str]): Accept-Encoding request header.
+
+    Returns:
+        Optional[str]: "br", "gzip", or None to send the body uncompressed.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0 # Malformed q-value, ignore the coding
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in supported_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses a response body with the configured level.
+
+    Args:
+        body (bytes): Uncompressed body.
+        encoding (str): "br" or "gzip", as returned by choose_encoding.
+
+    Returns:
+        bytes: Compressed body.
+    """
+    with profile_span("compression"):
+        if encoding == "br":
+            return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0) # Fixed mtime keeps the output deterministic
+
+def encoded_etag(etag: Optional[str], encoding: str) -> Optional[str]:
+    """
+    Derives the ETag of a compressed representation from the ETag of the identity one.
+
+    Each coding is a different representation and needs its own strong
+    validator (RFC 9110, 8.8.3), e.g. "12-3" becomes "12-3-gzip".
+
+    Args:
+        etag (Optional[str]): ETag of the uncompressed body.
+        encoding (str): "br" or "gzip".
+
+    Returns:
+        Optional[str]: The suffixed ETag, None without an ETag.
+    """
+    if not etag or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def identity_etag(etag: str) -> str:
+    """
+    Removes the coding suffix added by encoded_etag.
+
+    Args:
+        etag (str): ETag sent by a client, e.g. in If-None-Match.
+
+    Returns:
+        str: ETag of the uncompressed representation.
+    """
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """
+    Checks whether a content type is text that benefits from compression.
+
+    Args:
+        content_type (Optional[str]): Content-Type response header.
+
+    Returns:
+        bool: True for JSON, NDJSON and text responses.
+    """
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def encode_cached_body(body: bytes, accept_encoding: Optional[str], variants: dict, etag: Optional[str] = None):
+    """
+    Picks the representation of a cached body for a request, compressing it at most once per coding.
+
+    Args:
+        body (bytes): Uncompressed JSON body.
+        accept_encoding (Optional[str]): Accept-Encoding request header.
+        variants (dict): Compressed bodies of this cache entry keyed by coding, filled on first use.
+        etag (Optional[str]): ETag of the uncompressed body, replaced by the ETag of the coding.
+
+    Returns:
+        Tuple[bytes, dict]: The body to send and the headers describing its coding.
+    """
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return body, {}
+    encoding = choose_encoding(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is None:
+        return body, headers
+    compressed = variants.get(encoding)
+    if compressed is None:
+        compressed = variants[encoding] = compress_body(body, encoding) # Concurrent readers may both compress, the result is identical
+    headers["Content-Encoding"] = encoding
+    if etag:
+        headers["ETag"] = encoded_etag(etag, encoding)
+    return compressed, headers
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and text responses with brotli or gzip.
+
+    Only complete bodies of at least COMPRESSION_MIN_SIZE bytes are
+    compressed. Streaming responses and responses that already carry a
+    Content-Encoding (such as pre-compressed cached posts) pass through.
+    The ETag of a compressed response gets the suffix of its coding.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start": # Hold the headers until the body is known
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None: # Later chunks of a streamed body
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body") # Streaming response, sent as is
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not is_compressible(headers.get("content-type"))
+            ):
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is not None:
+                body = compress_body(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding) # A different representation, a different strong validator
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -5,9 +5,101 @@ from dotenv import load_dotenv
 
 load_dotenv(".env.example")
 
+def stage_model(stage: str, model: str, fallback_model: str) -> dict:
+    """
+    Reads the model configuration of one generation stage.
+
+    Every value can be overridden with <STAGE>_MODEL, <STAGE>_MAX_TOKENS,
+    <STAGE>_TEMPERATURE and <STAGE>_FALLBACK_MODEL, e.g. CHECKER_MODEL.
+    The token limit and temperature are None unless configured, so the
+    provider defaults apply.
+
+    Args:
+        stage (str): Stage name: manager, researcher, checker, writer or editor.
+        model (str): Default model id.
+        fallback_model (str): Default model used when the primary one times out, empty for none.
+
+    Returns:
+        dict: model, max_tokens, temperature and fallback_model.
+    """
+    prefix = stage.upper()
+    max_tokens = os.getenv(f"{prefix}_MAX_TOKENS")
+    temperature = os.getenv(f"{prefix}_TEMPERATURE")
+    return {
+        "model": os.getenv(f"{prefix}_MODEL", model),
+        "max_tokens": int(max_tokens) if max_tokens else None,
+        "temperature": float(temperature) if temperature else None,
+        "fallback_model": os.getenv(f"{prefix}_FALLBACK_MODEL", fallback_model),
+    }
+
 class Settings:
+    DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes") # Debug mode, adds X-SQL-Count and X-SQL-Time response headers
     SECRET_KEY = os.getenv("SECRET_KEY", "mysecretkey")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 60 * 24 * 7)) # Refresh tokens renew sessions without a password check
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12)) # bcrypt work factor, hashes with another factor are rehashed on login
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4)) # Threads available for bcrypt hashing and verification
+    POST_CACHE_SIZE = int(os.getenv("POST_CACHE_SIZE", 1024)) # Max cached blog posts per process, 0 disables the cache
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500)) # Rows fetched per round trip when streaming exports
+    CONTENT_CHUNK_SIZE = int(os.getenv("CONTENT_CHUNK_SIZE", 256 * 1024)) # Bytes of post content read from the database per chunk of a streamed /content response
+    REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", 20)) # Revisions per delta chain, a full snapshot starts each chain and bounds the deltas applied to read a revision
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000)) # Posts per INSERT statement and transaction during bulk imports
+    READING_WORDS_PER_MINUTE = int(os.getenv("READING_WORDS_PER_MINUTE", 200)) # Reading speed behind the reading time of posts
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", (os.cpu_count() or 1) - 1)) # Processes rendering posts in bulk re-renders, one core is left for the writes, 0 renders in-process
+    RENDER_BATCH_SIZE = int(os.getenv("RENDER_BATCH_SIZE", 500)) # Posts read, rendered and written per round of a bulk re-render
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000)) # Verified tokens cached per process, 0 disables the cache
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60)) # Max age of a cached principal
+    GENERATION_MODE = os.getenv("GENERATION_MODE", "inline") # "inline": background tasks in the API process, "worker": separate generation workers (serve.py)
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini") # Default model of every generation stage
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "") # Default model retried when a stage's model times out, empty disables fallback
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 120)) # Timeout of one LLM call before falling back
+    STAGE_MODELS = { # Per-stage model, completion token limit and temperature, see stage_model for the overrides
+        "manager": stage_model("manager", LLM_MODEL, LLM_FALLBACK_MODEL),
+        "researcher": stage_model("researcher", LLM_MODEL, LLM_FALLBACK_MODEL),
+        "checker": stage_model("checker", LLM_MODEL, LLM_FALLBACK_MODEL),
+        "writer": stage_model("writer", LLM_MODEL, LLM_FALLBACK_MODEL),
+        "editor": stage_model("editor", LLM_MODEL, LLM_FALLBACK_MODEL),
+    }
+    LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 1024)) # LLM answers cached per process for stages at temperature 0, 0 disables the cache
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 3600)) # Max age of a cached LLM answer
+    GENERATION_MAX_ACTIVE = int(os.getenv("GENERATION_MAX_ACTIVE", 8)) # Background generations per API process in "inline" mode, 0 for no limit
+    GENERATION_MAX_QUEUED = int(os.getenv("GENERATION_MAX_QUEUED", 200)) # Pending posts in "worker" mode, and queued posts, 0 for no limit
+    ADMISSION_POLICY = os.getenv("ADMISSION_POLICY", "reject") # Over capacity: "reject" with 429, or "queue" the post
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 30)) # Retry-After of rejected posts
+    GENERATION_DEADLINE_SECONDS = float(os.getenv("GENERATION_DEADLINE_SECONDS", 600)) # Wall-clock limit of one generation, 0 disables it
+    GENERATION_DEADLINE_MAX_SECONDS = int(os.getenv("GENERATION_DEADLINE_MAX_SECONDS", 3600)) # Largest deadline a post may request
+    GENERATION_WRITE_RESERVE = float(os.getenv("GENERATION_WRITE_RESERVE", 0.4)) # Share of the deadline the staged pipeline keeps for writing and editing
+    TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", 30)) # Timeout of one research tool HTTP request
+    RESEARCH_HEDGING = os.getenv("RESEARCH_HEDGING", "false").lower() in ("1", "true", "yes") # Send a backup Jina AI request when the first one is slow
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95)) # Latency percentile of recent requests after which the backup is sent
+    HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", 5)) # Hedge delay until 20 latencies are known
+    HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", 0.1)) # Max backup requests per request, the extra load hedging may add
+    RESEARCH_DEDUP = os.getenv("RESEARCH_DEDUP", "true").lower() in ("1", "true", "yes") # Drop duplicate search results and scrape each source once per generation
+    RESEARCH_NEAR_DUPLICATE_BITS = int(os.getenv("RESEARCH_NEAR_DUPLICATE_BITS", 3)) # Max SimHash distance of near-duplicate pages, -1 disables content dedup
+    GENERATION_PIPELINE = os.getenv("GENERATION_PIPELINE", "manager") # "manager": CodeAgent orchestration, "staged": fixed research, check, write, edit sequence
+    PIPELINE_MAX_RESEARCH_ROUNDS = int(os.getenv("PIPELINE_MAX_RESEARCH_ROUNDS", 2)) # Research rounds of the staged pipeline when the checker rejects
+    API_WORKERS = int(os.getenv("API_WORKERS", 2)) # API worker processes started by serve.py
+    GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", 2)) # Generation worker processes started by serve.py
+    GENERATION_DRAIN_SECONDS = float(os.getenv("GENERATION_DRAIN_SECONDS", 600)) # How long serve.py waits for in-flight generations on shutdown
+    GENERATION_HEARTBEAT_SECONDS = float(os.getenv("GENERATION_HEARTBEAT_SECONDS", 15)) # How often a process marks the posts it generates, or scheduled, as alive
+    GENERATION_STALE_SECONDS = float(os.getenv("GENERATION_STALE_SECONDS", 90)) # "pending"/"generating" posts without a heartbeat for this long are requeued
+    WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", 1.0)) # Idle wait of a generation worker when the queue is empty
+    PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "") # Directory shared by all processes for the prometheus_client multiprocess mode, so /metrics reports them all; must be set before the processes start, serve.py uses a temporary one when unset
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024)) # Responses smaller than this many bytes are sent uncompressed
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6)) # gzip compression level, 1 (fastest) to 9 (smallest)
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5)) # brotli quality, 0 (fastest) to 11 (smallest), used when the brotli package is installed
+    ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()} # Users allowed to profile requests
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.002)) # Seconds between stack samples of a profiled request
+    PROFILE_REPORTS_SIZE = int(os.getenv("PROFILE_REPORTS_SIZE", 100)) # Profiling reports kept per process
+    WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10.0)) # Timeout of one webhook delivery attempt
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 6)) # Attempts per webhook delivery, the first one included
+    WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", 2.0)) # Delay before the first retry, doubled on every retry
+    WEBHOOK_BACKOFF_MAX_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", 300.0)) # Maximum delay between webhook attempts
+    WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", 8)) # Concurrent webhook deliveries (and kept-alive connections) per process
+    WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 10000)) # Webhooks waiting for delivery per process, further ones are dropped
+    WEBHOOK_DRAIN_SECONDS = float(os.getenv("WEBHOOK_DRAIN_SECONDS", 10.0)) # How long an exiting process keeps delivering pending webhooks
+    WEBHOOK_ALLOW_PRIVATE_TARGETS = os.getenv("WEBHOOK_ALLOW_PRIVATE_TARGETS", "false").lower() in ("1", "true", "yes") # Allow webhooks to loopback/private addresses, for local development only
+    CACHE_INVALIDATION_URL = os.getenv("CACHE_INVALIDATION_URL", "") # Optional redis:// URL to share invalidations between workers
 
 settings = Settings()
@@ -0,0 +1,71 @@
+import sqlite3
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import BlogPost
+
+# Byte ranges of the markdown of a post, read without loading the whole value.
+# SQLite stores TEXT as UTF-8 and its incremental blob I/O reads a slice of a
+# value straight from the pages holding it, while length() or substr() would
+# load the whole value first. Other databases read substrings of the content
+# converted to UTF-8 bytes: the conversion happens in the database, the
+# application only ever holds one slice.
+
+def sqlite_connection(db: Session):
+    """Returns the sqlite3 connection of the session, which starts a transaction if there is none."""
+    return db.connection().connection.driver_connection
+
+def content_bytes():
+    """Returns the content column as UTF-8 bytes (PostgreSQL), so that lengths and offsets are byte positions."""
+    return func.convert_to(BlogPost.content, "UTF8")
+
+def content_info(db: Session, blog_id: int, owner_id: int):
+    """
+    Looks up the version and the length in bytes of the content of a post, without reading the content.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog_id (int): Blog post id.
+        owner_id (int): Owner the post must belong to.
+
+    Returns:
+        Optional[tuple]: Version and size in bytes, None if the post does not exist or belongs to someone else.
+    """
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    size = func.typeof(BlogPost.content) != "null" if sqlite else func.coalesce(func.length(content_bytes()), 0)
+    row = db.execute(select(BlogPost.version, size).where(BlogPost.id == blog_id, BlogPost.owner_id == owner_id)).first()
+    if row is None:
+        return None
+    version, size = row
+    if sqlite and size: # Not NULL, the blob header has the length. typeof() and blobopen() do not load the value
+        with sqlite_connection(db).blobopen(BlogPost.__tablename__, "content", blog_id, readonly=True) as blob:
+            size = len(blob)
+    return version, int(size)
+
+def read_content(db: Session, blog_id: int, version: int, offset: int, size: int) -> Optional[bytes]:
+    """
+    Reads size bytes of the UTF-8 content of a post, from byte offset.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog_id (int): Blog post id.
+        version (int): Version the read is pinned to.
+        offset (int): First byte position.
+        size (int): Bytes to read.
+
+    Returns:
+        Optional[bytes]: The bytes, None if the post was changed or deleted since version.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        try:
+            with sqlite_connection(db).blobopen(BlogPost.__tablename__, "content", blog_id, readonly=True) as blob:
+                blob.seek(offset)
+                chunk = blob.read(size)
+        except sqlite3.Error: # Deleted, or content set to NULL
+            return None
+        current = db.execute(select(BlogPost.version).where(BlogPost.id == blog_id)).scalar() # Checked after reading: versions only grow
+        return chunk if current == version else None
+    chunk = db.execute(
+        select(func.substr(content_bytes(), offset + 1, size)).where(BlogPost.id == blog_id, BlogPost.version == version) # substr() is 1-based
+    ).scalar()
+    return None if chunk is None else bytes(chunk) # psycopg2 returns bytea as memoryview
@@ -0,0 +1,115 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a generation runs out of time.
+
+    Not a TimeoutError: a fallback model must not be tried once the
+    generation itself is out of time (see app/core/llm.py).
+    """
+
+class Deadline:
+    """
+    Wall-clock limit of a generation or of one of its stages.
+
+    Attributes:
+        seconds (float): Time allowed from the start.
+        expires_at (float): time.monotonic() value at which the time is up.
+        parent (Optional[Deadline]): Enclosing deadline, never outlived.
+    """
+
+    def __init__(self, seconds: float, parent: Optional["Deadline"] = None):
+        self.seconds = seconds
+        self.parent = parent
+        self.expires_at = time.monotonic() + seconds
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+
+    def remaining(self) -> float:
+        """
+        Returns the time left, 0 once expired.
+
+        Returns:
+            float: Seconds left.
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """
+        Checks whether the time is up.
+
+        Returns:
+            bool: True once expired.
+        """
+        return time.monotonic() >= self.expires_at
+
+# Deadline of the generation running in this context, None (the default) outside generations
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bounds the LLM calls, agent steps and tool calls made inside the block.
+
+    Nested deadlines never outlive the enclosing one, so a stage can be given
+    a share of the generation's time.
+
+    Args:
+        seconds (float): Time allowed for the block.
+
+    Yields:
+        Deadline: The deadline of the block.
+    """
+    scope = Deadline(seconds, current_deadline.get())
+    token = current_deadline.set(scope)
+    try:
+        yield scope
+    finally:
+        current_deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """
+    Returns the time left before the current deadline.
+
+    Returns:
+        Optional[float]: Seconds left, None outside a deadline.
+    """
+    scope = current_deadline.get()
+    return None if scope is None else scope.remaining()
+
+def check(what: str = "generation"):
+    """
+    Raises if the current deadline has expired.
+
+    Args:
+        what (str): What was about to run, for the error message.
+
+    Raises:
+        DeadlineExceeded: If the time is up.
+    """
+    scope = current_deadline.get()
+    if scope is not None and scope.expired():
+        raise DeadlineExceeded(f"No time left for the {what} (deadline of {scope.seconds:.0f}s)")
+
+def bounded_timeout(timeout: Optional[float], what: str = "call") -> Optional[float]:
+    """
+    Shortens a timeout so that a call cannot outlive the current deadline.
+
+    Args:
+        timeout (Optional[float]): Timeout of the call, None for no timeout.
+        what (str): The call, for the error message.
+
+    Returns:
+        Optional[float]: The timeout to use, the time left when it is shorter.
+
+    Raises:
+        DeadlineExceeded: If the time is already up.
+    """
+    check(what)
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
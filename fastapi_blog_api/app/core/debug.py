@@ -0,0 +1,37 @@
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+from app.database import QueryCounter, current_query_counter
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware reporting the SQL statements of each request in debug mode.
+
+    When DEBUG is enabled, every response carries an X-SQL-Count header with
+    the number of statements executed while handling the request and an
+    X-SQL-Time header with their total time in milliseconds, which makes N+1
+    query patterns visible from any HTTP client. Statements of background
+    tasks run after the response started are not included. Outside debug
+    mode the middleware only checks the setting.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.DEBUG:
+            await self.app(scope, receive, send)
+            return
+        counter = QueryCounter()
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-SQL-Count"] = str(counter.count)
+                headers["X-SQL-Time"] = f"{counter.seconds * 1000:.3f}"
+            await send(message)
+
+        token = current_query_counter.set(counter)
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            current_query_counter.reset(token)
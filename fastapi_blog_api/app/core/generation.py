@@ -0,0 +1,500 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Tuple
+from sqlalchemy import func, or_
+from app.database import SessionLocal
+from app.models import BlogPost, User
+from app.core import ai_agent
+from app.core.cache import invalidate_post
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.rendering import render_markdown
+from app.core import deadline, metrics, webhooks
+
+logger = logging.getLogger(__name__)
+
+class GenerationRegistry:
+    """
+    Tracks the blog post generations running in this process.
+
+    Agent runs cannot be interrupted once started, so cancellation is
+    cooperative: a cancelled generation skips its remaining work and
+    discards its result instead of writing it back.
+    """
+
+    def __init__(self):
+        self._active = {} # Token of every generation in progress -> its blog id
+        self._cancelled = set() # Tokens of active generations whose result must be discarded
+        self._scheduled = 0 # Background generations scheduled in this process and not finished yet
+        self._waiting = Counter() # Blog id -> background generations scheduled for it and not started yet
+        self._lock = threading.Lock()
+
+    def start(self, blog_id: int) -> object:
+        """
+        Marks a generation as running.
+
+        Args:
+            blog_id (int): Blog post id.
+
+        Returns:
+            object: Token of this run, for is_cancelled and finish. A post put
+            back to pending while its previous run is still going has two runs,
+            and each is cancelled and finished on its own.
+        """
+        token = object()
+        with self._lock:
+            self._active[token] = blog_id
+            metrics.generations_active.inc()
+            if self._waiting[blog_id] > 1:
+                self._waiting[blog_id] -= 1
+            else:
+                self._waiting.pop(blog_id, None)
+        return token
+
+    def finish(self, token: object):
+        """
+        Marks a generation as done and forgets any cancellation.
+
+        Args:
+            token (object): Token returned by start.
+        """
+        with self._lock:
+            if self._active.pop(token, None) is not None:
+                metrics.generations_active.dec()
+            self._cancelled.discard(token)
+
+    def cancel(self, blog_ids):
+        """
+        Requests cancellation of the runs in progress for the given posts.
+
+        Runs started afterwards are not affected.
+
+        Args:
+            blog_ids (Iterable[int]): Blog post ids.
+
+        Returns:
+            List[int]: The ids that had a running generation.
+        """
+        blog_ids = set(blog_ids)
+        with self._lock:
+            running = {token: blog_id for token, blog_id in self._active.items() if blog_id in blog_ids}
+            self._cancelled.update(running)
+            return sorted(set(running.values()))
+
+    def is_cancelled(self, token: object) -> bool:
+        """
+        Checks whether a running generation was cancelled.
+
+        Args:
+            token (object): Token returned by start.
+
+        Returns:
+            bool: True if the result of the generation must be discarded.
+        """
+        with self._lock:
+            return token in self._cancelled
+
+    def active_count(self) -> int:
+        """
+        Returns the number of generations running in this process.
+
+        Returns:
+            int: Number of running generations.
+        """
+        with self._lock:
+            return len(self._active)
+
+    def add_scheduled(self, blog_id: int = None):
+        """
+        Counts a background generation scheduled in this process, until remove_scheduled.
+
+        Args:
+            blog_id (Optional[int]): Post the generation is scheduled for, None
+                when it takes its posts from the queue. The post gets heartbeats
+                until its generation starts.
+        """
+        with self._lock:
+            self._scheduled += 1
+            if blog_id is not None:
+                self._waiting[blog_id] += 1
+
+    def remove_scheduled(self):
+        """Forgets a background generation once it finished."""
+        with self._lock:
+            self._scheduled -= 1
+
+    def scheduled_count(self) -> int:
+        """
+        Returns the number of background generations scheduled in this process, waiting or running.
+
+        Returns:
+            int: Number of scheduled generations.
+        """
+        with self._lock:
+            return self._scheduled
+
+    def owned_ids(self) -> set:
+        """
+        Returns the posts this process is generating or scheduled to generate.
+
+        Returns:
+            set: Blog post ids to send heartbeats for.
+        """
+        with self._lock:
+            return set(self._active.values()) | set(self._waiting)
+
+
+generation_registry = GenerationRegistry()
+
+
+def admit_generation(db) -> str:
+    """
+    Decides whether a new post may start a generation now.
+
+    The capacity is GENERATION_MAX_ACTIVE background generations of this
+    process in "inline" mode, and GENERATION_MAX_QUEUED pending posts in
+    "worker" mode, where the workers bound the concurrency. Over capacity,
+    ADMISSION_POLICY "queue" accepts the post as "queued" while fewer than
+    GENERATION_MAX_QUEUED posts are queued; otherwise the post is rejected.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        str: "admitted", "queued" or "rejected".
+    """
+    admitted, queued = admit_generations(db, 1)
+    return "admitted" if admitted else "queued" if queued else "rejected"
+
+def admit_generations(db, count: int) -> Tuple[int, int]:
+    """
+    Decides how many of count posts may start a generation now, as admit_generation does for one.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        count (int): Posts asking for a generation.
+
+    Returns:
+        Tuple[int, int]: Posts admitted and posts queued, the others are rejected.
+    """
+    if settings.GENERATION_MODE == "inline":
+        used, limit = generation_registry.scheduled_count(), settings.GENERATION_MAX_ACTIVE
+    else:
+        used, limit = count_posts(db, "pending"), settings.GENERATION_MAX_QUEUED
+    admitted = count if not limit else min(count, max(limit - used, 0))
+    queued = 0
+    if admitted < count and settings.ADMISSION_POLICY == "queue":
+        queued = count - admitted
+        if settings.GENERATION_MAX_QUEUED:
+            queued = min(queued, max(settings.GENERATION_MAX_QUEUED - count_posts(db, "queued"), 0))
+    db.commit() # End the read transaction, a rejected request must not hold a connection until its response is sent
+    for decision, posts in (("admitted", admitted), ("queued", queued), ("rejected", count - admitted - queued)):
+        if posts:
+            metrics.admissions_total.labels(decision).inc(posts)
+    return admitted, queued
+
+def count_posts(db, status: str) -> int:
+    """
+    Counts the blog posts with a status, across users.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        status (str): Post status.
+
+    Returns:
+        int: Number of posts.
+    """
+    return db.query(func.count(BlogPost.id)).filter(BlogPost.status == status).scalar()
+
+def generate_and_update_blog(blog_id: int, topic: str, expected_status: str = "pending"):
+    """
+    Background task that calls the multi-agent AI blog writer to generate content and updates the blog post.
+
+    The agent run is bounded by the post's deadline, or GENERATION_DEADLINE_SECONDS;
+    a generation that runs out of time is marked "timed_out" rather than "failed".
+
+    The content is rendered to HTML once, here, and stored with its table
+    of contents and reading time for GET /{blog_id}/html.
+
+    Once the result is written, a signed webhook is queued for the callback
+    URL of the post or of its owner, if any.
+
+    The result is only written while the post still has the expected status,
+    so posts that were deleted, bulk-updated or cancelled in the meantime are
+    left untouched, even when they were changed by another process.
+
+    Args:
+         blog_id (int): Blog post id to update
+         topic (str): Blog post topic for AI agent
+         expected_status (str): Status of the post while it waits for content,
+             "pending" for background tasks and "generating" for claimed jobs.
+    """
+    # Create a new session for the background task.
+    db = SessionLocal() # Create a new DB session
+    run = generation_registry.start(blog_id) # Register this run so it can be cancelled
+    try: # Use a try-finally block for proper cleanup
+        blog = db.query( # Query the blog post with given id and the webhook settings of its owner
+            BlogPost.status, BlogPost.owner_id, BlogPost.callback_url, BlogPost.deadline_seconds, User.webhook_url, User.webhook_secret
+        ).join(BlogPost.owner).filter(BlogPost.id == blog_id).first()
+        if not blog or blog.status != expected_status: # Check if the blog post still waits for content
+            return  # Blog post deleted or no longer waiting, exit
+        owner_id = blog.owner_id # Keep the owner for cache invalidation
+        callback_url = blog.callback_url or blog.webhook_url # The post's own callback wins over the user's default
+        deadline_seconds = blog.deadline_seconds or settings.GENERATION_DEADLINE_SECONDS # The post's own deadline wins over the default
+        db.commit() # End the read transaction while the agent runs
+        started = time.perf_counter() # Agent run duration, reported by outcome
+        try: # Use try except block to catch AI agent errors
+            # Call the new blog writer logic; adjust the filename if needed.
+            with deadline.deadline(deadline_seconds) if deadline_seconds > 0 else nullcontext(): # Bound every agent step, LLM call and tool call
+                content = ai_agent.write_blog_post(topic, output_file=f"blog_post_{blog_id}.md") # Get the content from AI agent
+            if isinstance(content, dict):  # Handle case when agent returns a dictionary
+                if "answer" in content: # Check for "answer" key
+                    new_content = content["answer"] # If answer is present set blog content to it
+                else:
+                    new_content = str(content) # if there is no answer set blog content to string representation of content
+            elif isinstance(content, str): # Handle case when agent returns a string
+                 new_content = content # Set blog content to returned string
+            else: # Handle other types with string representation
+                new_content = str(content) # Fallback to string if content type is unknown
+
+            new_status = "completed"  # Update status to completed
+        except DeadlineExceeded as e: # Ran out of time, not an error of the pipeline
+            new_content = f"Generation timed out: {str(e)}" # Set the timeout in blog content
+            new_status = "timed_out" # Set status to timed out
+        except Exception as e: # Catch any errors during content generation
+            new_content = f"Error generating content: {str(e)}"  # Set error message in blog content
+            new_status = "failed" # Set status to failed
+
+        duration = time.perf_counter() - started # Time spent in the agent
+        rendered = render_markdown(new_content) # Rendered once instead of on every page view
+        updated = 0 # Rows written, stays 0 when the result is discarded
+        if not generation_registry.is_cancelled(run): # Discard the result if the post was deleted or updated while generating
+            updated = db.query(BlogPost).filter(BlogPost.id == blog_id, BlogPost.status == expected_status).update( # Write only if still waiting
+                {"content": new_content, "status": new_status, **rendered}, synchronize_session=False
+            )
+            db.commit() # Commit changes to DB
+        outcome = new_status if updated else "discarded" # completed, failed, timed_out or discarded
+        metrics.generations_total.labels(outcome).inc() # Count the outcome
+        metrics.generation_duration_seconds.labels(outcome).observe(duration) # Record the agent run duration
+        if updated: # Row was written
+            invalidate_post(owner_id, blog_id) # Drop any cached copy of the post
+            if callback_url and blog.webhook_secret: # Tell the client instead of letting it poll
+                webhooks.notify_generation_finished(callback_url, blog.webhook_secret, blog_id, owner_id, topic, new_status) # Queued, never waits for the receiver
+    finally: # Always close the DB session
+        generation_registry.finish(run) # Unregister this run
+        db.close() # Close the DB session
+
+def claim_next_post(db, statuses=("pending", "queued")):
+    """
+    Atomically claims the oldest waiting blog post for generation.
+
+    Pending posts come first, posts queued by admission control once none
+    are pending. The claim is a conditional UPDATE to "generating", so when
+    several worker processes race for the same row only one of them wins.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        statuses (Tuple[str, ...]): Statuses to claim from, in order of priority.
+
+    Returns:
+        Optional[Tuple[int, str]]: Id and title of the claimed post, or None if the queue is empty.
+    """
+    for waiting in statuses:
+        while True:
+            candidate = db.query(BlogPost.id, BlogPost.title).filter(BlogPost.status == waiting).order_by(BlogPost.id).first() # Oldest waiting post
+            if candidate is None: # No post left with this status
+                db.commit()
+                break
+            claimed = db.query(BlogPost).filter(BlogPost.id == candidate.id, BlogPost.status == waiting).update( # Claim it unless another worker did
+                {"status": "generating", "heartbeat_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+            if claimed:
+                return candidate.id, candidate.title
+    return None
+
+def process_next_post(statuses=("pending", "queued")) -> bool:
+    """
+    Claims and generates one waiting blog post.
+
+    Args:
+        statuses (Tuple[str, ...]): Statuses to claim from, in order of priority.
+
+    Returns:
+        bool: True if a post was processed, False if the queue was empty.
+    """
+    db = SessionLocal()
+    try:
+        claimed = claim_next_post(db, statuses)
+    finally:
+        db.close()
+    if claimed is None:
+        return False
+    blog_id, title = claimed
+    generate_and_update_blog(blog_id, title, expected_status="generating")
+    return True
+
+def run_scheduled_generation(blog_id: int, topic: str):
+    """
+    Background task of "inline" mode: generates a post, then the posts queued by admission control.
+
+    A finished generation hands its capacity to the oldest queued post
+    instead of releasing it, so queued posts start as capacity frees up
+    and the number of generations of the process never exceeds the limit.
+
+    Args:
+         blog_id (int): Blog post id to update
+         topic (str): Blog post topic for AI agent
+    """
+    try:
+        generate_and_update_blog(blog_id, topic)
+        while settings.ADMISSION_POLICY == "queue" and process_next_post(statuses=("queued",)):
+            pass
+    finally:
+        generation_registry.remove_scheduled()
+
+def requeue_abandoned_posts(statuses=("generating",), requeued_status: str = "pending", stale_seconds: float = None) -> int:
+    """
+    Puts posts abandoned by stopped processes back in the queue.
+
+    Every process sends heartbeats for the posts it is generating, or holds
+    a background task for (see send_heartbeats), so a post is only requeued
+    when no heartbeat came for stale_seconds. Generations running in this
+    process, in other API processes or in workers on other hosts are never
+    taken over, as long as their process is alive.
+
+    Args:
+        statuses (Tuple[str, ...]): Statuses of the abandoned posts.
+        requeued_status (str): Status they are put back in.
+        stale_seconds (Optional[float]): Time without a heartbeat after which a post is abandoned, defaults to GENERATION_STALE_SECONDS.
+
+    Returns:
+        int: Number of requeued posts.
+    """
+    stale_seconds = settings.GENERATION_STALE_SECONDS if stale_seconds is None else stale_seconds
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    db = SessionLocal()
+    try:
+        requeued = db.query(BlogPost).filter(
+            BlogPost.status.in_(statuses), or_(BlogPost.heartbeat_at.is_(None), BlogPost.heartbeat_at < cutoff) # No heartbeat for too long
+        ).update({"status": requeued_status}, synchronize_session=False)
+        db.commit()
+        if requeued:
+            logger.warning("Requeued %d generations abandoned by a stopped process", requeued)
+        return requeued
+    finally:
+        db.close()
+
+def send_heartbeats(blog_ids: Iterable[int]) -> int:
+    """
+    Marks posts as alive, so other processes do not requeue them.
+
+    The version is kept, a heartbeat does not change the representation.
+
+    Args:
+        blog_ids (Iterable[int]): Posts this process is generating or scheduled to generate.
+
+    Returns:
+        int: Number of posts marked.
+    """
+    blog_ids = list(blog_ids)
+    if not blog_ids:
+        return 0
+    db = SessionLocal()
+    try:
+        marked = db.query(BlogPost).filter(BlogPost.id.in_(blog_ids), BlogPost.status.in_(("pending", "generating"))).update(
+            {"heartbeat_at": datetime.utcnow(), "version": BlogPost.version}, synchronize_session=False
+        )
+        db.commit()
+        return marked
+    finally:
+        db.close()
+
+def start_heartbeats(recover: Callable[[], object] = None) -> threading.Event:
+    """
+    Sends heartbeats for the posts of this process every GENERATION_HEARTBEAT_SECONDS, from a daemon thread.
+
+    Args:
+        recover (Optional[Callable]): Called after every heartbeat to pick up
+            posts abandoned by a stopped process, e.g. requeue_abandoned_posts.
+
+    Returns:
+        threading.Event: Set it to stop the heartbeats.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(settings.GENERATION_HEARTBEAT_SECONDS):
+            try:
+                send_heartbeats(generation_registry.owned_ids())
+                if recover is not None:
+                    recover()
+            except Exception: # Keep beating through database hiccups
+                logger.exception("Generation heartbeat failed")
+
+    threading.Thread(target=beat, name="generation-heartbeat", daemon=True).start()
+    return stop
+
+def drain_queued_posts():
+    """Generates queued posts until none is left, then releases the generation slot taken for it."""
+    try:
+        while process_next_post(statuses=("queued",)):
+            pass
+    finally:
+        generation_registry.remove_scheduled()
+
+def resume_inline_generations() -> int:
+    """
+    Restarts the generations "inline" API processes lost when they stopped.
+
+    Background tasks do not survive a restart, so posts left "generating" or
+    "pending" without a heartbeat for GENERATION_STALE_SECONDS are queued
+    again, and threads generate the queued posts, each taking a generation
+    slot like a background task, up to GENERATION_MAX_ACTIVE. The app
+    lifespan calls it on startup and after every heartbeat, so posts of a
+    process that stopped recently are picked up once they go stale.
+
+    Returns:
+        int: Number of posts waiting for generation.
+    """
+    requeue_abandoned_posts(statuses=("generating", "pending"), requeued_status="queued")
+    db = SessionLocal()
+    try:
+        waiting = count_posts(db, "queued")
+    finally:
+        db.close()
+    free = settings.GENERATION_MAX_ACTIVE - generation_registry.scheduled_count() if settings.GENERATION_MAX_ACTIVE else waiting
+    for _ in range(min(waiting, free)):
+        generation_registry.add_scheduled() # Counted by admission control until the thread finishes
+        threading.Thread(target=drain_queued_posts, name="generation-resume", daemon=True).start()
+    return waiting
+
+def run_worker(stop_event, poll_interval: float = 1.0):
+    """
+    Generation worker loop: processes pending posts until stop_event is set.
+
+    A job that is running when the stop is requested is finished before the
+    loop exits, so shutting down drains in-flight work instead of losing it.
+    The worker sends heartbeats for its job and requeues the jobs of workers
+    that stopped sending them.
+
+    Args:
+        stop_event (threading.Event or multiprocessing.Event): Set to request a graceful stop.
+        poll_interval (float): Seconds to wait when the queue is empty.
+    """
+    heartbeats = start_heartbeats(recover=requeue_abandoned_posts)
+    try:
+        while not stop_event.is_set():
+            try:
+                processed = process_next_post()
+            except Exception: # Keep the worker alive on database hiccups
+                logger.exception("Generation worker iteration failed")
+                processed = False
+            if not processed:
+                stop_event.wait(poll_interval) # Idle until the next poll or a stop request
+    finally:
+        heartbeats.set()
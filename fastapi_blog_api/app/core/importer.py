@@ -0,0 +1,207 @@
+import bz2
+import gzip
+import json
+import lzma
+import os
+import tarfile
+import time
+import zlib
+from sqlalchemy import insert
+from app.models import BlogPost
+
+MAX_TITLE_LENGTH = 150 # Matches BlogPost.title
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+MAX_REPORTED_ERRORS = 20 # Errors kept in the import report, the rest are only counted
+
+class InvalidPost(ValueError):
+    """Raised when an imported record cannot be turned into a blog post."""
+
+class CorruptUpload(ValueError):
+    """
+    Raised when an upload cannot be read to its end, such as a truncated or corrupt archive.
+
+    Attributes:
+        imported (int): Posts stored before the error, set by import_posts.
+    """
+
+    def __init__(self, message: str, imported: int = 0):
+        super().__init__(message)
+        self.imported = imported
+
+def make_post(title, content) -> dict:
+    """
+    Validates an imported record.
+
+    Args:
+        title (Any): Title of the post.
+        content (Any): Markdown content of the post.
+
+    Returns:
+        dict: Title and content of the post.
+
+    Raises:
+        InvalidPost: If the title is missing or too long, or the content is not text.
+    """
+    if not isinstance(title, str) or not title.strip():
+        raise InvalidPost("missing title")
+    if len(title) > MAX_TITLE_LENGTH:
+        raise InvalidPost(f"title longer than {MAX_TITLE_LENGTH} characters")
+    if content is not None and not isinstance(content, str):
+        raise InvalidPost("content must be a string")
+    return {"title": title.strip(), "content": content or ""}
+
+def iter_ndjson_posts(fileobj):
+    """
+    Reads posts from newline-delimited JSON objects with "title" and "content" keys.
+
+    Args:
+        fileobj (BinaryIO): NDJSON stream.
+
+    Yields:
+        Union[dict, InvalidPost]: A post, or the error of an invalid line.
+    """
+    for line_number, line in enumerate(fileobj, start=1):
+        if not line.strip(): # Skip blank lines
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise InvalidPost("expected a JSON object")
+            yield make_post(record.get("title"), record.get("content"))
+        except (ValueError, InvalidPost) as e: # json.JSONDecodeError is a ValueError
+            yield InvalidPost(f"line {line_number}: {e}")
+
+def title_from_markdown(name: str, content: str) -> str:
+    """
+    Picks the title of a markdown file: its first level-one heading, else the file name.
+
+    Args:
+        name (str): Path of the file in the archive.
+        content (str): Markdown content.
+
+    Returns:
+        str: The title.
+    """
+    for line in content.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip()
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem.replace("-", " ").replace("_", " ")
+
+def open_compressed(fileobj):
+    """
+    Wraps a gzip, bzip2 or xz stream in its decompressing reader.
+
+    Unlike the decompression of tarfile streams, these readers raise EOFError
+    when the stream ends early, so a truncated upload is not mistaken for a
+    shorter archive.
+
+    Args:
+        fileobj (BinaryIO): Seekable stream, compressed or not.
+
+    Returns:
+        BinaryIO: The decompressed stream, fileobj itself when it is not compressed.
+    """
+    magic = fileobj.read(6)
+    fileobj.seek(0)
+    if magic.startswith(b"\x1f\x8b"):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if magic.startswith(b"BZh"):
+        return bz2.BZ2File(fileobj)
+    if magic.startswith(b"\xfd7zXZ\x00"):
+        return lzma.LZMAFile(fileobj)
+    return fileobj
+
+def iter_tar_posts(fileobj):
+    """
+    Reads posts from a tar archive (optionally gzip/bz2/xz compressed) of markdown files.
+
+    The archive is read sequentially, only the compression is detected by seeking back to the start.
+
+    Args:
+        fileobj (BinaryIO): Tar stream.
+
+    Yields:
+        Union[dict, InvalidPost]: A post, or the error of an invalid file.
+
+    Raises:
+        CorruptUpload: If the archive or its compression is truncated or corrupt.
+    """
+    try:
+        stream = open_compressed(fileobj)
+        with tarfile.open(fileobj=stream, mode="r|") as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(MARKDOWN_SUFFIXES):
+                    continue
+                try:
+                    content = archive.extractfile(member).read().decode("utf-8")
+                    yield make_post(title_from_markdown(member.name, content), content)
+                except (UnicodeDecodeError, InvalidPost) as e:
+                    yield InvalidPost(f"{member.name}: {e}")
+        while stream.read(1024 * 1024): # Decompress to the end, past the end-of-archive blocks, to detect a truncated stream
+            pass
+    except (tarfile.TarError, EOFError, OSError, zlib.error, lzma.LZMAError) as e: # gzip.BadGzipFile and bz2 errors are OSErrors
+        raise CorruptUpload(f"unreadable archive: {e}") from e
+
+def import_posts(db, owner_id: int, posts, chunk_size: int = 1000, progress=None) -> dict:
+    """
+    Inserts posts as completed blog posts using multi-row inserts, one transaction per chunk.
+
+    No generation is scheduled for imported posts.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        owner_id (int): ID of the user owning the imported posts.
+        posts (Iterable[Union[dict, InvalidPost]]): Posts from iter_ndjson_posts or iter_tar_posts.
+        chunk_size (int): Number of posts per INSERT statement and transaction.
+        progress (Optional[Callable[[int, float], None]]): Called after every chunk with the
+            number of imported posts and the elapsed seconds.
+
+    Returns:
+        dict: imported, skipped, errors, seconds and posts_per_second.
+
+    Raises:
+        CorruptUpload: If posts cannot be read to the end. The posts read
+            before the error are stored, and counted in its imported attribute.
+    """
+    start = time.perf_counter()
+    imported = 0
+    skipped = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        db.execute(insert(BlogPost), chunk) # executemany, rendered as multi-row INSERT batches
+        db.commit() # One transaction per chunk keeps locks and rollback segments small
+        imported += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(imported, time.perf_counter() - start)
+
+    try:
+        for post in posts:
+            if isinstance(post, InvalidPost):
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(str(post))
+                continue
+            chunk.append({**post, "status": "completed", "owner_id": owner_id})
+            if len(chunk) >= chunk_size:
+                flush()
+    except CorruptUpload as e:
+        if chunk: # Keep every post read before the error, as earlier chunks are
+            flush()
+        e.imported = imported
+        raise
+    if chunk:
+        flush()
+
+    seconds = time.perf_counter() - start
+    return {
+        "imported": imported,
+        "skipped": skipped,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "posts_per_second": round(imported / seconds, 1) if seconds else 0.0,
+    }
@@ -0,0 +1,234 @@
+import contextvars
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from typing import Callable, Optional
+from smolagents import LiteLLMModel
+from smolagents.models import ChatMessage, Model, get_tool_json_schema
+from app.core import deadline, metrics
+from app.core.cache import llm_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NON_SAMPLING_PARAMETERS = {"timeout", "api_key", "api_base"} # Completion parameters that do not change the answer
+
+# True while the LLM response cache is bypassed, see bypass_llm_cache
+llm_cache_bypassed = contextvars.ContextVar("llm_cache_bypassed", default=False)
+
+@contextmanager
+def bypass_llm_cache():
+    """
+    Sends every LLM call made inside the block to the model, without reading or filling the cache.
+
+    The bypass follows the context, so it covers the agent calls of a
+    generation started inside the block.
+    """
+    token = llm_cache_bypassed.set(True)
+    try:
+        yield
+    finally:
+        llm_cache_bypassed.reset(token)
+
+def is_timeout(error: Exception) -> bool:
+    """
+    Checks whether an LLM call failed because it timed out.
+
+    Args:
+        error (Exception): Error raised by the model.
+
+    Returns:
+        bool: True for litellm/OpenAI timeouts and TimeoutError.
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    try:
+        import litellm
+    except ImportError: # pragma: no cover - smolagents' LiteLLMModel needs it anyway
+        return False
+    return isinstance(error, litellm.Timeout)
+
+class FallbackModel(Model):
+    """
+    Model that retries a call on a fallback model when the primary one times out.
+
+    Other errors are raised as is, a fallback only helps when the primary
+    model is slow or overloaded. Token counts are those of the model that
+    answered, so agent monitoring keeps working.
+
+    Attributes:
+        stage (str): Generation stage, for the fallback metric.
+        primary (Model): Model tried first.
+        fallback (Model): Model used when the primary one times out.
+    """
+
+    def __init__(self, stage: str, primary: Model, fallback: Model):
+        super().__init__()
+        self.stage = stage
+        self.primary = primary
+        self.fallback = fallback
+        self.model_id = getattr(primary, "model_id", None)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs) -> ChatMessage:
+        try:
+            return self._answer(self.primary, messages, stop_sequences, grammar, tools_to_call_from, **kwargs)
+        except Exception as e:
+            if not is_timeout(e):
+                raise
+            logger.warning("%s model %s timed out, falling back to %s", self.stage, self.model_id, getattr(self.fallback, "model_id", None))
+            metrics.llm_fallbacks_total.labels(self.stage).inc()
+            return self._answer(self.fallback, messages, stop_sequences, grammar, tools_to_call_from, **kwargs)
+
+    def _answer(self, model, messages, stop_sequences, grammar, tools_to_call_from, **kwargs) -> ChatMessage:
+        message = model(messages, stop_sequences=stop_sequences, grammar=grammar, tools_to_call_from=tools_to_call_from, **kwargs)
+        self.last_input_token_count = model.last_input_token_count
+        self.last_output_token_count = model.last_output_token_count
+        return message
+
+class DeadlineModel(Model):
+    """
+    Model whose calls never outlive the deadline of the running generation.
+
+    Each call gets the smaller of the configured timeout and the time left
+    (see app/core/deadline.py), and a call that times out once the deadline
+    has passed raises DeadlineExceeded instead of a timeout, so no fallback
+    model is tried.
+
+    Attributes:
+        stage (str): Generation stage, for error messages.
+        model (Model): Wrapped model.
+        timeout (Optional[float]): Configured timeout of one call.
+    """
+
+    def __init__(self, stage: str, model: Model, timeout: Optional[float]):
+        super().__init__()
+        self.stage = stage
+        self.model = model
+        self.timeout = timeout
+        self.model_id = getattr(model, "model_id", None)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs) -> ChatMessage:
+        what = f"{self.stage} LLM call"
+        kwargs["timeout"] = deadline.bounded_timeout(kwargs.get("timeout", self.timeout), what)
+        try:
+            message = self.model(messages, stop_sequences=stop_sequences, grammar=grammar, tools_to_call_from=tools_to_call_from, **kwargs)
+        except Exception as e:
+            if is_timeout(e):
+                deadline.check(what)
+            raise
+        self.last_input_token_count = self.model.last_input_token_count
+        self.last_output_token_count = self.model.last_output_token_count
+        return message
+
+def _plain(value):
+    """Converts message content, MessageRole members and dataclasses to JSON types for hashing."""
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, "value") and isinstance(getattr(value, "value"), str): # Enum members such as MessageRole
+        return value.value
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+class CachingModel(Model):
+    """
+    Model that serves byte-identical prompts from the LLM response cache.
+
+    The key is a SHA-256 hash of the model id, the messages, the tool
+    schemas, the stop sequences and grammar and every sampling parameter,
+    so any change to the request is a miss. Only deterministic calls are
+    cached: a call whose temperature is not 0 always goes to the model.
+    Pass use_cache=False to a call, or run it inside bypass_llm_cache(),
+    to skip the cache. Answers are stored without the raw API response and
+    returned as copies, so callers may modify them.
+
+    Attributes:
+        stage (str): Generation stage, for the cache metrics.
+        model (Model): Wrapped model.
+        parameters (dict): Completion parameters the wrapped model was built with.
+        cache (LRUCache): Shared, size-bounded store with TTL.
+    """
+
+    def __init__(self, stage: str, model: Model, parameters: dict, cache=llm_cache):
+        super().__init__()
+        self.stage = stage
+        self.model = model
+        self.parameters = parameters
+        self.cache = cache
+        self.model_id = getattr(model, "model_id", None)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, use_cache: bool = True, **kwargs) -> ChatMessage:
+        parameters = {**self.parameters, **kwargs}
+        if not use_cache or llm_cache_bypassed.get() or parameters.get("temperature") != 0:
+            metrics.llm_cache_requests_total.labels(self.stage, "bypass").inc()
+            return self._answer(messages, stop_sequences, grammar, tools_to_call_from, **kwargs)
+        key = self.cache_key(messages, stop_sequences, grammar, tools_to_call_from, parameters)
+        entry = self.cache.get(key)
+        if entry is not None:
+            metrics.llm_cache_requests_total.labels(self.stage, "hit").inc()
+            self.last_input_token_count, self.last_output_token_count = entry["tokens"]
+            return ChatMessage.from_dict(json.loads(entry["message"]))
+        metrics.llm_cache_requests_total.labels(self.stage, "miss").inc()
+        message = self._answer(messages, stop_sequences, grammar, tools_to_call_from, **kwargs)
+        self.cache.set(key, {
+            "message": message.model_dump_json(),
+            "tokens": (self.last_input_token_count, self.last_output_token_count),
+        })
+        return message
+
+    def cache_key(self, messages, stop_sequences, grammar, tools_to_call_from, parameters) -> str:
+        """
+        Hashes everything that determines the answer of a call.
+
+        Returns:
+            str: Hex SHA-256 digest.
+        """
+        request = {
+            "model": self.model_id,
+            "messages": _plain(messages),
+            "tools": [get_tool_json_schema(tool) for tool in tools_to_call_from or []],
+            "stop": stop_sequences,
+            "grammar": grammar,
+            "parameters": {name: _plain(value) for name, value in parameters.items() if name not in NON_SAMPLING_PARAMETERS},
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _answer(self, messages, stop_sequences, grammar, tools_to_call_from, **kwargs) -> ChatMessage:
+        message = self.model(messages, stop_sequences=stop_sequences, grammar=grammar, tools_to_call_from=tools_to_call_from, **kwargs)
+        self.last_input_token_count = self.model.last_input_token_count
+        self.last_output_token_count = self.model.last_output_token_count
+        return message
+
+def build_model(stage: str, config: Optional[dict] = None, factory: Callable[..., Model] = LiteLLMModel) -> Model:
+    """
+    Builds the model of a generation stage from its configuration.
+
+    Args:
+        stage (str): Stage name: manager, researcher, checker, writer or editor.
+        config (dict, optional): model, max_tokens, temperature and fallback_model,
+            defaults to the stage's entry in STAGE_MODELS.
+        factory (Callable[..., Model]): Model class, called with model_id and the
+            completion parameters. Benchmarks pass the offline model.
+
+    Returns:
+        Model: The stage's model, wrapped in a FallbackModel when a fallback is
+        configured. Every call is bounded by the generation deadline. Stages configured at temperature 0 read and fill the LLM response
+        cache, per model, so a fallback answer is never served for the primary model.
+    """
+    config = settings.STAGE_MODELS[stage] if config is None else config
+    parameters = {name: config[name] for name in ("max_tokens", "temperature") if config.get(name) is not None} # Unset values keep the provider defaults
+    parameters["timeout"] = settings.LLM_TIMEOUT_SECONDS
+
+    def make(model_id: str) -> Model:
+        model = DeadlineModel(stage, factory(model_id=model_id, **parameters), parameters["timeout"])
+        if settings.LLM_CACHE_SIZE > 0 and config.get("temperature") == 0: # Only deterministic answers are worth replaying
+            model = CachingModel(stage, model, parameters)
+        return model
+
+    model = make(config["model"])
+    if config.get("fallback_model") and config["fallback_model"] != config["model"]:
+        model = FallbackModel(stage, model, make(config["fallback_model"]))
+    return model
@@ -0,0 +1,177 @@
+import os
+import time
+from typing import Optional
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest, multiprocess
+from app.core.config import settings
+
+disable_created_metrics() # No *_created series, they double the series count for nothing Prometheus needs
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GENERATION_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0)
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route template.", ("method", "route", "status"), buckets=DEFAULT_BUCKETS
+)
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "Duration of SQL statements by statement type.", ("operation",), buckets=DEFAULT_BUCKETS
+)
+blog_posts = Gauge(
+    "blog_posts", "Blog posts by status, counted at scrape time.", ("status",), multiprocess_mode="mostrecent" # Counted alike by every process, not added up
+)
+generation_queue_depth = Gauge(
+    "blog_generation_queue_depth", "Blog posts waiting for generation (status pending or queued).", multiprocess_mode="mostrecent"
+)
+generations_active = Gauge(
+    "blog_generations_active", "Generations running.", multiprocess_mode="livesum" # Running processes only
+)
+generations_total = Counter(
+    "blog_generations_total", "Finished generations by outcome (completed, failed, timed_out, discarded).", ("outcome",)
+)
+generation_duration_seconds = Histogram(
+    "blog_generation_duration_seconds", "Duration of AI agent runs by outcome.", ("outcome",), buckets=GENERATION_BUCKETS
+)
+generation_stage_duration_seconds = Histogram(
+    "blog_generation_stage_duration_seconds", "Duration of each agent stage (research, checking, writing, editing).", ("stage",), buckets=GENERATION_BUCKETS
+)
+admissions_total = Counter(
+    "blog_admissions_total", "Post creations by admission control decision (admitted, queued, rejected).", ("decision",)
+)
+generation_degraded_total = Counter(
+    "blog_generation_degraded_total", "Generations that cut a stage short to meet their deadline (research stopped early, editing skipped), by stage.", ("stage",)
+)
+llm_fallbacks_total = Counter(
+    "blog_llm_fallbacks_total", "LLM calls retried on the fallback model after a timeout, by stage.", ("stage",)
+)
+llm_cache_requests_total = Counter(
+    "blog_llm_cache_requests_total", "LLM calls by response cache result (hit, miss, bypass).", ("stage", "result")
+)
+research_duplicates_total = Counter(
+    "blog_research_duplicates_total", "Research results deduplicated, by kind (search_result dropped, scrape avoided, near_duplicate page omitted).", ("kind",)
+)
+research_hedges_total = Counter(
+    "blog_research_hedges_total", "Backup research requests, by endpoint and outcome (sent, won by the backup, denied by the budget).", ("endpoint", "outcome")
+)
+research_request_duration_seconds = Histogram(
+    "blog_research_request_duration_seconds", "Duration of research tool HTTP requests, hedges included, by endpoint.", ("endpoint",), buckets=DEFAULT_BUCKETS
+)
+webhook_deliveries_total = Counter(
+    "blog_webhook_deliveries_total", "Webhook delivery attempts by outcome (delivered, retried, failed, dropped).", ("outcome",)
+)
+webhook_delivery_duration_seconds = Histogram(
+    "blog_webhook_delivery_duration_seconds", "Duration of webhook delivery attempts.", buckets=DEFAULT_BUCKETS
+)
+webhook_queue_depth = Gauge(
+    "blog_webhook_queue_depth", "Webhook deliveries queued, in flight or waiting for a retry.", multiprocess_mode="livesum"
+)
+
+def render() -> bytes:
+    """
+    Renders the metrics in Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR, the values of every process (API and
+    generation workers) are read from that directory: counters and
+    histograms are added up, exited processes included, and each gauge is
+    combined as its multiprocess_mode says. Otherwise only the values of
+    this process are rendered.
+
+    Returns:
+        bytes: The exposition text.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry() # A fresh registry per scrape, as multiprocess mode requires
+        multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def mark_process_dead(pid: Optional[int] = None):
+    """
+    Drops the live gauges of an exited process from PROMETHEUS_MULTIPROC_DIR, if it is set.
+
+    Its counters and histograms stay in the totals.
+
+    Args:
+        pid (Optional[int]): Process id, this process when None.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), settings.PROMETHEUS_MULTIPROC_DIR)
+
+def sample_value(name: str, **labels) -> float:
+    """
+    Returns the current value of a sample recorded by this process.
+
+    Args:
+        name (str): Sample name, e.g. "blog_generations_total" or "http_request_duration_seconds_count".
+        **labels: Label values of the sample.
+
+    Returns:
+        float: The value, 0 when the sample was never recorded.
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def sql_operation(statement: str) -> str:
+    """
+    Classifies a SQL statement for the operation label.
+
+    Args:
+        statement (str): SQL text.
+
+    Returns:
+        str: "select", "insert", "update", "delete" or "other".
+    """
+    verb = statement.lstrip()[:6].upper()
+    return verb.lower() if verb in SQL_OPERATIONS else "other"
+
+def route_template(scope) -> str:
+    """
+    Returns the path template of the route that handled a request.
+
+    The template is the path of the matched route, e.g. /api/v1/blogs/5
+    becomes /api/v1/blogs/{blog_id}, so the number of label values stays
+    bounded by the number of routes. Routes of an included router may only
+    know their path below the router prefix, which is then taken from the
+    leading segments of the request path.
+
+    Args:
+        scope (dict): ASGI scope after the request was handled.
+
+    Returns:
+        str: The template, or "unmatched" when no route matched.
+    """
+    route = scope.get("route") # Set by the router once a route matched
+    if route is None or not hasattr(route, "path"):
+        return "unmatched"
+    segments = scope["path"].split("/")
+    route_segments = route.path.count("/")
+    prefix = "/".join(segments[:len(segments) - route_segments]) if route_segments else scope["path"]
+    return prefix + route.path
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request.
+
+    The route label is the path template (see route_template), not the raw
+    path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500 # Reported if the app raises before responding
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration_seconds.labels(scope["method"], route_template(scope), str(status_code)).observe(time.perf_counter() - start)
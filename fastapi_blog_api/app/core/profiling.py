@@ -0,0 +1,264 @@
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import parse_qs
+from starlette.datastructures import Headers, MutableHeaders
+from app.core import security
+from app.core.config import settings
+
+PROFILE_HEADER = "x-profile" # Request header enabling profiling, e.g. "X-Profile: 1"
+PROFILE_QUERY_PARAMETER = "profile" # Query parameter enabling profiling, e.g. "?profile=1"
+MAX_STACK_DEPTH = 40 # Frames kept per sampled stack, from the innermost outwards
+TOP_ENTRIES = 25 # Functions and stacks kept in a report
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # The app package directory
+
+# Profile of the current request, None (the default) when the request is not profiled
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+def is_admin(username: Optional[str]) -> bool:
+    """
+    Checks whether a username is listed in ADMIN_USERNAMES.
+
+    Args:
+        username (Optional[str]): Username to check.
+
+    Returns:
+        bool: True for administrators.
+    """
+    return bool(username) and username in settings.ADMIN_USERNAMES
+
+class RequestProfile:
+    """
+    Collects the timings of one profiled request.
+
+    SQL statements are added by the engine hooks in app/database.py and
+    named spans by profile_span. A sampler thread records the Python stacks
+    of the threads the request runs on: the event loop thread while the
+    request's own task is running, and the threadpool threads on which it
+    executed SQL or a span.
+
+    Attributes:
+        id (str): Report id, returned in the X-Profile-Id header.
+        interval (float): Sampling interval in seconds.
+    """
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.status = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.dependencies_resolved = None
+        self.spans = {}
+        self.statements = []
+        self.threads = {threading.get_ident()}
+        self._loop_thread = threading.get_ident()
+        self._stacks = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id[:8]}", daemon=True)
+
+    def start(self):
+        """Starts the sampler thread."""
+        self._sampler.start()
+
+    def stop(self):
+        """Stops the sampler thread and waits for it."""
+        self._stop.set()
+        self._sampler.join()
+        self.finished = time.perf_counter()
+
+    def add_statement(self, statement: str, seconds: float):
+        """Records an executed SQL statement."""
+        self.threads.add(threading.get_ident())
+        self.statements.append({"statement": statement, "ms": round(seconds * 1000, 3)})
+
+    def add_span(self, name: str, seconds: float):
+        """Adds the duration of a named span, summing repeated spans."""
+        self.threads.add(threading.get_ident())
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def mark_dependencies_resolved(self):
+        """Records the end of dependency resolution, the first call wins."""
+        if self.dependencies_resolved is None:
+            self.dependencies_resolved = time.perf_counter()
+
+    def _sample(self):
+        own_thread = threading.get_ident()
+        marker = ProfilingMiddleware._profiled_call.__code__
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or thread_id not in self.threads:
+                    continue
+                stack = []
+                in_request = thread_id != self._loop_thread # Threadpool threads are attributed to the request
+                while frame is not None:
+                    if frame.f_code is marker:
+                        in_request = True # The event loop is running this request's task
+                    if len(stack) < MAX_STACK_DEPTH:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({self._short_path(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if in_request:
+                    self._stacks[tuple(reversed(stack))] += 1
+                    self._samples += 1
+
+    @staticmethod
+    def _short_path(filename: str) -> str:
+        if filename.startswith(APP_ROOT):
+            return "app" + filename[len(APP_ROOT):]
+        return os.path.basename(filename)
+
+    def report(self) -> dict:
+        """
+        Builds the profile report.
+
+        Returns:
+            dict: Request, timing, SQL and sampling sections.
+        """
+        own_time = Counter()
+        for stack, count in self._stacks.items():
+            own_time[stack[-1]] += count # Samples where the function itself was running
+        total = self._samples or 1
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "total_ms": round((self.finished - self.started) * 1000, 3),
+            "dependencies_ms": round((self.dependencies_resolved - self.started) * 1000, 3) if self.dependencies_resolved else None,
+            "spans_ms": {name: round(seconds * 1000, 3) for name, seconds in self.spans.items()},
+            "sql": {
+                "count": len(self.statements),
+                "total_ms": round(sum(statement["ms"] for statement in self.statements), 3),
+                "statements": self.statements,
+            },
+            "sampling": {
+                "interval_ms": self.interval * 1000,
+                "samples": self._samples,
+                "top_functions": [
+                    {"function": function, "samples": count, "percent": round(count * 100 / total, 1)}
+                    for function, count in own_time.most_common(TOP_ENTRIES)
+                ],
+                "top_stacks": [
+                    {"stack": list(stack), "samples": count}
+                    for stack, count in self._stacks.most_common(TOP_ENTRIES)
+                ],
+            },
+        }
+
+@contextmanager
+def profile_span(name: str):
+    """
+    Times a block as a named span of the current request profile.
+
+    Costs a single context variable lookup when the request is not profiled.
+
+    Args:
+        name (str): Span name, e.g. "auth".
+    """
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, time.perf_counter() - start)
+
+def profiled(name: str, resolves_dependencies: bool = False):
+    """
+    Decorates an async dependency so its duration is reported as a span.
+
+    Args:
+        name (str): Span name, e.g. "auth".
+        resolves_dependencies (bool): Whether the dependency is the last one
+            resolved before the endpoint runs; its end is then reported as
+            the end of dependency resolution.
+
+    Returns:
+        Callable: The decorator. The wrapper keeps the signature FastAPI inspects.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None: # Not profiled, one context variable lookup
+                return await func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profile.add_span(name, time.perf_counter() - start)
+                if resolves_dependencies:
+                    profile.mark_dependencies_resolved()
+        return wrapper
+    return decorator
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it.
+
+    Profiling is enabled per request with an "X-Profile: 1" header or a
+    "profile=1" query flag, and only for requests authenticated as one of
+    ADMIN_USERNAMES. The report is stored in the given cache and its id is
+    returned in the X-Profile-Id response header. Requests without the flag
+    only pay for a header and query string check.
+    """
+
+    def __init__(self, app, reports):
+        self.app = app
+        self.reports = reports # LRUCache of finished reports keyed by profile id
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not self._admin(headers.get("authorization")):
+            await self.app(scope, receive, send) # Ignore the flag for everyone else
+            return
+        await self._profiled_call(scope, receive, send)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get(PROFILE_QUERY_PARAMETER, [""])[-1].lower() in ("1", "true", "yes"): # Not ?noprofile=1 or ?profile=10
+            return True
+        return any(name == PROFILE_HEADER.encode() and value not in (b"", b"0") for name, value in scope["headers"])
+
+    @staticmethod
+    def _admin(authorization: Optional[str]) -> bool:
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        payload = security.decode_access_token(token)
+        return bool(payload) and is_admin(payload.get("sub"))
+
+    async def _profiled_call(self, scope, receive, send):
+        profile = RequestProfile(scope["method"], scope["path"], settings.PROFILE_SAMPLE_INTERVAL)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(raw=message["headers"])["X-Profile-Id"] = profile.id
+            await send(message)
+
+        token = current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            current_profile.reset(token)
+            profile.stop()
+            self.reports.set(profile.id, profile.report())
@@ -0,0 +1,138 @@
+import math
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Optional
+from markdown_it import MarkdownIt
+from sqlalchemy import bindparam, select, update
+from app.core.config import settings
+from app.models import BlogPost
+
+# Raw HTML in the markdown is escaped, and markdown-it refuses javascript:, vbscript: and file: links
+markdown = MarkdownIt("commonmark", {"html": False}).enable(["table", "strikethrough"])
+WORD_TOKENS = ("text", "code_inline") # Inline tokens whose words are read
+BLOCK_WORD_TOKENS = ("fence", "code_block")
+EXTERNAL_LINK = re.compile(r"^https?://", re.IGNORECASE)
+
+def slugify(title: str, taken: set) -> str:
+    """
+    Builds a unique anchor id for a heading.
+
+    Args:
+        title (str): Plain text of the heading.
+        taken (set): Ids already used in the post, updated.
+
+    Returns:
+        str: Lowercase id, suffixed with -2, -3... when the heading repeats.
+    """
+    base = re.sub(r"[\s_-]+", "-", re.sub(r"[^\w\s-]", "", title.lower())).strip("-") or "section"
+    slug, n = base, 1
+    while slug in taken:
+        n += 1
+        slug = f"{base}-{n}"
+    taken.add(slug)
+    return slug
+
+def render_markdown(content: Optional[str]) -> dict:
+    """
+    Renders the markdown of a post to sanitized HTML, with its table of contents and reading time.
+
+    Headings get anchor ids, listed in the table of contents, and external
+    links get rel="nofollow noopener". Runs in bulk re-render worker
+    processes, so it only depends on the module-level parser.
+
+    Args:
+        content (Optional[str]): Markdown content of the post.
+
+    Returns:
+        dict: content_html, toc (list of level, id and title) and
+        reading_time_minutes, named after the BlogPost columns.
+    """
+    tokens = markdown.parse(content or "")
+    toc = []
+    taken = set()
+    words = 0
+    for index, token in enumerate(tokens):
+        if token.type == "inline":
+            for child in token.children or ():
+                if child.type in WORD_TOKENS:
+                    words += len(child.content.split())
+                elif child.type == "link_open" and EXTERNAL_LINK.match(child.attrGet("href") or ""):
+                    child.attrSet("rel", "nofollow noopener")
+        elif token.type in BLOCK_WORD_TOKENS:
+            words += len(token.content.split())
+        elif token.type == "heading_open":
+            title = "".join(child.content for child in tokens[index + 1].children or () if child.type in WORD_TOKENS).strip()
+            slug = slugify(title, taken)
+            token.attrSet("id", slug)
+            toc.append({"level": int(token.tag[1]), "id": slug, "title": title})
+    return {
+        "content_html": markdown.renderer.render(tokens, markdown.options, {}),
+        "toc": toc,
+        "reading_time_minutes": math.ceil(words / settings.READING_WORDS_PER_MINUTE),
+    }
+
+def rerender_posts(db, workers: int = None, batch_size: int = None, only_missing: bool = False,
+                   progress: Callable[[int, float], None] = None) -> dict:
+    """
+    Renders the stored HTML of existing posts again, in a process pool.
+
+    Posts are read in id order, batch_size at a time, rendered by the
+    worker processes and written back with one executemany UPDATE per batch.
+    A post changed while its batch was rendering keeps its newer HTML: rows
+    are only written if their version did not move. The version itself is
+    left as is, the post did not change.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        workers (int): Worker processes, defaults to RENDER_WORKERS, 0 renders in this process.
+        batch_size (int): Posts per read, pool round and UPDATE, defaults to RENDER_BATCH_SIZE.
+        only_missing (bool): Only render posts without stored HTML, e.g. imported posts.
+        progress (Callable[[int, float], None]): Called with the posts rendered so far and the elapsed seconds.
+
+    Returns:
+        dict: rendered posts, seconds and posts_per_second.
+    """
+    workers = settings.RENDER_WORKERS if workers is None else workers
+    batch_size = settings.RENDER_BATCH_SIZE if batch_size is None else batch_size
+    table = BlogPost.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("post_id"), table.c.version == bindparam("post_version"))
+        .values(
+            content_html=bindparam("rendered_html"), toc=bindparam("rendered_toc"),
+            reading_time_minutes=bindparam("rendered_minutes"), version=table.c.version, # Explicit, so onupdate does not bump it
+        )
+    )
+    started = time.perf_counter()
+    rendered = 0
+    last_id = 0
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers > 0 else None # Fresh interpreters, as in serve.py
+    with pool or nullcontext():
+        while True:
+            query = select(BlogPost.id, BlogPost.version, BlogPost.content).where(BlogPost.id > last_id) # Keyset pagination
+            if only_missing:
+                query = query.where(BlogPost.content_html.is_(None))
+            rows = db.execute(query.order_by(BlogPost.id).limit(batch_size)).all()
+            if not rows:
+                break
+            db.commit() # End the read transaction while the batch renders
+            contents = [row.content for row in rows]
+            if pool is None:
+                results = map(render_markdown, contents)
+            else:
+                results = pool.map(render_markdown, contents, chunksize=max(1, len(rows) // (workers * 4))) # Few round trips per worker, still balanced
+            db.execute(statement, [
+                {"post_id": row.id, "post_version": row.version, "rendered_html": result["content_html"],
+                 "rendered_toc": result["toc"], "rendered_minutes": result["reading_time_minutes"]}
+                for row, result in zip(rows, results)
+            ])
+            db.commit()
+            rendered += len(rows)
+            last_id = rows[-1].id
+            if progress:
+                progress(rendered, time.perf_counter() - started)
+    seconds = time.perf_counter() - started
+    return {"rendered": rendered, "seconds": round(seconds, 3), "posts_per_second": round(rendered / seconds, 1) if seconds else 0.0}
@@ -0,0 +1,79 @@
+import json
+import re
+from typing import Any, Optional, Tuple
+from fastapi.responses import JSONResponse
+from app.core.profiling import profile_span
+
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$") # A single byte range, multiple ranges are served whole
+
+try:
+    import orjson # Optional dependency, several times faster than the json module on large payloads
+except ImportError: # pragma: no cover - exercised only without orjson
+    orjson = None
+
+def dump_json(content: Any) -> bytes:
+    """
+    Encodes a payload of plain JSON types (dicts, lists, str, int, float, bool, None).
+
+    Uses orjson when it is installed and falls back to a compact json.dumps.
+
+    Args:
+        content (Any): Payload to encode.
+
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson when available.
+
+    Endpoints return it directly with payloads that already have the shape of
+    their response model (see serialize_post), so FastAPI skips validating
+    and re-encoding them through jsonable_encoder. The content must only
+    contain plain JSON types.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with profile_span("serialization"):
+            return dump_json(content)
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header only asks for bytes past the end of the representation."""
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a Range request header (RFC 9110, 14.2) against a representation of size bytes.
+
+    Only single byte ranges are honoured. Headers the server may ignore
+    (other units, several ranges, invalid syntax) return None, and the whole
+    representation is sent.
+
+    Args:
+        range_header (Optional[str]): Raw Range header value.
+        size (int): Length of the representation in bytes.
+
+    Returns:
+        Optional[Tuple[int, int]]: First and last byte positions, inclusive, None to send everything.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end, or is an empty suffix.
+    """
+    match = BYTE_RANGE.match(range_header.replace(" ", "")) if range_header else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "": # Suffix range, the last bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(0, size - length), size - 1
+    first = int(first)
+    if last != "" and int(last) < first: # Invalid rather than unsatisfiable, ignored
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable(range_header)
+    return first, size - 1 if last == "" else min(int(last), size - 1)
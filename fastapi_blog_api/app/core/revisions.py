@@ -0,0 +1,171 @@
+import difflib
+import itertools
+import json
+import re
+import zlib
+from typing import List, Optional, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import BlogPost, BlogPostRevision
+
+# Revision history of post content. Every revision stores either a snapshot
+# (the whole content, zlib-compressed) or a delta against the previous
+# revision (compressed copy/insert operations). A delta chain is cut by a
+# snapshot every REVISION_SNAPSHOT_INTERVAL revisions, and whenever a delta
+# would not be smaller than the snapshot, so reading any revision decodes
+# one snapshot and at most REVISION_SNAPSHOT_INTERVAL - 1 deltas.
+
+TOKEN = re.compile(r"\S+\s*|\s+") # Words with their trailing whitespace, joined back they give the text
+Delta = List[Union[List[int], str]] # [start, end) character ranges of the previous revision to copy, or text to insert
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into the tokens deltas are computed on."""
+    return TOKEN.findall(text)
+
+def make_delta(old: str, new: str) -> Delta:
+    """
+    Computes the operations rebuilding new from old.
+
+    The texts are matched word by word, and matching runs are stored as
+    character ranges of old, so applying a delta only slices strings.
+
+    Args:
+        old (str): Content of the previous revision.
+        new (str): Content of the new revision.
+
+    Returns:
+        Delta: Character ranges of old to copy ([start, end]) and inserted strings, in order.
+    """
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    offsets = list(itertools.accumulate((len(token) for token in old_tokens), initial=0)) # Character offset of every token of old
+    delta = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_tokens, new_tokens).get_opcodes():
+        if tag == "equal":
+            delta.append([offsets[i1], offsets[i2]])
+        elif j2 > j1: # replace or insert, deletions are the ranges not copied
+            text = "".join(new_tokens[j1:j2])
+            if delta and isinstance(delta[-1], str):
+                delta[-1] += text
+            else:
+                delta.append(text)
+    return delta
+
+def apply_delta(old: str, delta: Delta) -> str:
+    """
+    Rebuilds the content of a revision from the previous one.
+
+    Args:
+        old (str): Content of the previous revision.
+        delta (Delta): Operations returned by make_delta.
+
+    Returns:
+        str: Content of the revision.
+    """
+    return "".join(old[op[0]:op[1]] if isinstance(op, list) else op for op in delta)
+
+def encode_revision(old: Optional[str], new: str) -> Tuple[str, bytes]:
+    """
+    Encodes new content as a delta against old, or as a snapshot when that is not larger.
+
+    Args:
+        old (Optional[str]): Content of the previous revision, None to force a snapshot.
+        new (str): Content to store.
+
+    Returns:
+        Tuple[str, bytes]: Kind ("snapshot" or "delta") and compressed data.
+    """
+    snapshot = zlib.compress(new.encode("utf-8"))
+    if old is None:
+        return "snapshot", snapshot
+    delta = zlib.compress(json.dumps(make_delta(old, new), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return ("delta", delta) if len(delta) < len(snapshot) else ("snapshot", snapshot)
+
+def content_checksum(content: str) -> int:
+    """Returns the CRC-32 of content, compared to detect content changed outside revisions."""
+    return zlib.crc32(content.encode("utf-8"))
+
+def record_revision(db: Session, blog: BlogPost, new_content: str) -> List[BlogPostRevision]:
+    """
+    Adds the revisions for an edit of the content of a post to the session.
+
+    The content being replaced is recorded first, as a snapshot, when it is
+    not the latest revision: the first edit of a post keeps the generated
+    draft, and content written by a regeneration is not lost. The new content
+    is recorded as a delta against it, or as a snapshot when the chain
+    reaches REVISION_SNAPSHOT_INTERVAL revisions. The caller commits, so the
+    revisions are stored with the edit or not at all.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog (BlogPost): Post being edited, with its current title, content and version.
+        new_content (str): Content replacing the current one.
+
+    Returns:
+        List[BlogPostRevision]: Revisions added to the session.
+    """
+    old = blog.content or ""
+    latest = db.execute(
+        select(BlogPostRevision.revision, BlogPostRevision.base_revision, BlogPostRevision.checksum)
+        .where(BlogPostRevision.blog_id == blog.id).order_by(BlogPostRevision.revision.desc()).limit(1)
+    ).first()
+    added = []
+    if latest is None or latest.checksum != content_checksum(old): # The content being replaced is not recorded yet
+        revision = 1 if latest is None else latest.revision + 1
+        added.append(BlogPostRevision(
+            blog_id=blog.id, revision=revision, base_revision=revision, version=blog.version, title=blog.title,
+            kind="snapshot", data=zlib.compress(old.encode("utf-8")), size=len(old), checksum=content_checksum(old),
+        ))
+        base_revision = revision
+    else:
+        revision, base_revision = latest.revision, latest.base_revision
+    revision += 1
+    kind, data = encode_revision(old if revision - base_revision < settings.REVISION_SNAPSHOT_INTERVAL else None, new_content)
+    added.append(BlogPostRevision(
+        blog_id=blog.id, revision=revision, base_revision=revision if kind == "snapshot" else base_revision,
+        version=blog.version + 1, title=blog.title, kind=kind, data=data, size=len(new_content), checksum=content_checksum(new_content),
+    ))
+    db.add_all(added)
+    return added
+
+def decode_revision(rows) -> str:
+    """
+    Rebuilds the content of the last of rows, a snapshot followed by the deltas up to the revision.
+
+    Args:
+        rows: Revisions in order, with kind and data.
+
+    Returns:
+        str: Content of the last revision.
+    """
+    content = ""
+    for row in rows:
+        data = zlib.decompress(row.data).decode("utf-8")
+        content = data if row.kind == "snapshot" else apply_delta(content, json.loads(data))
+    return content
+
+def get_revision(db: Session, blog_id: int, revision: int) -> Optional[Tuple[BlogPostRevision, str]]:
+    """
+    Reads one revision of a post and rebuilds its content, with one query.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        blog_id (int): Blog post id.
+        revision (int): Revision number, from 1.
+
+    Returns:
+        Optional[Tuple[BlogPostRevision, str]]: The revision and its content, None if it does not exist.
+    """
+    base = (
+        select(BlogPostRevision.base_revision)
+        .where(BlogPostRevision.blog_id == blog_id, BlogPostRevision.revision == revision)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(BlogPostRevision)
+        .where(BlogPostRevision.blog_id == blog_id, BlogPostRevision.revision >= base, BlogPostRevision.revision <= revision)
+        .order_by(BlogPostRevision.revision)
+    ).scalars().all()
+    if not rows:
+        return None
+    return rows[-1], decode_revision(rows)
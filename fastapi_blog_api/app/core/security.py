@@ -1,9 +1,23 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS, # Work factor of new hashes
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS, # Hashes outside the configured factor need an update
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt is CPU-bound and releases the GIL, a small dedicated pool bounds its concurrency
+password_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
 def get_password_hash(password: str) -> str:
     """
@@ -30,6 +44,34 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hashes a password on the password hashing executor, off the event loop.
+
+    Args:
+        password (str): The password to hash.
+
+    Returns:
+        str: The hashed password.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_executor, pwd_context.hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    """
+    Verifies a password on the password hashing executor and rehashes it if
+    the stored hash does not use the configured work factor.
+
+    Args:
+        plain_password (str): The plain password.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and the new hash to store if it must be updated.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     Creates a JWT access token.
@@ -43,7 +85,23 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     to_encode = data.copy() # Copy to prevent modifying original
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)) # Calculate expiration
-    to_encode.update({"exp": expire}) # Set expiration claim
+    to_encode.update({"exp": expire, "type": ACCESS_TOKEN_TYPE}) # Set expiration and token type claims
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM) # Encode and return the token
+
+def create_refresh_token(data: dict, expires_delta: timedelta = None):
+    """
+    Creates a JWT refresh token, only accepted by the refresh endpoint.
+
+    Args:
+        data (dict): The payload data to include in the token.
+        expires_delta (Optional[timedelta]): The time duration the token is valid for.
+
+    Returns:
+        str: The JWT refresh token.
+    """
+    to_encode = data.copy() # Copy to prevent modifying original
+    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)) # Calculate expiration
+    to_encode.update({"exp": expire, "type": REFRESH_TOKEN_TYPE}) # Set expiration and token type claims
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM) # Encode and return the token
 
 def decode_access_token(token: str):
@@ -58,6 +116,26 @@ def decode_access_token(token: str):
     """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]) # decode the token using JWT
+        if payload.get("type", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE: # Refresh tokens cannot authenticate requests
+            return None
+        return payload # return payload if the token is ok
+    except jwt.JWTError: # Catch potential JWT errors
+        return None # Return None if there was a error decoding the token
+
+def decode_refresh_token(token: str):
+    """
+    Decodes a JWT refresh token.
+
+    Args:
+        token (str): The JWT token to decode.
+
+    Returns:
+        Optional[dict]: The decoded payload if it is a valid refresh token, otherwise None.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]) # decode the token using JWT
+        if payload.get("type") != REFRESH_TOKEN_TYPE: # Only refresh tokens are accepted
+            return None
         return payload # return payload if the token is ok
     except jwt.JWTError: # Catch potential JWT errors
-        return None # Return None if there was a error decoding the token
\ No newline at end of file
+        return None # Return None if there was a error decoding the token
@@ -0,0 +1,23 @@
+from smolagents import DuckDuckGoSearchTool
+from app.core.smoltools.sources import current_sources
+
+class DedupDuckDuckGoSearchTool(DuckDuckGoSearchTool):
+    """
+    DuckDuckGo search that drops the results already returned during the generation.
+
+    Results are matched on their canonical URL (see sources.py), across
+    DuckDuckGo and Jina AI searches. Outside a generation it behaves like
+    DuckDuckGoSearchTool.
+    """
+
+    def forward(self, query: str) -> str:
+        results = self.ddgs.text(query, max_results=self.max_results)
+        if len(results) == 0:
+            raise Exception("No results found! Try a less restrictive/shorter query.")
+        sources = current_sources.get()
+        if sources is not None:
+            results = [result for result in results if sources.add_result(result["href"])] # Snippets are not page content, only URLs are matched
+            if not results:
+                return "## Search Results\n\nNo new results: every result was already returned earlier in this research."
+        postprocessed_results = [f"[{result['title']}]({result['href']})\n{result['body']}" for result in results]
+        return "## Search Results\n\n" + "\n\n".join(postprocessed_results)
@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+import httpx
+from app.core import metrics
+from app.core.config import settings
+
+LATENCY_WINDOW = 200 # Latest completed requests the hedge delay is computed from
+MIN_SAMPLES = 20 # Completed requests needed before the percentile is trusted
+BUDGET_CAPACITY = 5.0 # Hedges that can be sent in a burst, the budget refills at HEDGE_BUDGET_RATIO per request
+
+class LatencyTracker:
+    """
+    Sliding window of request latencies, to place the hedge delay at a percentile.
+
+    Attributes:
+        window (int): Latencies kept.
+        min_samples (int): Latencies needed before percentile() answers.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Records the latency of a completed request.
+
+        Args:
+            seconds (float): Time from sending the request to receiving the whole response.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Returns the q-th percentile of the recorded latencies.
+
+        Args:
+            q (float): Percentile, between 0 and 100.
+
+        Returns:
+            Optional[float]: Latency in seconds, None until min_samples latencies are recorded.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to a share of the requests.
+
+    Every request earns ratio tokens, a hedge costs one, so in the long run
+    hedges add at most ratio extra load, and at most capacity in a burst.
+
+    Attributes:
+        ratio (float): Tokens earned per request.
+        capacity (float): Maximum tokens, the bucket starts full.
+    """
+
+    def __init__(self, ratio: float, capacity: float = BUDGET_CAPACITY):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def earn(self):
+        """Credits one request."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        """
+        Takes a token for a hedge.
+
+        Returns:
+            bool: False when the budget is exhausted and no hedge may be sent.
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+class HedgedClient:
+    """
+    HTTP GET client that sends a backup request when the first one is slow.
+
+    When a request has not answered after the HEDGE_PERCENTILE latency of
+    the recent requests of the endpoint, the same request is sent again, the
+    first successful response wins and the other request is cancelled,
+    which closes its connection. Hedges are capped by a HedgeBudget. Until
+    enough latencies are known, the delay is HEDGE_INITIAL_DELAY_SECONDS.
+    Requests run on an event loop in a background thread, started on first
+    use, so get() can be called from any thread.
+
+    Attributes:
+        endpoint (str): Endpoint name, for the metrics ("search", "scrape").
+        percentile (float): Latency percentile after which a hedge is sent.
+        initial_delay (float): Hedge delay while too few latencies are known.
+        tracker (LatencyTracker): Recent latencies of the endpoint.
+        budget (HedgeBudget): Hedges left.
+    """
+
+    def __init__(self, endpoint: str, percentile: float = None, budget_ratio: float = None, initial_delay: float = None,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.endpoint = endpoint
+        self.percentile = settings.HEDGE_PERCENTILE if percentile is None else percentile
+        self.initial_delay = settings.HEDGE_INITIAL_DELAY_SECONDS if initial_delay is None else initial_delay
+        self.tracker = LatencyTracker()
+        self.budget = HedgeBudget(settings.HEDGE_BUDGET_RATIO if budget_ratio is None else budget_ratio)
+        self._transport = transport # Tests and benchmarks inject a transport
+        self._loop = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> float:
+        """
+        Returns how long to wait for a request before hedging it.
+
+        Returns:
+            float: Seconds.
+        """
+        delay = self.tracker.percentile(self.percentile)
+        return self.initial_delay if delay is None else delay
+
+    def get(self, url: str, timeout: Optional[float] = None) -> httpx.Response:
+        """
+        Sends a hedged GET request. Safe to call from any thread.
+
+        Args:
+            url (str): URL to fetch.
+            timeout (Optional[float]): Timeout of the whole request, hedge included, None for no timeout.
+
+        Returns:
+            httpx.Response: The first successful response, or the last response
+            when every attempt got a server error.
+
+        Raises:
+            httpx.HTTPError: If every attempt failed without a response, or the timeout expired.
+        """
+        request = self._get(url, timeout) if timeout is None else asyncio.wait_for(self._get(url, timeout), timeout)
+        future = asyncio.run_coroutine_threadsafe(request, self._start())
+        try:
+            return future.result()
+        except asyncio.TimeoutError:
+            raise httpx.TimeoutException(f"No response from {self.endpoint} within {timeout:.1f}s") from None
+
+    async def _attempt(self, url: str, timeout: Optional[float]) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self._client.get(url, timeout=timeout)
+        self.tracker.record(time.perf_counter() - start) # Cancelled attempts are never recorded
+        return response
+
+    async def _get(self, url: str, timeout: Optional[float]) -> httpx.Response:
+        start = time.perf_counter()
+        self.budget.earn()
+        primary = asyncio.ensure_future(self._attempt(url, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+        left = None if timeout is None else timeout - (time.perf_counter() - start) # The backup ends with the primary
+        if left is not None and left <= 0: # No time for a backup
+            return await primary
+        if not self.budget.spend():
+            metrics.research_hedges_total.labels(self.endpoint, "denied").inc()
+            return await primary
+        metrics.research_hedges_total.labels(self.endpoint, "sent").inc()
+        backup = asyncio.ensure_future(self._attempt(url, left))
+        pending = {primary, backup}
+        failure = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is not None:
+                        failure = attempt
+                    elif attempt.result().status_code < 500 or not pending:
+                        if attempt is backup:
+                            metrics.research_hedges_total.labels(self.endpoint, "won").inc()
+                        return attempt.result()
+                    else:
+                        failure = attempt
+            return failure.result()
+        finally:
+            for attempt in pending: # The loser
+                attempt.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stop(self):
+        """Closes the connections and stops the thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _start(self):
+        loop = self._loop
+        if loop is not None:
+            return loop
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            threading.Thread(target=self._run, args=(loop, ready), name=f"hedged-{self.endpoint}", daemon=True).start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        self._client = httpx.AsyncClient(transport=self._transport, follow_redirects=True)
+        ready.set()
+        loop.run_forever()
+        loop.close()
+
+# Hedged clients of the Jina AI endpoints, used when RESEARCH_HEDGING is on
+hedged_clients = {"search": HedgedClient("search"), "scrape": HedgedClient("scrape")}
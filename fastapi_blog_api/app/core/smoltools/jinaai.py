@@ -1,14 +1,67 @@
 import os
+import re
+import time
 import requests
 from requests.exceptions import RequestException
 import datetime
 from dotenv import load_dotenv
 from smolagents import tool
+from app.core import deadline, metrics
+from app.core.config import settings
+from app.core.smoltools.hedging import hedged_clients
+from app.core.smoltools.sources import current_sources
 
 load_dotenv()
 
 headers = {'Authorization': 'Bearer ' + os.getenv('JINA_API_KEY')}
 
+RESULT_START = re.compile(r"^(?=\[\d+\] Title:)", re.MULTILINE) # Each s.jina.ai result starts with "[n] Title:"
+RESULT_URL = re.compile(r"^\[\d+\] URL Source: *(\S+)", re.MULTILINE)
+RESULT_CONTENT = re.compile(r"^\[\d+\] Markdown Content:\s*(.*)", re.MULTILINE | re.DOTALL) # Missing when only a description is returned
+
+def fetch(endpoint: str, url: str) -> str:
+    """
+    Fetches a Jina AI URL within the tool timeout and the generation deadline.
+
+    With RESEARCH_HEDGING on, a slow request is hedged (see hedging.py).
+
+    Args:
+        endpoint (str): "search" or "scrape".
+        url (str): URL to fetch.
+
+    Returns:
+        str: Response body.
+    """
+    timeout = deadline.bounded_timeout(settings.TOOL_TIMEOUT_SECONDS, endpoint)
+    start = time.perf_counter()
+    try:
+        if settings.RESEARCH_HEDGING:
+            return hedged_clients[endpoint].get(url, timeout=timeout).text
+        return requests.get(url, timeout=timeout).text
+    finally:
+        metrics.research_request_duration_seconds.labels(endpoint).observe(time.perf_counter() - start)
+
+def dedup_search_results(markdown_content: str) -> str:
+    """
+    Drops the s.jina.ai results already returned during the generation.
+
+    Args:
+        markdown_content (str): Search results as returned by s.jina.ai.
+
+    Returns:
+        str: The results whose page is new, unchanged outside a generation.
+    """
+    sources = current_sources.get()
+    if sources is None:
+        return markdown_content
+    kept = []
+    for block in RESULT_START.split(markdown_content):
+        url = RESULT_URL.search(block)
+        content = RESULT_CONTENT.search(block)
+        if url is None or sources.add_result(url.group(1), content.group(1) if content else None):
+            kept.append(block)
+    return "".join(kept).strip() or "No new results: every result was already returned earlier in this research."
+
 @tool
 def scrape_page_with_jina_ai(url: str) -> str:
     """Scrapes content from a webpage using Jina AI's web scraping service.
@@ -20,10 +73,20 @@ def scrape_page_with_jina_ai(url: str) -> str:
         str: The scraped content in markdown format.
     """
     print(f"Scraping Jina AI..: {url}")
+    sources = current_sources.get()
+    seen = sources.seen_scrape(url) if sources is not None else None
+    if seen is not None:
+        return f"{url} was already retrieved earlier in this research (as {seen}), its content is not repeated."
     # response = requests.get("https://r.jina.ai/" + url, headers=headers)
-    response = requests.get("https://r.jina.ai/" + url)
-    
-    markdown_content = response.text
+    try:
+        markdown_content = fetch("scrape", "https://r.jina.ai/" + url)
+    except BaseException: # Timeout, HTTP error or deadline: the page was not retrieved
+        if sources is not None:
+            sources.forget_scrape(url)
+        raise
+    duplicate = sources.add_content(url, markdown_content) if sources is not None else None
+    if duplicate is not None:
+        return f"The content of {url} is nearly identical to {duplicate}, retrieved earlier in this research, and is not repeated."
 
     return markdown_content
 
@@ -39,7 +102,6 @@ def search_facts_with_jina_ai(query: str) -> str:
     """
     print(f"Searching Jina AI..: {query}")   
     # response = requests.get("https://s.jina.ai/" + query, headers=headers)
-    response = requests.get("https://s.jina.ai/" + query)
-    markdown_content = response.text
+    markdown_content = dedup_search_results(fetch("search", "https://s.jina.ai/" + query))
 
-    return markdown_content
\ No newline at end of file
+    return markdown_content
@@ -0,0 +1,237 @@
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMETERS = {
+    "fbclid", "gclid", "gbraid", "wbraid", "dclid", "msclkid", "yclid", "igshid", "twclid", "ttclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok",
+} # Click and campaign ids of ad and mail platforms, besides any utm_*; generic names such as ref or source can select content
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.") # Host variants serving the same pages
+AMP_CACHE_SUFFIX = ".cdn.ampproject.org" # Google AMP cache, which embeds the original URL in its path
+SHINGLE_WORDS = 3 # Words per shingle of the near-duplicate fingerprint
+
+def canonicalize_url(url: str) -> str:
+    """
+    Returns one URL for all the addresses of the same article.
+
+    Search engines and sites hand out the same page under variants: http
+    and https, www/mobile/AMP hosts, trailing AMP path markers, tracking parameters,
+    fragments, DuckDuckGo redirect links and Google AMP cache URLs. They all
+    map to the same canonical form, which is only used as a key, never fetched.
+
+    Args:
+        url (str): URL as found in search results or given to a tool.
+
+    Returns:
+        str: Canonical URL.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if host.endswith("duckduckgo.com") and parts.path.startswith("/l/"): # Redirect link, the target is in uddg
+        target = dict(query).get("uddg")
+        if target:
+            return canonicalize_url(unquote(target))
+    if host.endswith(AMP_CACHE_SUFFIX): # e.g. /c/s/www.example.com/article
+        match = re.match(r"^/[a-z]/(s/)?(.+)$", parts.path)
+        if match:
+            target = ("https://" if match.group(1) else "http://") + match.group(2)
+            return canonicalize_url(f"{target}?{parts.query}" if parts.query else target)
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = re.sub(r"/+", "/", parts.path or "/")
+    path = re.sub(r"/amp/?$|\.amp(?=\.html?$|$)", "", path) or "/" # Trailing AMP markers only: /article/amp, /article.amp.html
+    if path != "/" and path.endswith("/"):
+        path = path[:-1]
+    params = sorted(
+        (name, value) for name, value in query
+        if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMETERS
+    )
+    return urlunsplit(("https", host, path, urlencode(params), ""))
+
+def fingerprint(text: str) -> int:
+    """
+    Returns the 64-bit SimHash of a text's word shingles.
+
+    Texts that differ only by boilerplate, whitespace or a few edits have
+    fingerprints a few bits apart.
+
+    Args:
+        text (str): Page content.
+
+    Returns:
+        int: Fingerprint.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [""] * (SHINGLE_WORDS - len(words))
+    weights = [0] * 64
+    for index in range(len(words) - SHINGLE_WORDS + 1):
+        shingle = " ".join(words[index:index + SHINGLE_WORDS]).encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+class ResearchSources:
+    """
+    Sources seen by the research tools during one generation.
+
+    Search results whose canonical URL was already returned are dropped,
+    pages are scraped at most once per canonical URL, and scraped pages
+    whose content nearly matches a page already seen are replaced by a
+    pointer to it, so every source is fetched and fed to the LLM once.
+
+    Attributes:
+        urls (dict): Canonical URL -> first URL seen for it.
+        scraped (set): Canonical URLs already scraped or returned with their content.
+        fingerprints (list): (fingerprint, URL) of every page content seen.
+        duplicate_results (int): Search results dropped as duplicates.
+        scrapes_avoided (int): Scrapes answered without fetching the page again.
+        near_duplicates (int): Scraped pages omitted as near-duplicates of another page.
+    """
+
+    def __init__(self, max_distance: int = None):
+        self.max_distance = settings.RESEARCH_NEAR_DUPLICATE_BITS if max_distance is None else max_distance
+        self.urls = {}
+        self.scraped = set()
+        self.fingerprints = []
+        self.duplicate_results = 0
+        self.scrapes_avoided = 0
+        self.near_duplicates = 0
+        self._lock = threading.Lock() # The manager may run tools of several agents
+
+    def add_result(self, url: str, content: Optional[str] = None) -> bool:
+        """
+        Registers a search result.
+
+        Args:
+            url (str): URL of the result.
+            content (Optional[str]): Page content returned with the result, if any.
+
+        Returns:
+            bool: False if the result is a duplicate, by URL or content, and must be dropped.
+        """
+        key = canonicalize_url(url)
+        with self._lock:
+            if key in self.urls:
+                self.duplicate_results += 1
+                duplicate = True
+            else:
+                self.urls[key] = url
+                duplicate = False
+                if content:
+                    self.scraped.add(key) # Its content is known, scraping it would only repeat it
+        if duplicate:
+            metrics.research_duplicates_total.labels("search_result").inc()
+            return False
+        return not content or self.add_content(url, content) is None
+
+    def seen_scrape(self, url: str) -> Optional[str]:
+        """
+        Checks whether a page was already retrieved, before scraping it.
+
+        A page that must be scraped is marked as retrieved right away, so
+        concurrent calls do not scrape it twice; a failed scrape unmarks it
+        with forget_scrape.
+
+        Args:
+            url (str): URL to scrape.
+
+        Returns:
+            Optional[str]: The URL under which it was retrieved, None if it must be scraped.
+        """
+        key = canonicalize_url(url)
+        with self._lock:
+            if key not in self.scraped:
+                self.scraped.add(key)
+                self.urls.setdefault(key, url)
+                return None
+            self.scrapes_avoided += 1
+        metrics.research_duplicates_total.labels("scrape").inc()
+        return self.urls.get(key, url)
+
+    def forget_scrape(self, url: str):
+        """
+        Unmarks a page whose scrape failed, so that retrying it fetches it again.
+
+        Args:
+            url (str): URL passed to seen_scrape.
+        """
+        with self._lock:
+            self.scraped.discard(canonicalize_url(url))
+
+    def add_content(self, url: str, content: str) -> Optional[str]:
+        """
+        Registers the content of a page unless it nearly matches one already seen.
+
+        Args:
+            url (str): URL of the page.
+            content (str): Page content.
+
+        Returns:
+            Optional[str]: URL of the near-duplicate page, None if the content is new.
+        """
+        value = fingerprint(content)
+        with self._lock:
+            for other, other_url in self.fingerprints:
+                if bin(value ^ other).count("1") <= self.max_distance:
+                    self.near_duplicates += 1
+                    break
+            else:
+                self.fingerprints.append((value, url))
+                return None
+        metrics.research_duplicates_total.labels("near_duplicate").inc()
+        return other_url
+
+    def summary(self) -> dict:
+        """
+        Returns the dedup counters of the generation.
+
+        Returns:
+            dict: sources, duplicate_results, scrapes_avoided and near_duplicates.
+        """
+        with self._lock:
+            return {
+                "sources": len(self.urls),
+                "duplicate_results": self.duplicate_results,
+                "scrapes_avoided": self.scrapes_avoided,
+                "near_duplicates": self.near_duplicates,
+            }
+
+# Sources of the generation running in this context, None (the default) outside generations
+current_sources = contextvars.ContextVar("current_sources", default=None)
+
+@contextmanager
+def research_sources():
+    """
+    Dedups the research tool calls made inside the block, one generation.
+
+    Yields:
+        Optional[ResearchSources]: The sources of the block, None when RESEARCH_DEDUP is off.
+    """
+    sources = ResearchSources() if settings.RESEARCH_DEDUP else None
+    token = current_sources.set(sources)
+    try:
+        yield sources
+    finally:
+        current_sources.reset(token)
+        if sources is not None:
+            logger.info("Research sources: %s", sources.summary())
@@ -0,0 +1,528 @@
+import asyncio
+import atexit
+import contextlib
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import secrets
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+import httpcore
+import httpx
+from app.core.config import settings
+from app.core import metrics
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Blog-Signature" # "t=<unix time>,v1=<hex HMAC-SHA256 of '<t>.<body>'>"
+EVENT_HEADER = "X-Blog-Event" # Event name, e.g. "blog_post.completed"
+DELIVERY_HEADER = "X-Blog-Delivery" # Delivery id, identical across retries so receivers can deduplicate
+RETRYABLE_STATUSES = {408, 425, 429} # Client errors worth retrying, every 5xx is retried too
+
+def generate_secret() -> str:
+    """
+    Generates a webhook signing secret.
+
+    Returns:
+        str: 32 random bytes, hex encoded.
+    """
+    return secrets.token_hex(32)
+
+def sign_payload(secret: str, body: bytes, timestamp: int) -> str:
+    """
+    Computes the signature header of a webhook body.
+
+    The timestamp is part of the signed message, so receivers can reject
+    replayed deliveries older than a few minutes.
+
+    Args:
+        secret (str): Signing secret of the receiving user.
+        body (bytes): Request body.
+        timestamp (int): Unix time of the attempt.
+
+    Returns:
+        str: Value of the X-Blog-Signature header.
+    """
+    digest = hmac.new(secret.encode(), str(timestamp).encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+def verify_signature(secret: str, body: bytes, header: str, tolerance: float = 300) -> bool:
+    """
+    Verifies an X-Blog-Signature header, as a receiver would.
+
+    Args:
+        secret (str): Signing secret.
+        body (bytes): Raw request body.
+        header (str): X-Blog-Signature header value.
+        tolerance (float): Maximum age of the signature in seconds.
+
+    Returns:
+        bool: True if the signature matches and is recent enough.
+    """
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body, timestamp), header)
+
+def ensure_webhook_secret(db, user_id: int) -> str:
+    """
+    Returns the signing secret of a user, creating it on first use.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        user_id (int): User id.
+
+    Returns:
+        str: The signing secret.
+    """
+    db.query(User).filter(User.id == user_id, User.webhook_secret.is_(None)).update( # Only the first concurrent caller sets it
+        {"webhook_secret": generate_secret()}, synchronize_session=False
+    )
+    db.commit()
+    return db.query(User.webhook_secret).filter(User.id == user_id).scalar()
+
+class UnsafeWebhookURL(ValueError):
+    """A webhook URL that is not http(s), does not resolve, or resolves to a non-public address."""
+
+def is_public_address(address: str) -> bool:
+    """
+    Tells whether webhooks may be sent to an IP address.
+
+    Loopback, private, link-local (cloud metadata services), shared,
+    reserved, unspecified and multicast addresses are not public, and
+    IPv4-mapped IPv6 addresses are judged by their IPv4 address.
+
+    Args:
+        address (str): IPv4 or IPv6 address, as returned by getaddrinfo.
+
+    Returns:
+        bool: True if the address is globally routable.
+    """
+    ip = ipaddress.ip_address(address.split("%", 1)[0]) # Drop the scope id of link-local IPv6 addresses
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def public_addresses(host: str, infos) -> List[str]:
+    """
+    Returns the addresses host resolved to, if they are all public.
+
+    Args:
+        host (str): Host name of the webhook URL.
+        infos: Result of getaddrinfo for host.
+
+    Returns:
+        List[str]: Resolved addresses, in getaddrinfo order.
+
+    Raises:
+        UnsafeWebhookURL: If host resolved to nothing, or to any non-public address.
+    """
+    addresses = [info[4][0] for info in infos]
+    if not addresses:
+        raise UnsafeWebhookURL(f"{host} does not resolve to any address")
+    for address in addresses:
+        if not is_public_address(address):
+            raise UnsafeWebhookURL(f"{host} resolves to {address}, which is not a public address")
+    return addresses
+
+def check_webhook_url(url: str):
+    """
+    Rejects webhook URLs that would make the server call its own network.
+
+    The host is resolved, so names pointing at loopback, private or
+    link-local addresses are rejected as well as literal addresses. DNS can
+    change after this check, so the dispatcher checks the addresses again
+    when it connects. Does nothing when WEBHOOK_ALLOW_PRIVATE_TARGETS is set.
+    Blocking, run it in a thread from async code.
+
+    Args:
+        url (str): Webhook URL.
+
+    Raises:
+        UnsafeWebhookURL: If the URL is not http(s), its host does not resolve, or resolves to a non-public address.
+    """
+    if settings.WEBHOOK_ALLOW_PRIVATE_TARGETS:
+        return
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise UnsafeWebhookURL("Webhook URLs must be http or https URLs with a host")
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        infos = socket.getaddrinfo(parsed.host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise UnsafeWebhookURL(f"{parsed.host} cannot be resolved") from e
+    public_addresses(parsed.host, infos)
+
+class PublicNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend connecting only to public addresses.
+
+    The host is resolved when the connection is opened and the connection
+    goes to the address that was checked, so a name resolving to a public
+    address when the webhook was registered and to a private one later is
+    still refused. TLS certificates are still verified against the host name.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: float = None, local_address: str = None, socket_options=None):
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e: # Retried like any other network error
+            raise httpcore.ConnectError(f"{host} cannot be resolved: {e}") from e
+        address = public_addresses(host, infos)[0]
+        return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address, socket_options=socket_options)
+
+    async def connect_unix_socket(self, path: str, timeout: float = None, socket_options=None):
+        raise UnsafeWebhookURL("Webhooks are not sent to unix sockets")
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+HTTPCORE_ERRORS = ( # httpcore exceptions and the httpx ones they are raised as, most specific first
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+)
+
+@contextlib.contextmanager
+def httpx_errors():
+    """Raises httpcore exceptions as their httpx counterparts, so callers only handle httpx.HTTPError."""
+    try:
+        yield
+    except Exception as e:
+        for httpcore_error, httpx_error in HTTPCORE_ERRORS:
+            if isinstance(e, httpcore_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+class PublicResponseStream(httpx.AsyncByteStream):
+    """Body of a response received through PublicTransport."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+class PublicTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport of the dispatcher, refusing to connect to non-public addresses.
+
+    Requests go through an httpcore connection pool using
+    PublicNetworkBackend, so every new connection checks the address it
+    connects to.
+
+    Args:
+        limits (httpx.Limits): Connection pool limits.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PublicNetworkBackend(),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(scheme=request.url.raw_scheme, host=request.url.raw_host, port=request.url.port, target=request.url.raw_path),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions, # Carries the timeouts of the client
+        )
+        with httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=PublicResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+class WebhookDelivery:
+    """
+    One webhook event on its way to a URL.
+
+    Attributes:
+        url (str): Target URL.
+        secret (str): Signing secret.
+        event (str): Event name.
+        body (bytes): JSON body, signed again on every attempt.
+        id (str): Delivery id.
+        attempts (int): Attempts made so far.
+    """
+
+    def __init__(self, url: str, secret: str, event: str, body: bytes):
+        self.url = url
+        self.secret = secret
+        self.event = event
+        self.body = body
+        self.id = uuid.uuid4().hex
+        self.attempts = 0
+
+class WebhookDispatcher:
+    """
+    Delivers webhooks from a background thread running its own event loop.
+
+    enqueue only hands the delivery over to that loop, so callers such as the
+    generation workers never wait for a receiver. Deliveries are sent by a
+    fixed number of concurrent senders sharing one HTTP client, so
+    connections to a receiver are kept alive and reused. Failed attempts
+    (network errors, timeouts, 5xx, 408/425/429) are retried with
+    exponential backoff and jitter, honouring Retry-After, up to
+    max_attempts; other 4xx responses are final. Connections are only
+    opened to public addresses, checked when connecting, and redirects are
+    not followed; a receiver on a non-public address fails the delivery
+    without retries. Retries wait on a timer, not in a sender. Deliveries
+    are held in memory only: a process that exits drains them for up to
+    WEBHOOK_DRAIN_SECONDS and drops the rest.
+
+    Attributes:
+        max_attempts (int): Attempts per delivery, the first one included.
+        backoff (float): Delay before the first retry in seconds, doubled on every retry.
+        backoff_max (float): Maximum delay between attempts in seconds.
+    """
+
+    def __init__(self, max_attempts: int = None, backoff: float = None, backoff_max: float = None, timeout: float = None,
+                 concurrency: int = None, queue_size: int = None, transport: httpx.AsyncBaseTransport = None):
+        self.max_attempts = settings.WEBHOOK_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.backoff = settings.WEBHOOK_BACKOFF_SECONDS if backoff is None else backoff
+        self.backoff_max = settings.WEBHOOK_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        self.timeout = settings.WEBHOOK_TIMEOUT_SECONDS if timeout is None else timeout
+        self.concurrency = settings.WEBHOOK_CONCURRENCY if concurrency is None else concurrency
+        self.queue_size = settings.WEBHOOK_QUEUE_SIZE if queue_size is None else queue_size
+        self._transport = transport # Tests inject an httpx.MockTransport
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._pending = 0 # Deliveries queued, in flight or waiting for a retry
+        self._idle = None # asyncio.Event set whenever _pending drops to 0
+        self._client = None
+        self._senders = []
+        self._lock = threading.Lock()
+        self._exit_hook = False
+
+    def pending(self) -> int:
+        """Returns the number of deliveries not finished yet."""
+        return self._pending
+
+    def enqueue(self, delivery: WebhookDelivery):
+        """
+        Schedules a delivery without waiting for it. Safe to call from any thread.
+
+        Args:
+            delivery (WebhookDelivery): Delivery to send.
+        """
+        loop = self._start()
+        loop.call_soon_threadsafe(self._put, delivery)
+
+    def stop(self, timeout: float = None):
+        """
+        Waits for pending deliveries, at most timeout seconds, then stops the thread.
+
+        Args:
+            timeout (float): Maximum wait, defaults to WEBHOOK_DRAIN_SECONDS.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        timeout = settings.WEBHOOK_DRAIN_SECONDS if timeout is None else timeout
+        future = asyncio.run_coroutine_threadsafe(self._drain(timeout), loop)
+        try:
+            future.result(timeout + 5)
+        except Exception:
+            logger.exception("Webhook dispatcher did not stop cleanly")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+
+    def _start(self):
+        loop = self._loop
+        if loop is not None:
+            return loop
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(target=self._run, args=(loop, ready), name="webhook-dispatcher", daemon=True)
+            thread.start()
+            ready.wait()
+            self._thread = thread
+            self._loop = loop
+            if not self._exit_hook:
+                atexit.register(self.stop) # Drain on interpreter exit, daemon threads are still alive then
+                self._exit_hook = True
+            return loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        transport = self._transport
+        if transport is None and not settings.WEBHOOK_ALLOW_PRIVATE_TARGETS:
+            transport = PublicTransport(limits)
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=False, # A redirect could point anywhere, including the internal network
+        )
+        self._senders = [loop.create_task(self._sender()) for _ in range(self.concurrency)]
+        ready.set()
+        loop.run_forever()
+        loop.close()
+
+    def _put(self, delivery: WebhookDelivery):
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            metrics.webhook_deliveries_total.labels("dropped").inc()
+            logger.warning("Webhook queue full, dropping %s delivery %s", delivery.event, delivery.id)
+            return
+        self._pending += 1
+        metrics.webhook_queue_depth.inc()
+        self._idle.clear()
+
+    def _finish(self):
+        self._pending -= 1
+        metrics.webhook_queue_depth.dec()
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _sender(self):
+        while True:
+            delivery = await self._queue.get()
+            retry_after = await self._attempt(delivery)
+            if retry_after is None: # Delivered, or failed for good
+                self._finish()
+            else: # Wait on a timer so the sender is free for other deliveries
+                asyncio.get_running_loop().call_later(retry_after, self._requeue, delivery)
+
+    def _requeue(self, delivery: WebhookDelivery):
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull: # Already counted as pending, give up on it
+            metrics.webhook_deliveries_total.labels("dropped").inc()
+            self._finish()
+
+    async def _attempt(self, delivery: WebhookDelivery) -> Optional[float]:
+        """
+        Sends one attempt of a delivery.
+
+        Returns:
+            Optional[float]: Seconds to wait before the next attempt, or None when the delivery is finished.
+        """
+        delivery.attempts += 1
+        timestamp = int(time.time())
+        headers = {
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: sign_payload(delivery.secret, delivery.body, timestamp),
+            EVENT_HEADER: delivery.event,
+            DELIVERY_HEADER: delivery.id,
+        }
+        started = time.perf_counter()
+        retry_after = None
+        try:
+            response = await self._client.post(delivery.url, content=delivery.body, headers=headers)
+            status_code = response.status_code
+            retry_after = response.headers.get("retry-after")
+        except httpx.HTTPError as e:
+            status_code = None
+            logger.info("Webhook delivery %s to %s failed: %s", delivery.id, delivery.url, e)
+        except UnsafeWebhookURL as e: # Never retried, the address is checked again on every attempt anyway
+            metrics.webhook_delivery_duration_seconds.observe(time.perf_counter() - started)
+            metrics.webhook_deliveries_total.labels("failed").inc()
+            logger.warning("Refusing webhook delivery %s to %s: %s", delivery.id, delivery.url, e)
+            return None
+        metrics.webhook_delivery_duration_seconds.observe(time.perf_counter() - started)
+        if status_code is not None and 200 <= status_code < 300:
+            metrics.webhook_deliveries_total.labels("delivered").inc()
+            return None
+        retryable = status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUSES
+        if not retryable or delivery.attempts >= self.max_attempts:
+            metrics.webhook_deliveries_total.labels("failed").inc()
+            logger.warning("Giving up on webhook delivery %s to %s after %d attempts (last status %s)",
+                           delivery.id, delivery.url, delivery.attempts, status_code)
+            return None
+        metrics.webhook_deliveries_total.labels("retried").inc()
+        delay = min(self.backoff_max, self.backoff * 2 ** (delivery.attempts - 1))
+        delay = random.uniform(delay / 2, delay) # Jitter spreads retries of a receiver that was down
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.backoff_max, float(retry_after)))
+        return delay
+
+    async def _drain(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d undelivered webhooks on shutdown", self._pending)
+        for sender in self._senders:
+            sender.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        await self._client.aclose()
+
+
+dispatcher = WebhookDispatcher()
+
+def notify_generation_finished(url: str, secret: str, blog_id: int, owner_id: int, title: str, status: str):
+    """
+    Queues the webhook announcing that a post generation completed or failed.
+
+    The body carries the post metadata, not its content, which the receiver
+    fetches with GET /api/v1/blogs/{id} if it needs it.
+
+    Args:
+        url (str): Callback URL of the post, or else of its owner.
+        secret (str): Signing secret of the owner.
+        blog_id (int): Blog post id.
+        owner_id (int): ID of the user owning the post.
+        title (str): Blog post title.
+        status (str): "completed", "failed" or "timed_out".
+    """
+    event = f"blog_post.{status}"
+    body = json.dumps({
+        "event": event,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "blog_post": {"id": blog_id, "owner_id": owner_id, "title": title, "status": status},
+    }).encode("utf-8")
+    dispatcher.enqueue(WebhookDelivery(url, secret, event, body))
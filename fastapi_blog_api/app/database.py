@@ -1,13 +1,53 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import contextvars
 import os
+import time
+from app.core import metrics
+from app.core.profiling import current_profile
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./blog.db")
 
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}  # needed for SQLite
 )
+
+class QueryCounter:
+    """
+    Counts the SQL statements executed on behalf of one request.
+
+    Attributes:
+        count (int): Number of statements.
+        seconds (float): Total execution time of the statements.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+# Counter of the current request, None (the default) when statements are not counted.
+# Threadpool code runs in a copy of the request context, so it shares the counter.
+current_query_counter = contextvars.ContextVar("current_query_counter", default=None)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    """Stores the start time of a statement on its execution context."""
+    context._query_start = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    """Records the duration of a statement in the metrics, the request query counter and the request profile."""
+    elapsed = time.perf_counter() - context._query_start
+    metrics.db_query_duration_seconds.labels(metrics.sql_operation(statement)).observe(elapsed)
+    counter = current_query_counter.get()
+    if counter is not None: # Statement counting enabled for this request
+        counter.count += 1
+        counter.seconds += elapsed
+    profile = current_profile.get()
+    if profile is not None: # Request profiling enabled
+        profile.add_statement(statement, elapsed)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, DateTime, Integer, JSON, LargeBinary, String, Text, ForeignKey, UniqueConstraint, func, text
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 
 class User(Base):
@@ -11,12 +11,16 @@ class User(Base):
         id (Column): The primary key and unique ID of the user.
         username (Column): The username of the user (unique).
         hashed_password (Column): The hashed password of the user.
+        webhook_url (Column): Default callback URL notified when a post generation finishes.
+        webhook_secret (Column): Secret used to sign the user's webhooks.
         blog_posts (relationship): Relationship with BlogPost model.
     """
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True, comment="Primary key user id")  # Changed to comment
     username = Column(String(50), unique=True, index=True, nullable=False, comment="Unique username of the user")  # Changed to comment
     hashed_password = Column(String, nullable=False, comment="User password hashed")  # Changed to comment
+    webhook_url = Column(String(2048), nullable=True, comment="Default callback URL for generation webhooks")
+    webhook_secret = Column(String(64), nullable=True, comment="HMAC secret signing the user's webhooks")
     blog_posts = relationship("BlogPost", back_populates="owner", cascade="all, delete-orphan")  # Removed description
 
 class BlogPost(Base):
@@ -30,12 +34,58 @@ class BlogPost(Base):
         content (Column): The content of the blog post.
         status (Column): The status of the blog post.
         owner_id (Column): Foreign key referencing the ID of the user who owns the blog post.
+        version (Column): Row version, incremented on every update. Used to derive ETags.
+        callback_url (Column): Callback URL notified when the generation finishes, overrides the owner's webhook_url.
+        deadline_seconds (Column): Wall-clock limit of the generation, overrides GENERATION_DEADLINE_SECONDS.
+        content_html (Column): Sanitized HTML rendering of the content, deferred.
+        toc (Column): Table of contents of the content (level, id and title of every heading), deferred.
+        reading_time_minutes (Column): Estimated reading time of the content.
+        heartbeat_at (Column): Last time the process generating the post, or about to, reported it alive.
         owner (relationship): Relationship with User model.
     """
     __tablename__ = "blog_posts"
     id = Column(Integer, primary_key=True, index=True, comment="Primary key blog post id")  # Changed to comment
     title = Column(String(150), nullable=False, comment="Title of the blog post")  # Changed to comment
     content = Column(Text, nullable=True, comment="Content of the blog post")  # Changed to comment
-    status = Column(String(50), default="pending", comment="Status of the blog post")  # Changed to comment
+    status = Column(String(50), default="pending", index=True, comment="Status of the blog post")  # Indexed for the generation queue and admission control
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="Foreign key referencing the User that owns this blog")  # Changed to comment
-    owner = relationship("User", back_populates="blog_posts")  # Removed description
\ No newline at end of file
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"), onupdate=text("version + 1"), comment="Row version, bumped on every update")  # Also bumped by set-based UPDATE statements
+    callback_url = Column(String(2048), nullable=True, comment="Callback URL for the generation webhook of this post")
+    deadline_seconds = Column(Integer, nullable=True, comment="Generation deadline of this post in seconds, overrides GENERATION_DEADLINE_SECONDS")
+    content_html = deferred(Column(Text, nullable=True, comment="Sanitized HTML rendering of the content"))  # Only loaded by the HTML endpoint
+    toc = deferred(Column(JSON, nullable=True, comment="Table of contents of the content"))  # Only loaded by the HTML endpoint
+    reading_time_minutes = Column(Integer, nullable=True, comment="Estimated reading time of the content in minutes")
+    heartbeat_at = Column(DateTime, nullable=True, comment="Last heartbeat of the process generating the post, UTC")  # Stale "pending"/"generating" posts were abandoned
+    owner = relationship("User", back_populates="blog_posts")  # Removed description
+
+class BlogPostRevision(Base):
+    """
+    SQLAlchemy model representing a revision of the content of a blog post.
+
+    Attributes:
+        __tablename__ (str): The name of the database table.
+        id (Column): The primary key of the revision.
+        blog_id (Column): Foreign key referencing the revised blog post.
+        revision (Column): Revision number, from 1 for each post.
+        base_revision (Column): Snapshot the content is rebuilt from, the revision itself for snapshots.
+        version (Column): Version of the post that had this content.
+        title (Column): Title of the post at this revision.
+        kind (Column): "snapshot" (whole content) or "delta" (changes since the previous revision).
+        data (Column): zlib-compressed content or delta, see app.core.revisions.
+        size (Column): Length of the content in characters.
+        checksum (Column): CRC-32 of the content, to detect content changed outside revisions.
+        created_at (Column): Time the revision was stored.
+    """
+    __tablename__ = "blog_post_revisions"
+    __table_args__ = (UniqueConstraint("blog_id", "revision", name="uq_blog_post_revisions_blog_id_revision"),) # Also the index of revision reads
+    id = Column(Integer, primary_key=True, comment="Primary key revision id")
+    blog_id = Column(Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=False, comment="Foreign key referencing the revised BlogPost")  # Also deleted explicitly, SQLite does not enforce foreign keys
+    revision = Column(Integer, nullable=False, comment="Revision number of the post, from 1")
+    base_revision = Column(Integer, nullable=False, comment="Snapshot revision the content is rebuilt from")
+    version = Column(Integer, nullable=False, comment="Version of the post with this content")
+    title = Column(String(150), nullable=False, comment="Title of the post at this revision")
+    kind = Column(String(10), nullable=False, comment="snapshot or delta")
+    data = Column(LargeBinary, nullable=False, comment="Compressed content or delta against the previous revision")
+    size = Column(Integer, nullable=False, comment="Length of the content in characters")
+    checksum = Column(BigInteger, nullable=False, comment="CRC-32 of the content")  # Unsigned 32 bits
+    created_at = Column(DateTime, nullable=False, server_default=func.now(), comment="Time the revision was stored")
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Literal, Optional
+from app.core.config import settings
 
 # User schemas
 class UserCreate(BaseModel):
@@ -35,9 +37,42 @@ class Token(BaseModel):
     Attributes:
         access_token (str): The access token string
         token_type (str): The type of token
+        refresh_token (Optional[str]): Long-lived token used to obtain new access tokens
     """
     access_token: str = Field(description="Access token string")
     token_type: str = Field(description="Type of the token")
+    refresh_token: Optional[str] = Field(default=None, description="Refresh token string, exchanged for a new access token at /refresh")
+
+class RefreshTokenRequest(BaseModel):
+    """
+    Pydantic model for renewing an access token.
+
+    Attributes:
+        refresh_token (str): The refresh token returned by login.
+    """
+    refresh_token: str = Field(..., description="Refresh token returned by login")
+
+class WebhookUpdate(BaseModel):
+    """
+    Pydantic model for setting the default webhook of a user.
+
+    Attributes:
+        url (Optional[HttpUrl]): Callback URL of every generation of the user, None to remove it.
+        rotate_secret (bool): Whether to replace the signing secret.
+    """
+    url: Optional[HttpUrl] = Field(default=None, description="Callback URL notified when a generation completes or fails, null to remove it")
+    rotate_secret: bool = Field(default=False, description="Replace the signing secret")
+
+class WebhookOut(BaseModel):
+    """
+    Pydantic model for outputting the webhook settings of a user.
+
+    Attributes:
+        url (Optional[str]): Default callback URL.
+        secret (str): Secret signing the X-Blog-Signature header of every webhook of the user.
+    """
+    url: Optional[str] = Field(description="Default callback URL")
+    secret: str = Field(description="HMAC-SHA256 secret signing the X-Blog-Signature header")
 
 class TokenData(BaseModel):
     """
@@ -63,8 +98,13 @@ class BlogPostBase(BaseModel):
 class BlogPostCreate(BlogPostBase):
     """
     Pydantic model for creating a new blog post, inherits from BlogPostBase
+
+    Attributes:
+        callback_url (Optional[HttpUrl]): URL notified when the generation finishes, optional.
+        deadline_seconds (Optional[int]): Wall-clock limit of the generation, optional.
     """
-    pass
+    callback_url: Optional[HttpUrl] = Field(default=None, description="URL receiving a signed webhook when the generation completes or fails, instead of the user's default webhook URL")
+    deadline_seconds: Optional[int] = Field(default=None, gt=0, le=settings.GENERATION_DEADLINE_MAX_SECONDS, description="Seconds the generation may take before the post is marked timed_out, instead of the server default")
 
 class BlogPostUpdate(BaseModel):
     """
@@ -93,4 +133,116 @@ class BlogPostOut(BlogPostBase):
 
     class Config:
         """Configuration for Pydantic model."""
-        orm_mode = True # Enables ORM mode for compatibility with SQLAlchemy models
\ No newline at end of file
+        orm_mode = True # Enables ORM mode for compatibility with SQLAlchemy models
+
+class TocEntry(BaseModel):
+    """
+    Pydantic model for a heading of the table of contents of a blog post.
+
+    Attributes:
+        level (int): Heading level, 1 to 6.
+        id (str): Anchor id of the heading in the HTML.
+        title (str): Plain text of the heading.
+    """
+    level: int = Field(description="Heading level, 1 to 6")
+    id: str = Field(description="Anchor id of the heading in the HTML")
+    title: str = Field(description="Plain text of the heading")
+
+class BlogPostHtmlOut(BaseModel):
+    """
+    Pydantic model for outputting the rendered HTML of a blog post.
+
+    Attributes:
+        id (int): The unique ID of the blog post.
+        title (str): The title of the blog post.
+        status (str): The status of the blog post.
+        html (str): Sanitized HTML rendering of the content.
+        toc (List[TocEntry]): Headings of the content, in order.
+        reading_time_minutes (int): Estimated reading time.
+    """
+    id: int = Field(description="Unique ID of the blog post")
+    title: str = Field(description="Title of the blog post")
+    status: str = Field(description="Status of the blog post")
+    html: str = Field(description="Sanitized HTML rendering of the content, raw HTML of the markdown is escaped")
+    toc: List[TocEntry] = Field(description="Table of contents, the headings of the content in order")
+    reading_time_minutes: int = Field(description="Estimated reading time in minutes")
+
+class BlogPostRevisionOut(BaseModel):
+    """
+    Pydantic model for listing a revision of a blog post.
+
+    Attributes:
+        revision (int): Revision number, from 1.
+        version (int): Version of the post that had this content.
+        title (str): Title of the post at this revision.
+        kind (str): How the revision is stored, snapshot or delta.
+        size (int): Length of the content in characters.
+        stored_bytes (int): Compressed size of the stored snapshot or delta.
+        created_at (datetime): Time the revision was stored.
+    """
+    revision: int = Field(description="Revision number, from 1")
+    version: int = Field(description="Version of the post that had this content")
+    title: str = Field(description="Title of the post at this revision")
+    kind: Literal["snapshot", "delta"] = Field(description="Stored as the whole content or as changes since the previous revision")
+    size: int = Field(description="Length of the content in characters")
+    stored_bytes: int = Field(description="Compressed size of the stored snapshot or delta")
+    created_at: datetime = Field(description="Time the revision was stored")
+
+class BlogPostRevisionContent(BlogPostRevisionOut):
+    """
+    Pydantic model for outputting a revision of a blog post with its content.
+
+    Attributes:
+        content (str): Content of the post at this revision.
+    """
+    content: str = Field(description="Content of the post at this revision")
+
+class BlogPostBulkDelete(BaseModel):
+    """
+    Pydantic model for deleting several blog posts at once.
+
+    Attributes:
+        ids (List[int]): IDs of the blog posts to delete.
+    """
+    ids: List[int] = Field(..., description="IDs of the blog posts to delete")
+
+class BlogPostBulkUpdate(BaseModel):
+    """
+    Pydantic model for updating several blog posts at once.
+
+    Attributes:
+        ids (List[int]): IDs of the blog posts to update.
+        title (Optional[str]): New title for every post, max length 150, optional.
+        status (Optional[str]): New status for every post, optional. "pending" schedules a new generation.
+    """
+    ids: List[int] = Field(..., description="IDs of the blog posts to update")
+    title: Optional[str] = Field(default=None, max_length=150, description="New title of the blog posts")
+    status: Optional[Literal["pending", "completed", "failed"]] = Field(default=None, description="New status of the blog posts")
+
+class BlogPostBulkResult(BaseModel):
+    """
+    Pydantic model for the result of a bulk operation.
+
+    Attributes:
+        ids (List[int]): IDs of the blog posts that were affected.
+        rejected (List[int]): IDs left unchanged because admission control rejected their regeneration.
+    """
+    ids: List[int] = Field(description="IDs of the affected blog posts")
+    rejected: List[int] = Field(default_factory=list, description="IDs of the blog posts whose regeneration was rejected by admission control, left unchanged")
+
+class BlogPostImportResult(BaseModel):
+    """
+    Pydantic model for the result of a bulk import.
+
+    Attributes:
+        imported (int): Number of posts created.
+        skipped (int): Number of invalid records that were skipped.
+        errors (List[str]): Descriptions of the first skipped records.
+        seconds (float): Duration of the import.
+        posts_per_second (float): Import throughput.
+    """
+    imported: int = Field(description="Number of posts created")
+    skipped: int = Field(description="Number of invalid records that were skipped")
+    errors: List[str] = Field(description="Descriptions of the first skipped records")
+    seconds: float = Field(description="Duration of the import in seconds")
+    posts_per_second: float = Field(description="Import throughput")
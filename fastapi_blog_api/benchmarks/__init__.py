@@ -0,0 +1 @@
+# Benchmark scripts, run from the fastapi_blog_api directory with `python -m benchmarks.<name>`
@@ -0,0 +1,166 @@
+"""
+Burst of post creations with and without admission control.
+
+A burst of concurrent POST /api/v1/blogs requests hits a uvicorn server
+running the app in this process ("inline" generation mode, so generations
+run as background tasks of the API process). The AI pipeline is replaced by
+a fake writer that sleeps and holds --generation-memory KiB while it runs.
+A probe lists posts every 50ms until every generation has finished, to
+show the latency other requests see while the generations compete with
+them for the threadpool. Configurations:
+
+- unlimited: no admission control, every post starts a generation.
+- reject: GENERATION_MAX_ACTIVE generations, the rest get 429 + Retry-After.
+- queue: GENERATION_MAX_ACTIVE generations, the rest are stored as "queued"
+  and generated as capacity frees up.
+
+Peak memory is the growth of the resident set size of the process during
+the run, sampled every 10ms (Linux only, "-" elsewhere).
+
+Usage:
+    python -m benchmarks.bench_admission [--burst 200] [--max-active 8] [--latency 1.0] [--generation-memory 2048]
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+import os
+from unittest import mock
+import httpx
+import uvicorn
+from benchmarks.common import create_user_with_posts, make_client, percentile
+from app.core import ai_agent
+from app.core.config import settings
+from app.core.generation import generation_registry
+from app.database import SessionLocal
+from app.models import BlogPost
+from main import app
+
+WAITING_STATUSES = ("pending", "queued", "generating")
+
+class FakeBlogWriter:
+    """Stand-in for ai_agent.write_blog_post that sleeps and holds memory like an agent run."""
+
+    def __init__(self, latency: float, memory_kib: int):
+        self.latency = latency
+        self.memory_kib = memory_kib
+
+    def __call__(self, topic: str, output_file: str = None) -> str:
+        held = b"x" * (self.memory_kib * 1024) # Agent memory, prompts and tool results, touched so it is resident
+        time.sleep(self.latency)
+        return f"# {topic}\n\n{len(held)} bytes of research."
+
+def rss_bytes():
+    """Returns the resident set size of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+def start_server():
+    """Starts uvicorn on a free local port in a background thread and returns it with its base URL."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off", timeout_keep_alive=60))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+def waiting_posts(owner_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(BlogPost).filter(BlogPost.owner_id == owner_id, BlogPost.status.in_(WAITING_STATUSES)).count()
+    finally:
+        db.close()
+
+async def burst(base_url: str, headers: dict, owner_id: int, args):
+    """Sends the burst and probes list latency until every generation has finished."""
+    statuses = {}
+    create_latencies = []
+    probe_latencies = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=args.burst + 1)) as client:
+        async def create(index):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/blogs", json={"title": f"Burst {index}"}, headers=headers)
+                outcome = str(response.status_code) if response.status_code != 200 else response.json()["status"]
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            create_latencies.append(time.perf_counter() - start)
+            statuses[outcome] = statuses.get(outcome, 0) + 1
+
+        async def probe():
+            while True:
+                start = time.perf_counter()
+                await client.get("/api/v1/blogs", params={"limit": 10}, headers=headers)
+                probe_latencies.append(time.perf_counter() - start)
+                if len(create_latencies) == args.burst and generation_registry.scheduled_count() == 0 \
+                        and not await asyncio.to_thread(waiting_posts, owner_id):
+                    return
+                await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        await asyncio.gather(probe(), *(create(index) for index in range(args.burst)))
+        drained = time.perf_counter() - start
+    return statuses, create_latencies, probe_latencies, drained
+
+def run(base_url: str, headers: dict, owner_id: int, max_active: int, policy: str, args):
+    peak_active = 0
+    peak_threads = 0
+    baseline = rss_bytes()
+    peak_rss = baseline
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak_active, peak_threads, peak_rss
+        while not done.wait(0.01):
+            peak_active = max(peak_active, generation_registry.active_count())
+            peak_threads = max(peak_threads, threading.active_count())
+            if baseline is not None:
+                peak_rss = max(peak_rss, rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    with mock.patch.object(ai_agent, "write_blog_post", FakeBlogWriter(args.latency, args.generation_memory)), \
+            mock.patch.object(settings, "GENERATION_MODE", "inline"), \
+            mock.patch.object(settings, "GENERATION_MAX_ACTIVE", max_active), \
+            mock.patch.object(settings, "GENERATION_MAX_QUEUED", 0), \
+            mock.patch.object(settings, "ADMISSION_POLICY", policy):
+        statuses, create_latencies, probe_latencies, drained = asyncio.run(burst(base_url, headers, owner_id, args))
+    done.set()
+    sampler.join()
+    peak_memory = None if baseline is None else peak_rss - baseline
+    return statuses, create_latencies, probe_latencies, drained, peak_active, peak_threads, peak_memory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=200, help="concurrent post creations")
+    parser.add_argument("--max-active", type=int, default=8, help="GENERATION_MAX_ACTIVE of the limited configurations")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake generation duration in seconds")
+    parser.add_argument("--generation-memory", type=int, default=2048, help="KiB held by each running generation")
+    args = parser.parse_args()
+
+    user, headers, _ = create_user_with_posts(make_client(), 20)
+    server, thread, base_url = start_server()
+    print(f"burst of {args.burst} creations, {args.latency}s generations holding {args.generation_memory} KiB each")
+    print(
+        f"{'configuration':<14}{'outcomes':<28}{'create p50/p99 ms':>19}{'list p50/p99 ms':>18}"
+        f"{'peak gens':>10}{'threads':>8}{'RSS +MiB':>9}{'drain s':>8}"
+    )
+    for name, max_active, policy in (("unlimited", 0, "reject"), ("reject", args.max_active, "reject"), ("queue", args.max_active, "queue")):
+        statuses, creates, probes, drained, peak_active, peak_threads, peak_memory = run(base_url, headers, user.id, max_active, policy, args)
+        outcomes = ", ".join(f"{outcome} {count}" for outcome, count in sorted(statuses.items()))
+        print(
+            f"{name:<14}{outcomes:<28}{percentile(creates, 50) * 1000:>9.0f}/{percentile(creates, 99) * 1000:<9.0f}"
+            f"{percentile(probes, 50) * 1000:>8.0f}/{percentile(probes, 99) * 1000:<9.0f}"
+            f"{peak_active:>10}{peak_threads:>8}{'-' if peak_memory is None else f'{peak_memory / 2 ** 20:.1f}':>9}{drained:>8.1f}"
+        )
+    server.should_exit = True
+    thread.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-request authentication overhead of get_current_user with the principal
+cache on and off, plus end-to-end latency of an authenticated read.
+
+Usage:
+    python -m benchmarks.bench_auth [--calls 20000] [--requests 2000]
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.common import make_client, create_user_with_posts, summarize
+from app.api.v1.endpoints.blogs import get_current_user
+from app.core.cache import principal_cache, post_cache
+from app.database import SessionLocal
+
+async def resolve(token, calls):
+    db = SessionLocal()
+    samples = []
+    try:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await get_current_user(token=token, db=db)
+            samples.append(time.perf_counter() - start)
+    finally:
+        db.close()
+    return samples
+
+def requests(client, headers, blog_id, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = make_client()
+    _, headers, ids = create_user_with_posts(client, 1)
+    token = headers["Authorization"].split(" ", 1)[1]
+    maxsize = principal_cache.maxsize
+
+    for label, size in (("off", 0), ("on", maxsize)):
+        principal_cache.maxsize = size
+        principal_cache.clear()
+        post_cache.clear()
+        resolve_samples = asyncio.run(resolve(token, args.calls))
+        request_samples = requests(client, headers, ids[0], args.requests)
+        mean_us = sum(resolve_samples) / len(resolve_samples) * 1e6
+        print(f"cache {label}: get_current_user mean={mean_us:.1f}us {summarize(resolve_samples)}; GET /blogs/{{id}} {summarize(request_samples)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Bytes saved and CPU cost of response compression, and the effect of pre-compressed cached posts.
+
+For every coding and level the script reports the wire size of a list
+response and the CPU time spent compressing it. It then times cached
+single-post reads, which reuse the compressed variant stored in the post
+cache, against compressing the same body on every read.
+
+Usage:
+    python -m benchmarks.bench_compression [--posts 100] [--requests 500]
+"""
+import argparse
+import random
+import time
+from benchmarks.common import make_client, create_user_with_posts, random_markdown, summarize
+from app.database import SessionLocal
+from app.models import BlogPost
+from app.core import compression
+from app.core.config import settings
+from app.core.cache import post_cache
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 5, 9)}
+
+def compress_ms(body: bytes, encoding: str, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compression.compress_body(body, encoding)
+    return round((time.perf_counter() - start) / repeat * 1000, 2)
+
+def read_posts(client, headers, ids, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(f"/api/v1/blogs/{random.choice(ids)}", headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--content-size", type=int, default=8000)
+    args = parser.parse_args()
+
+    client = make_client()
+    _, headers, ids = create_user_with_posts(client, args.posts, args.content_size)
+    db = SessionLocal()
+    try: # Distinct bodies per post, identical ones would compress unrealistically well
+        for blog_id in ids:
+            db.query(BlogPost).filter(BlogPost.id == blog_id).update({"content": random_markdown(args.content_size)})
+        db.commit()
+    finally:
+        db.close()
+    body = client.get("/api/v1/blogs", headers={**headers, "Accept-Encoding": "identity"}).content
+    print(f"list response: {len(body)} bytes uncompressed")
+    for encoding in compression.supported_encodings():
+        for level in LEVELS[encoding]:
+            settings.GZIP_LEVEL = settings.BROTLI_QUALITY = level
+            size = len(compression.compress_body(body, encoding))
+            print(f"  {encoding:<4} level {level}: {size} bytes ({1 - size / len(body):.1%} saved), {compress_ms(body, encoding)} ms CPU")
+
+    encoding = compression.supported_encodings()[0]
+    settings.GZIP_LEVEL, settings.BROTLI_QUALITY = 6, 5
+    encoded_headers = {**headers, "Accept-Encoding": encoding}
+    post_cache.clear()
+    read_posts(client, encoded_headers, ids, len(ids) * 2) # Fill the cache and its compressed variants
+    precompressed = summarize(read_posts(client, encoded_headers, ids, args.requests))
+
+    for entry in post_cache._data.values(): # Keep the cached bodies, drop their compressed variants on every read
+        entry[1]["encoded"] = _Forgetful()
+    recompressed = summarize(read_posts(client, encoded_headers, ids, args.requests))
+    print(f"cached post reads ({encoding}), pre-compressed: {precompressed}")
+    print(f"cached post reads ({encoding}), compressed per read: {recompressed}")
+
+class _Forgetful(dict):
+    """Variant store that never keeps anything, forcing compression on every read."""
+
+    def __setitem__(self, key, value):
+        pass
+
+if __name__ == "__main__":
+    main()
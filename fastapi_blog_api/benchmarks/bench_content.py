@@ -0,0 +1,88 @@
+"""
+Time to first byte and peak memory of GET /api/v1/blogs/{id}/content as posts grow.
+
+One post per --sizes entry is stored, then fetched through a local uvicorn
+server (TestClient buffers whole responses, so it cannot show a first
+byte): once through GET /api/v1/blogs/{id}, which loads the post and
+serializes it as JSON, and once through the streamed /content endpoint,
+whole and as a 16 KiB range (the first screen of a reader). Peak memory is
+the tracemalloc peak of the process, server included, over one request.
+
+Usage:
+    python -m benchmarks.bench_content [--sizes 64K,1M,16M] [--requests 10]
+"""
+import argparse
+import time
+import tracemalloc
+import httpx
+from benchmarks.bench_hedging import start_server
+from benchmarks.common import create_user_with_posts, make_client, percentile, random_markdown
+from app.database import SessionLocal
+from app.models import BlogPost
+from main import app
+
+UNITS = {"K": 1024, "M": 1024 * 1024}
+
+def parse_size(text: str) -> int:
+    """Parses 64K, 1M or a plain number of bytes."""
+    text = text.strip().upper()
+    return int(text[:-1]) * UNITS[text[-1]] if text[-1] in UNITS else int(text)
+
+def measure(client: httpx.Client, url: str, headers: dict, requests: int):
+    """Returns the median time to first byte, median total time and the largest peak memory of the requests."""
+    first_bytes, totals, peaks = [], [], []
+    for traced in (False, True): # tracemalloc slows allocations down, so times are taken without it
+        if traced:
+            tracemalloc.start()
+        for _ in range(requests):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            with client.stream("GET", url, headers=headers) as response:
+                chunks = response.iter_raw()
+                next(chunks, None)
+                first_byte = time.perf_counter() - start
+                for _ in chunks:
+                    pass
+            if traced:
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            else:
+                first_bytes.append(first_byte)
+                totals.append(time.perf_counter() - start)
+        tracemalloc.stop()
+    return percentile(first_bytes, 50), percentile(totals, 50), max(peaks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="64K,1M,16M", help="comma-separated post sizes in bytes, K and M suffixes allowed")
+    parser.add_argument("--requests", type=int, default=10, help="requests per measurement")
+    args = parser.parse_args()
+
+    user, headers, _ = create_user_with_posts(make_client(), 0)
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    page = random_markdown(64 * 1024)
+    db = SessionLocal()
+    try:
+        posts = [BlogPost(title=f"Post {size}", content=(page * (size // len(page) + 1))[:size], status="completed", owner_id=user.id) for size in sizes]
+        db.add_all(posts)
+        db.commit()
+        ids = [post.id for post in posts]
+    finally:
+        db.close()
+
+    server, thread, base_url = start_server(app)
+    print(f"{'size':>8}  {'request':<22}{'TTFB ms':>9}{'total ms':>10}{'peak MiB':>10}")
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for size, post_id in zip(sizes, ids):
+            for name, url, extra in (
+                ("GET /{id} (JSON)", f"/api/v1/blogs/{post_id}", {}),
+                ("GET /{id}/content", f"/api/v1/blogs/{post_id}/content", {}),
+                ("  Range: 16 KiB", f"/api/v1/blogs/{post_id}/content", {"Range": "bytes=0-16383"}),
+            ):
+                first_byte, total, peak = measure(client, url, {**headers, **extra, "Accept-Encoding": "identity"}, args.requests)
+                print(f"{args.sizes.split(',')[sizes.index(size)]:>8}  {name:<22}{first_byte * 1000:>9.1f}{total * 1000:>10.1f}{peak / 2 ** 20:>10.2f}")
+    server.should_exit = True
+    thread.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Peak server-side memory of exporting all posts: streamed NDJSON export versus
+materializing the list the way GET /api/v1/blogs does.
+
+Usage:
+    python -m benchmarks.bench_export [--posts 1000 10000]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from benchmarks.common import make_client, create_user_with_posts
+from app.api.v1.endpoints.blogs import iter_export_lines, serialize_post
+from app.database import SessionLocal
+from app.models import BlogPost
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": size, "seconds": round(elapsed, 3), "peak_mb": round(peak / 2**20, 2)}
+
+def export(owner_id):
+    return sum(len(chunk) for chunk in iter_export_lines(owner_id)) # Consume and drop every chunk
+
+def materialize(owner_id):
+    db = SessionLocal()
+    try:
+        blogs = db.query(BlogPost).filter(BlogPost.owner_id == owner_id).all()
+        return len(json.dumps([serialize_post(blog) for blog in blogs]))
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--content-size", type=int, default=4000)
+    args = parser.parse_args()
+
+    client = make_client()
+    for posts in args.posts:
+        user, _, _ = create_user_with_posts(client, posts, args.content_size)
+        print(f"{posts} posts: export={measure(lambda: export(user.id))} list={measure(lambda: materialize(user.id))}")
+
+if __name__ == "__main__":
+    main()
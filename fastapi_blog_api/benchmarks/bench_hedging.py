@@ -0,0 +1,117 @@
+"""
+Tail latency of research requests with and without hedging.
+
+A local uvicorn server stands in for r.jina.ai: it answers after
+--latency seconds (with +-50% jitter), except for a --slow-share of requests
+that take --slow-latency seconds, the long tail of a real scraping service.
+--requests GET requests are sent from --concurrency threads through a
+HedgedClient, first with hedging disabled (no budget), then with the
+backup request sent at the HEDGE_PERCENTILE latency and capped by
+HEDGE_BUDGET_RATIO. The first --warmup requests of each run fill the
+latency window and are not measured.
+
+Extra load is the share of requests the server received on top of the
+measured ones.
+
+Usage:
+    python -m benchmarks.bench_hedging [--requests 2000] [--concurrency 8] [--slow-share 0.03] [--percentile 95] [--budget 0.1]
+"""
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import uvicorn
+from benchmarks.common import percentile
+from app.core.smoltools.hedging import HedgeBudget, HedgedClient
+
+class SlowServer:
+    """ASGI app answering after a random latency, with a long tail."""
+
+    def __init__(self, latency: float, slow_latency: float, slow_share: float, seed: int = 7):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_share = slow_share
+        self.random = random.Random(seed)
+        self.received = 0
+        self.cancelled = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.received += 1
+        slow = self.random.random() < self.slow_share
+        delay = self.slow_latency if slow else self.latency * self.random.uniform(0.5, 1.5)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError: # The client closed the connection
+            self.cancelled += 1
+            raise
+        body = b"Title: Page\n\n" + b"content " * 512
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+def start_server(app):
+    """Starts uvicorn on a free local port in a background thread and returns it with its base URL."""
+    sock = socket.socket()
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Inherited by accepted connections, else keep-alive responses wait 40ms for delayed ACKs
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="error", lifespan="off", timeout_keep_alive=60))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+def run(base_url: str, server: SlowServer, hedged: bool, args):
+    client = HedgedClient("scrape", percentile=args.percentile, budget_ratio=args.budget, initial_delay=args.slow_latency)
+    if not hedged:
+        client.budget = HedgeBudget(0.0, capacity=0.0)
+
+    def call(index):
+        start = time.perf_counter()
+        client.get(f"{base_url}/https://example.com/page-{index}", timeout=30)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(call, range(args.warmup)))
+        received = server.received
+        start = time.perf_counter()
+        latencies = list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        extra = server.received - received - args.requests
+    client.stop()
+    return latencies, extra, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per configuration")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests filling the latency window")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads sending requests")
+    parser.add_argument("--latency", type=float, default=0.02, help="typical server latency in seconds")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="latency of slow responses in seconds")
+    parser.add_argument("--slow-share", type=float, default=0.03, help="share of slow responses")
+    parser.add_argument("--percentile", type=float, default=95, help="HEDGE_PERCENTILE")
+    parser.add_argument("--budget", type=float, default=0.1, help="HEDGE_BUDGET_RATIO")
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests from {args.concurrency} threads, {args.latency * 1000:.0f}ms typical latency, "
+        f"{args.slow_share:.0%} of responses take {args.slow_latency}s"
+    )
+    print(f"{'configuration':<14}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'p99.9 ms':>10}{'max ms':>8}{'extra load':>12}{'wall s':>8}")
+    for name, hedged in (("no hedging", False), (f"hedged p{args.percentile:g}", True)):
+        app = SlowServer(args.latency, args.slow_latency, args.slow_share)
+        server, thread, base_url = start_server(app)
+        latencies, extra, elapsed = run(base_url, app, hedged, args)
+        print(
+            f"{name:<14}" + "".join(f"{percentile(latencies, q) * 1000:>{width}.0f}" for q, width in ((50, 8), (95, 8), (99, 8), (99.9, 10)))
+            + f"{max(latencies) * 1000:>8.0f}{extra / args.requests:>12.1%}{elapsed:>8.1f}"
+        )
+        server.should_exit = True
+        thread.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Bulk import throughput, reported per window of posts to check that it stays
+stable as the table grows.
+
+Usage:
+    python -m benchmarks.bench_import [--posts 100000] [--chunk-size 1000]
+"""
+import argparse
+import io
+import json
+from benchmarks.common import make_client, create_user_with_posts, random_markdown
+from app.core.importer import import_posts, iter_ndjson_posts
+from app.database import SessionLocal
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--content-size", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=10000, help="Posts per reported throughput window")
+    args = parser.parse_args()
+
+    user, _, _ = create_user_with_posts(make_client(), 0)
+    content = random_markdown(args.content_size)
+    ndjson = io.BytesIO(b"".join(
+        json.dumps({"title": f"Imported {i}", "content": content}).encode() + b"\n" for i in range(args.posts)
+    ))
+
+    windows = []
+    last = {"done": 0, "seconds": 0.0}
+    def progress(done, seconds):
+        if done - last["done"] >= args.window or done == args.posts:
+            windows.append(round((done - last["done"]) / (seconds - last["seconds"]), 1))
+            last.update(done=done, seconds=seconds)
+
+    db = SessionLocal()
+    try:
+        result = import_posts(db, user.id, iter_ndjson_posts(ndjson), args.chunk_size, progress=progress)
+    finally:
+        db.close()
+    print(f"imported {result['imported']} posts in {result['seconds']}s: {result['posts_per_second']} posts/s")
+    print(f"posts/s per {args.window}-post window: {windows}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+LLM calls and generation latency with and without the LLM response cache.
+
+Posts are generated with the staged pipeline against the offline stand-in
+model (see offline_model), built per stage by build_model like the real
+models, at the temperatures of TEMPERATURES, which decide which stages are
+cached: the manager, researcher and checker run at temperature 0 (as with
+<STAGE>_TEMPERATURE=0), the writer and editor sample and always reach the model. --topics distinct
+topics are spread over --posts generations, as when users retry a post or
+several users ask for the same subject.
+
+Usage:
+    python -m benchmarks.bench_llm_cache [--posts 6] [--topics 2] [--latency 0.2]
+"""
+import argparse
+import time
+from unittest import mock
+from benchmarks.common import percentile
+from benchmarks.offline_model import OfflineModel, use_offline_models
+from app.core import ai_agent, metrics
+from app.core.cache import llm_cache
+from app.core.config import settings
+from app.core.llm import build_model
+
+TEMPERATURES = {"manager": 0.0, "researcher": 0.0, "checker": 0.0, "writer": 0.7, "editor": 0.3}
+
+def offline(model):
+    """Unwraps the cache and deadline wrappers of a built model."""
+    while not isinstance(model, OfflineModel):
+        model = model.model
+    return model
+
+def run(cache_size: int, args):
+    def factory(role):
+        return lambda model_id, **parameters: OfflineModel(role, model_id=model_id, latency=args.latency, **parameters)
+
+    stages = settings.STAGE_MODELS
+    results = {result: sum(metrics.sample_value("blog_llm_cache_requests_total", stage=stage, result=result) for stage in stages) for result in ("hit", "miss")}
+    models = []
+    latencies = []
+    llm_cache.clear()
+    with mock.patch.object(settings, "GENERATION_PIPELINE", "staged"), \
+            mock.patch.object(settings, "LLM_CACHE_SIZE", cache_size):
+        for index in range(args.posts):
+            built = {role: build_model(role, dict(config, model="offline", temperature=TEMPERATURES[role], fallback_model=""), factory=factory(role)) for role, config in stages.items()}
+            with use_offline_models(models=built):
+                start = time.perf_counter()
+                ai_agent.write_blog_post(f"Benchmark topic {index % args.topics}")
+                latencies.append(time.perf_counter() - start)
+            models.extend(built.values())
+    llm_cache.clear()
+    calls = sum(offline(model).calls for model in models)
+    results = {result: sum(metrics.sample_value("blog_llm_cache_requests_total", stage=stage, result=result) for stage in stages) - before for result, before in results.items()}
+    return calls, results, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=6)
+    parser.add_argument("--topics", type=int, default=2, help="distinct topics among the posts")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds to first token per LLM call")
+    args = parser.parse_args()
+
+    print(f"{args.posts} posts over {args.topics} topics, {args.latency}s to first token")
+    print(f"{'cache':<6} {'LLM calls/post':>15} {'hits':>6} {'misses':>7} {'p50 s':>8} {'max s':>8}")
+    for name, size in (("off", 0), ("on", settings.LLM_CACHE_SIZE or 1024)):
+        calls, results, latencies = run(size, args)
+        print(
+            f"{name:<6} {calls / args.posts:>15.1f} {results['hit']:>6.0f} {results['miss']:>7.0f} "
+            f"{percentile(latencies, 50):>8.2f} {max(latencies):>8.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+In-process load test: concurrent virtual users against the whole API.
+
+Each virtual user registers, logs in, then runs a weighted mix of actions
+until the run ends: create a post and poll it until generation finishes,
+list posts, read, update and delete one of its own posts. The AI pipeline
+is replaced by a fake writer with configurable latency, failure rate and
+content size, and posts are generated by in-process generation workers
+(GENERATION_MODE=worker, as with serve.py), so only the API is measured.
+
+Throughput, p50/p95/p99 latency and error rate are reported per endpoint
+(by route template) and written to a JSON file together with the git
+commit and the run parameters, so runs can be compared across commits.
+Pass --baseline with an earlier results file to print the differences.
+
+bcrypt dominates register and login; lower BCRYPT_ROUNDS to focus on the
+other endpoints.
+
+Usage:
+    BCRYPT_ROUNDS=4 python -m benchmarks.bench_load [--users 20] [--duration 30]
+        [--mix create=2,list=4,get=4,update=1,delete=1] [--fake-latency 0.5]
+        [--fake-failure-rate 0.05] [--output load-test-results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from unittest import mock
+import httpx
+from benchmarks.common import percentile, random_markdown
+from app.core import ai_agent, generation
+from app.core.config import settings
+from main import app
+
+PASSWORD = "loadtestpassword"
+ACTIONS = ("create", "list", "get", "update", "delete")
+DEFAULT_MIX = "create=2,list=4,get=4,update=1,delete=1"
+TERMINAL_STATUSES = {"completed", "failed", "timed_out"}
+
+class FakeBlogWriter:
+    """
+    Stand-in for ai_agent.write_blog_post.
+
+    Sleeps for the configured latency (plus uniform jitter), then either
+    raises, with probability failure_rate, or returns generated markdown.
+    """
+
+    def __init__(self, latency: float, jitter: float, failure_rate: float, content_size: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.content = random_markdown(content_size)
+
+    def __call__(self, topic: str, output_file: str = None) -> str:
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Fake agent failure")
+        return f"# {topic}\n\n{self.content}"
+
+class Recorder:
+    """Collects the latency and outcome of every request by endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.generations = defaultdict(list) # Final status -> seconds from create to completion
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, expected=(200,), **kwargs):
+        """
+        Sends a request and records it under the endpoint name.
+
+        Returns:
+            Optional[httpx.Response]: The response, or None if the request raised.
+        """
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            response = None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response is None or response.status_code not in expected:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        """
+        Builds the per-endpoint results.
+
+        Args:
+            elapsed (float): Duration of the measured run in seconds.
+
+        Returns:
+            dict: "totals", "endpoints" and "generations" sections.
+        """
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            samples = self.latencies[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(samples), 4),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3),
+            }
+        requests = sum(len(samples) for samples in self.latencies.values())
+        errors = sum(self.errors.values())
+        generations = {
+            outcome: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            }
+            for outcome, samples in sorted(self.generations.items())
+        }
+        return {
+            "totals": {
+                "requests": requests,
+                "errors": errors,
+                "error_rate": round(errors / requests, 4) if requests else 0.0,
+                "throughput_rps": round(requests / elapsed, 2),
+            },
+            "endpoints": endpoints,
+            "generations": generations,
+        }
+
+class VirtualUser:
+    """One simulated client with its own account and posts."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.headers = {}
+        self.posts = [] # Ids of this user's posts that still exist
+
+    async def sign_in(self) -> bool:
+        credentials = {"username": f"load_{uuid.uuid4().hex[:12]}", "password": PASSWORD}
+        response = await self.recorder.request(self.client, "POST /api/v1/users/register", "POST", "/api/v1/users/register", json=credentials)
+        if response is None or response.status_code != 200:
+            return False
+        response = await self.recorder.request(self.client, "POST /api/v1/users/login", "POST", "/api/v1/users/login", json=credentials)
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def run(self, actions, weights, deadline: float):
+        if not await self.sign_in():
+            return
+        while time.perf_counter() < deadline:
+            action = random.choices(actions, weights)[0]
+            if action != "create" and not self.posts:
+                action = "create" # Nothing to read, update or delete yet
+            await getattr(self, action)()
+            if self.args.think_time:
+                await asyncio.sleep(random.uniform(0, 2 * self.args.think_time))
+
+    async def create(self):
+        started = time.perf_counter()
+        response = await self.recorder.request(
+            self.client, "POST /api/v1/blogs", "POST", "/api/v1/blogs",
+            json={"title": f"Load test {uuid.uuid4().hex[:8]}"}, headers=self.headers,
+        )
+        if response is None or response.status_code != 200:
+            return
+        blog_id = response.json()["id"]
+        self.posts.append(blog_id)
+        poll_deadline = started + self.args.poll_timeout
+        while time.perf_counter() < poll_deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            response = await self.recorder.request(
+                self.client, "GET /api/v1/blogs/{blog_id} (poll)", "GET", f"/api/v1/blogs/{blog_id}", headers=self.headers,
+            )
+            if response is None or response.status_code != 200:
+                return
+            status = response.json()["status"]
+            if status in TERMINAL_STATUSES:
+                self.recorder.generations[status].append(time.perf_counter() - started)
+                return
+        self.recorder.generations["timeout"].append(time.perf_counter() - started)
+
+    async def list(self):
+        await self.recorder.request(self.client, "GET /api/v1/blogs", "GET", "/api/v1/blogs", headers=self.headers)
+
+    async def get(self):
+        blog_id = random.choice(self.posts)
+        await self.recorder.request(self.client, "GET /api/v1/blogs/{blog_id}", "GET", f"/api/v1/blogs/{blog_id}", headers=self.headers)
+
+    async def update(self):
+        blog_id = random.choice(self.posts)
+        await self.recorder.request(
+            self.client, "PUT /api/v1/blogs/{blog_id}", "PUT", f"/api/v1/blogs/{blog_id}",
+            json={"title": f"Updated {uuid.uuid4().hex[:8]}"}, headers=self.headers,
+        )
+
+    async def delete(self):
+        blog_id = self.posts.pop(random.randrange(len(self.posts)))
+        await self.recorder.request(
+            self.client, "DELETE /api/v1/blogs/{blog_id}", "DELETE", f"/api/v1/blogs/{blog_id}",
+            expected=(204,), headers=self.headers,
+        )
+
+def parse_mix(mix: str):
+    """
+    Parses an action mix such as "create=2,list=4".
+
+    Returns:
+        Tuple[List[str], List[float]]: Action names and their weights.
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise SystemExit(f"Unknown action in --mix: {name}")
+        weights[name] = float(weight or 1)
+    return list(weights), list(weights.values())
+
+def git_commit():
+    """Returns the current git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_users(args, recorder: Recorder) -> float:
+    actions, weights = parse_mix(args.mix)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        users = []
+        for index in range(args.users):
+            users.append(asyncio.create_task(VirtualUser(client, recorder, args).run(actions, weights, deadline)))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.users)
+        await asyncio.gather(*users)
+        return time.perf_counter() - start
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"{'endpoint':<38} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint, stats in results["endpoints"].items():
+        print(
+            f"{endpoint:<38} {stats['requests']:>6} {stats['throughput_rps']:>8} {stats['p50_ms']:>9} "
+            f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['error_rate']:>7.1%}"
+        )
+        previous = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if previous:
+            print(
+                f"{'  vs baseline':<38} {'':>6} {stats['throughput_rps'] - previous['throughput_rps']:>+8.2f} "
+                f"{stats['p50_ms'] - previous['p50_ms']:>+9.3f} {stats['p95_ms'] - previous['p95_ms']:>+9.3f} "
+                f"{stats['p99_ms'] - previous['p99_ms']:>+9.3f} {stats['error_rate'] - previous['error_rate']:>+7.1%}"
+            )
+    totals = results["totals"]
+    print(f"total: {totals['requests']} requests, {totals['throughput_rps']} req/s, error rate {totals['error_rate']:.1%}")
+    for outcome, stats in results["generations"].items():
+        print(f"generations {outcome}: {stats['count']}, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms (create to final status)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which users start")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action weights, from create, list, get, update, delete")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between actions of a user, in seconds")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="seconds between status polls after a create")
+    parser.add_argument("--poll-timeout", type=float, default=30.0, help="seconds before a generation counts as timed out")
+    parser.add_argument("--generation-workers", type=int, default=2, help="in-process generation worker threads")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="seconds the fake AI pipeline takes per post")
+    parser.add_argument("--fake-jitter", type=float, default=0.1, help="uniform jitter added to the fake latency")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.05, help="probability that a fake generation fails")
+    parser.add_argument("--fake-content-size", type=int, default=4000, help="characters of generated content")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the action mix")
+    parser.add_argument("--output", default="load-test-results.json", help="JSON results file")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    fake = FakeBlogWriter(args.fake_latency, args.fake_jitter, args.fake_failure_rate, args.fake_content_size)
+    settings.GENERATION_MODE = "worker" # Pending rows are claimed by the workers below, as with serve.py
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=generation.run_worker, args=(stop, 0.05), name=f"generation-worker-{index}", daemon=True)
+        for index in range(args.generation_workers)
+    ]
+    recorder = Recorder()
+    started_at = datetime.now(timezone.utc).isoformat()
+    with mock.patch.object(ai_agent, "write_blog_post", fake):
+        for worker in workers:
+            worker.start()
+        try:
+            elapsed = asyncio.run(run_users(args, recorder))
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    results = {
+        "started_at": started_at,
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "elapsed_seconds": round(elapsed, 3),
+        **recorder.report(elapsed),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print(f"baseline: commit {baseline.get('commit')}, started {baseline.get('started_at')}")
+    print_report(results, baseline)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
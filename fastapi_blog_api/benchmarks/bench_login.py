@@ -0,0 +1,46 @@
+"""
+Session renewal throughput: password login (bcrypt verification) versus the
+refresh-token flow, sequentially and with concurrent clients.
+
+Usage:
+    python -m benchmarks.bench_login [--requests 200] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.common import make_client, create_user_with_posts
+from main import app
+
+PASSWORD = "benchpassword"
+
+async def run(path, body, requests, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+        async def worker():
+            for _ in remaining:
+                response = await client.post(path, json=body)
+                assert response.status_code == 200, response.text
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    client = make_client()
+    user, _, _ = create_user_with_posts(client, 0, password=PASSWORD)
+    login_body = {"username": user.username, "password": PASSWORD}
+    refresh_body = {"refresh_token": client.post("/api/v1/users/login", json=login_body).json()["refresh_token"]}
+
+    for concurrency in sorted({1, args.concurrency}):
+        login_rate = asyncio.run(run("/api/v1/users/login", login_body, args.requests, concurrency))
+        refresh_rate = asyncio.run(run("/api/v1/users/refresh", refresh_body, args.requests, concurrency))
+        print(f"concurrency {concurrency}: login {login_rate:.1f} req/s, refresh {refresh_rate:.1f} req/s")
+
+if __name__ == "__main__":
+    main()
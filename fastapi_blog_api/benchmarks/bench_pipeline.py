@@ -0,0 +1,57 @@
+"""
+LLM calls and end-to-end latency of the manager and staged generation pipelines.
+
+Both pipelines run against the offline stand-in model (see offline_model),
+which plays every role with a simulated latency, so the difference comes
+from the orchestration alone: the CodeAgent manager spends one LLM call per
+step deciding which agent to call next, the staged pipeline calls the
+stages directly. --reject-rounds makes the checker reject the first
+research rounds, to compare the research loops.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--posts 3] [--latency 0.5] [--chars-per-second 2000] [--reject-rounds 0]
+"""
+import argparse
+import time
+from unittest import mock
+from benchmarks.common import percentile
+from benchmarks.offline_model import ROLES, use_offline_models
+from app.core import ai_agent
+from app.core.config import settings
+
+def run(pipeline: str, args):
+    calls = {role: 0 for role in ROLES}
+    input_tokens = 0
+    latencies = []
+    with mock.patch.object(settings, "GENERATION_PIPELINE", pipeline):
+        for index in range(args.posts):
+            options = {"latency": args.latency, "chars_per_second": args.chars_per_second, "reject_rounds": args.reject_rounds}
+            with use_offline_models(**options) as models:
+                start = time.perf_counter()
+                ai_agent.write_blog_post(f"Benchmark topic {index}")
+                latencies.append(time.perf_counter() - start)
+            for role, model in models.items():
+                calls[role] += model.calls
+                input_tokens += model.input_tokens
+    return calls, input_tokens, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated seconds to first token per LLM call")
+    parser.add_argument("--chars-per-second", type=float, default=2000.0, help="simulated generation speed")
+    parser.add_argument("--reject-rounds", type=int, default=0, help="research rounds rejected by the checker")
+    args = parser.parse_args()
+
+    print(f"{args.posts} posts, {args.latency}s to first token, {args.chars_per_second:.0f} chars/s, {args.reject_rounds} rejected rounds")
+    print(f"{'pipeline':<10} {'LLM calls/post':>15} {'input tokens/post':>18} {'p50 s':>8} {'max s':>8}  calls by role")
+    for pipeline in ("manager", "staged"):
+        calls, input_tokens, latencies = run(pipeline, args)
+        by_role = ", ".join(f"{role} {count / args.posts:g}" for role, count in calls.items() if count)
+        print(
+            f"{pipeline:<10} {sum(calls.values()) / args.posts:>15.1f} {input_tokens / args.posts:>18.0f} "
+            f"{percentile(latencies, 50):>8.2f} {max(latencies):>8.2f}  {by_role}"
+        )
+
+if __name__ == "__main__":
+    main()
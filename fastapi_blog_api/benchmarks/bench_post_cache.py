@@ -0,0 +1,45 @@
+"""
+Read latency of GET /api/v1/blogs/{id} with the single-post cache on and off.
+
+Usage:
+    python -m benchmarks.bench_post_cache [--posts 200] [--requests 3000]
+"""
+import argparse
+import random
+import time
+from benchmarks.common import make_client, create_user_with_posts, summarize
+from app.core.cache import post_cache
+
+def run(client, headers, ids, requests: int):
+    samples = []
+    for _ in range(requests):
+        blog_id = random.choice(ids)
+        start = time.perf_counter()
+        response = client.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--content-size", type=int, default=8000)
+    args = parser.parse_args()
+
+    client = make_client()
+    _, headers, ids = create_user_with_posts(client, args.posts, args.content_size)
+    maxsize = max(post_cache.maxsize, args.posts)
+
+    post_cache.maxsize = 0 # Cache off
+    off = summarize(run(client, headers, ids, args.requests))
+
+    post_cache.maxsize = maxsize # Cache on
+    post_cache.clear()
+    on = summarize(run(client, headers, ids, args.requests))
+
+    print(f"cache off: {off}")
+    print(f"cache on:  {on} stats={post_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Cost of rendering posts to HTML, and bulk re-render throughput.
+
+First, the render cost one page view saves: the time render_markdown takes
+for one post, against reading the stored rendering from GET
+/api/v1/blogs/{id}/html. Then every post is re-rendered with rerender_posts,
+once per process pool size, to show how bulk re-rendering scales with
+workers (0: rendered in the benchmark process, for reference).
+
+Usage:
+    python -m benchmarks.bench_render [--posts 5000] [--content-size 8000] [--workers 1,2,4]
+"""
+import argparse
+import os
+import time
+from benchmarks.common import create_user_with_posts, make_client, percentile, random_markdown
+from app.core.rendering import render_markdown, rerender_posts
+from app.database import SessionLocal
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--content-size", type=int, default=8000, help="approximate characters per post")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({0, 1, 2, 4, os.cpu_count() or 1})), help="comma-separated pool sizes, 0 renders in-process")
+    parser.add_argument("--reads", type=int, default=500, help="requests per read measurement")
+    args = parser.parse_args()
+
+    client = make_client()
+    _, headers, ids = create_user_with_posts(client, args.posts, content_size=args.content_size)
+    content = random_markdown(args.content_size)
+    renders = []
+    for _ in range(args.reads):
+        start = time.perf_counter()
+        render_markdown(content)
+        renders.append(time.perf_counter() - start)
+    print(f"{args.posts} posts of {args.content_size} characters")
+    print(f"render_markdown: p50 {percentile(renders, 50) * 1000:.2f}ms, p99 {percentile(renders, 99) * 1000:.2f}ms per post")
+
+    client.get(f"/api/v1/blogs/{ids[0]}/html", headers=headers) # First read renders and stores
+    reads = []
+    for _ in range(args.reads):
+        start = time.perf_counter()
+        client.get(f"/api/v1/blogs/{ids[0]}/html", headers=headers)
+        reads.append(time.perf_counter() - start)
+    print(f"GET /{{id}}/html (stored): p50 {percentile(reads, 50) * 1000:.2f}ms, p99 {percentile(reads, 99) * 1000:.2f}ms per request")
+
+    print(f"{'workers':>8}{'posts/s':>10}{'seconds':>9}")
+    for workers in (int(n) for n in args.workers.split(",")):
+        db = SessionLocal()
+        try:
+            result = rerender_posts(db, workers=workers)
+        finally:
+            db.close()
+        print(f"{workers:>8}{result['posts_per_second']:>10.0f}{result['seconds']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Storage overhead and reconstruction latency of post revision histories.
+
+A post of --content-size characters is edited --revisions times, each edit
+a few small changes: a word replaced, a sentence added, a paragraph dropped
+or rewritten. The history is recorded with record_revision, the way PUT
+/api/v1/blogs/{id} does, once per snapshot interval (1 stores every revision
+as a snapshot). Storage is compared with full copies of every revision, raw
+and compressed. Reconstruction is get_revision on --reads random revisions,
+query included.
+
+Usage:
+    python -m benchmarks.bench_revisions [--revisions 300] [--content-size 8000] [--intervals 1,10,20,50]
+"""
+import argparse
+import random
+import time
+import zlib
+from unittest.mock import patch
+from sqlalchemy import func
+from benchmarks.common import create_user_with_posts, make_client, percentile, random_markdown
+from app.core.config import settings
+from app.core.revisions import get_revision, record_revision
+from app.database import SessionLocal
+from app.models import BlogPost, BlogPostRevision
+
+def edit(content: str, rng: random.Random, vocabulary) -> str:
+    """Applies one to three small random edits to content."""
+    paragraphs = content.split("\n\n")
+    for _ in range(rng.randint(1, 3)):
+        index = rng.randrange(len(paragraphs))
+        words = paragraphs[index].split(" ")
+        action = rng.random()
+        if action < 0.5: # Fix a word
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            paragraphs[index] = " ".join(words)
+        elif action < 0.8: # Add a sentence
+            paragraphs[index] += " " + " ".join(rng.choices(vocabulary, k=rng.randint(8, 20))) + "."
+        elif action < 0.9 and len(paragraphs) > 4: # Drop a paragraph
+            del paragraphs[index]
+        else: # Rewrite a paragraph
+            paragraphs[index] = " ".join(rng.choices(vocabulary, k=len(words)))
+    return "\n\n".join(paragraphs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revisions", type=int, default=300, help="edits per post")
+    parser.add_argument("--content-size", type=int, default=8000, help="approximate characters of the post")
+    parser.add_argument("--intervals", default="1,10,20,50", help="comma-separated REVISION_SNAPSHOT_INTERVAL values")
+    parser.add_argument("--reads", type=int, default=300, help="random revisions read per interval")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    draft = random_markdown(args.content_size)
+    vocabulary = draft.split()
+    contents = [draft]
+    for _ in range(args.revisions):
+        contents.append(edit(contents[-1], rng, vocabulary))
+    raw = sum(len(content.encode("utf-8")) for content in contents)
+    compressed = sum(len(zlib.compress(content.encode("utf-8"))) for content in contents)
+    print(f"{len(contents)} revisions of a {len(draft)} character post, {len(contents[-1])} characters after the last edit")
+    print(f"full copies: {raw / 1024:.0f} KiB raw, {compressed / 1024:.0f} KiB compressed")
+    print(f"{'interval':>8}{'stored KiB':>12}{'vs raw':>8}{'vs zlib':>9}{'x post':>8}{'write ms':>10}{'read p50 ms':>13}{'read p99 ms':>13}{'read max ms':>13}")
+
+    user, _, _ = create_user_with_posts(make_client(), 0)
+    for interval in (int(n) for n in args.intervals.split(",")):
+        db = SessionLocal()
+        try:
+            blog = BlogPost(title="History", content=contents[0], status="completed", owner_id=user.id)
+            db.add(blog)
+            db.commit()
+            writes = []
+            with patch.object(settings, "REVISION_SNAPSHOT_INTERVAL", interval):
+                for content in contents[1:]:
+                    start = time.perf_counter()
+                    record_revision(db, blog, content)
+                    blog.content = content
+                    db.commit()
+                    writes.append(time.perf_counter() - start)
+            stored = db.query(func.sum(func.length(BlogPostRevision.data))).filter(BlogPostRevision.blog_id == blog.id).scalar()
+            reads = []
+            for revision in [rng.randint(1, len(contents)) for _ in range(args.reads)]:
+                start = time.perf_counter()
+                _, content = get_revision(db, blog.id, revision)
+                reads.append(time.perf_counter() - start)
+                assert content == contents[revision - 1]
+            db.commit()
+        finally:
+            db.close()
+        print(
+            f"{interval:>8}{stored / 1024:>12.1f}{stored / raw:>8.1%}{stored / compressed:>9.1%}{stored / len(contents[-1].encode('utf-8')):>8.1f}"
+            f"{percentile(writes, 50) * 1000:>10.2f}{percentile(reads, 50) * 1000:>13.2f}{percentile(reads, 99) * 1000:>13.2f}{max(reads) * 1000:>13.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
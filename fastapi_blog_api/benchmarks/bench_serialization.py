@@ -0,0 +1,67 @@
+"""
+Requests/s of GET /api/v1/blogs on a list of 1k posts, plus the cost of each serialization path.
+
+The "model" path is what response_model=List[BlogPostOut] did before: load
+ORM objects, validate them into BlogPostOut and dump them. The "fast" path
+is what the endpoint does now: select plain column rows, build the payload
+with serialize_post and encode it with dump_json (orjson when installed).
+
+Usage:
+    python -m benchmarks.bench_serialization [--posts 1000] [--requests 50]
+"""
+import argparse
+import time
+from typing import List
+from pydantic import TypeAdapter
+from benchmarks.common import make_client, create_user_with_posts
+from app.database import SessionLocal
+from app.models import BlogPost
+from app.schemas import BlogPostOut
+from app.core import responses
+from app.api.v1.endpoints.blogs import POST_COLUMNS, serialize_post
+
+def time_ms(func, repeat: int) -> float:
+    func() # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - start) / repeat * 1000, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--content-size", type=int, default=4000)
+    args = parser.parse_args()
+
+    client = make_client()
+    user, headers, _ = create_user_with_posts(client, args.posts, args.content_size)
+
+    client.get("/api/v1/blogs", headers=headers) # Warm up
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        response = client.get("/api/v1/blogs", headers=headers)
+        assert response.status_code == 200
+    elapsed = time.perf_counter() - start
+    print(f"GET /api/v1/blogs ({args.posts} posts, {len(response.content)} bytes): {args.requests / elapsed:.1f} req/s")
+
+    adapter = TypeAdapter(List[BlogPostOut])
+    db = SessionLocal()
+    try:
+        def model_path():
+            db.expunge_all() # Measure loading, not identity map hits
+            blogs = db.query(BlogPost).filter(BlogPost.owner_id == user.id).order_by(BlogPost.id).all()
+            return adapter.dump_json(adapter.validate_python(blogs, from_attributes=True))
+
+        def fast_path():
+            rows = db.query(*POST_COLUMNS).filter(BlogPost.owner_id == user.id).order_by(BlogPost.id).all()
+            return responses.dump_json([serialize_post(row) for row in rows])
+
+        encoder = "orjson" if responses.orjson is not None else "json"
+        print(f"model path (ORM + BlogPostOut validation): {time_ms(model_path, 10)} ms")
+        print(f"fast path (column rows + {encoder}):        {time_ms(fast_path, 10)} ms")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
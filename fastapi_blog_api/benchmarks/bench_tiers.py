@@ -0,0 +1,102 @@
+"""
+Stage latency of the generation pipeline across model tier configurations.
+
+Stages run against the offline stand-in model (see offline_model) with two
+simulated tiers: "offline-large" (slow to first token, slow generation) and
+"offline-small" (fast). A third, "offline-overloaded", never answers within
+the LLM timeout, to show the fallback model taking over. Configurations:
+
+- uniform: every stage on the large model, as with a single shared model.
+- tiered: manager, researcher and checker on the small model, the checker
+  limited to 256 tokens; writer and editor on the large model.
+- fallback: tiered, but the writer's primary model is overloaded and the
+  small model is its fallback.
+
+Usage:
+    python -m benchmarks.bench_tiers [--posts 3] [--pipeline staged] [--timeout 10]
+"""
+import argparse
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from unittest import mock
+from benchmarks.common import percentile
+from benchmarks.offline_model import OfflineModel, use_offline_models
+from app.core import ai_agent, metrics
+from app.core.config import settings
+from app.core.llm import build_model
+
+TIERS = {
+    "offline-large": {"latency": 0.8, "chars_per_second": 1500.0},
+    "offline-small": {"latency": 0.25, "chars_per_second": 5000.0},
+    "offline-overloaded": {"latency": 60.0, "chars_per_second": 1500.0},
+}
+
+def stage(model: str, max_tokens: int, temperature: float, fallback_model: str = "") -> dict:
+    return {"model": model, "max_tokens": max_tokens, "temperature": temperature, "fallback_model": fallback_model}
+
+CONFIGURATIONS = {
+    "uniform": {
+        "manager": stage("offline-large", 4096, 0.0),
+        "researcher": stage("offline-large", 4096, 0.0),
+        "checker": stage("offline-large", 4096, 0.0),
+        "writer": stage("offline-large", 4096, 0.0),
+        "editor": stage("offline-large", 4096, 0.0),
+    },
+    "tiered": {
+        "manager": stage("offline-small", 2048, 0.0),
+        "researcher": stage("offline-small", 2048, 0.0),
+        "checker": stage("offline-small", 256, 0.0),
+        "writer": stage("offline-large", 4096, 0.7),
+        "editor": stage("offline-large", 4096, 0.3),
+    },
+}
+CONFIGURATIONS["fallback"] = dict(CONFIGURATIONS["tiered"], writer=stage("offline-overloaded", 4096, 0.7, "offline-small"))
+
+def build_models(configuration: dict) -> dict:
+    """Builds the offline model of every stage like ai_agent builds the real ones."""
+    def factory(role):
+        return lambda model_id, **parameters: OfflineModel(role, model_id=model_id, **TIERS[model_id], **parameters)
+    return {role: build_model(role, config, factory=factory(role)) for role, config in configuration.items()}
+
+def run(configuration: dict, args):
+    durations = defaultdict(list)
+
+    @contextmanager
+    def recording_stage(name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            durations[name].append(time.perf_counter() - start)
+
+    totals = []
+    fallbacks = sum(metrics.sample_value("blog_llm_fallbacks_total", stage=role) for role in configuration)
+    with mock.patch.object(settings, "GENERATION_PIPELINE", args.pipeline), \
+            mock.patch.object(settings, "LLM_TIMEOUT_SECONDS", args.timeout), \
+            mock.patch.object(ai_agent, "timed_stage", recording_stage):
+        for index in range(args.posts):
+            with use_offline_models(models=build_models(configuration)):
+                start = time.perf_counter()
+                ai_agent.write_blog_post(f"Benchmark topic {index}")
+                totals.append(time.perf_counter() - start)
+    fallbacks = sum(metrics.sample_value("blog_llm_fallbacks_total", stage=role) for role in configuration) - fallbacks
+    return durations, totals, fallbacks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=3)
+    parser.add_argument("--pipeline", choices=("manager", "staged"), default="staged")
+    parser.add_argument("--timeout", type=float, default=10.0, help="LLM timeout before falling back, in seconds")
+    args = parser.parse_args()
+
+    stages = ("super_researcher", "research_checker", "writer", "editor")
+    print(f"{args.pipeline} pipeline, {args.posts} posts, p50 seconds per stage")
+    print(f"{'configuration':<14}" + "".join(f"{name:>18}" for name in stages) + f"{'end to end':>12}{'fallbacks':>11}")
+    for name, configuration in CONFIGURATIONS.items():
+        durations, totals, fallbacks = run(configuration, args)
+        cells = "".join(f"{percentile(durations[stage], 50):>18.2f}" if durations[stage] else f"{'-':>18}" for stage in stages)
+        print(f"{name:<14}{cells}{percentile(totals, 50):>12.2f}{fallbacks:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run in-process against a throwaway SQLite database so they never
+touch blog.db. Importing this module sets DATABASE_URL before the app is
+imported, so it must be imported before `main` or `app.database`.
+"""
+import os
+import random
+import string
+import tempfile
+import time
+
+_bench_dir = tempfile.mkdtemp(prefix="blog-bench-") # Throwaway database location
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_bench_dir}/bench.db")
+
+from fastapi.testclient import TestClient
+from app.database import SessionLocal
+from app.models import User, BlogPost
+from app.core.security import get_password_hash
+from main import app
+
+def make_client() -> TestClient:
+    """
+    Returns a test client bound to the application.
+
+    Returns:
+        TestClient: In-process HTTP client.
+    """
+    return TestClient(app)
+
+def random_markdown(size: int) -> str:
+    """
+    Generates markdown-like text of roughly the given size.
+
+    Args:
+        size (int): Approximate number of characters.
+
+    Returns:
+        str: Generated text.
+    """
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9))) for _ in range(200)]
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = " ".join(random.choices(words, k=80))
+        paragraphs.append(f"## {words[len(paragraphs) % len(words)].title()}\n\n{paragraph}\n")
+        length += len(paragraphs[-1])
+    return "\n".join(paragraphs)[:size]
+
+def create_user_with_posts(client: TestClient, posts: int, content_size: int = 4000, password: str = "benchpassword"):
+    """
+    Creates a user owning a number of completed posts and logs it in.
+
+    Args:
+        client (TestClient): Application client.
+        posts (int): Number of completed posts to insert.
+        content_size (int): Approximate size of each post body.
+        password (str): Password of the user.
+
+    Returns:
+        Tuple[User, dict, List[int]]: The user, its auth headers and the post ids.
+    """
+    db = SessionLocal()
+    try:
+        username = f"bench_{time.time_ns()}"
+        user = User(username=username, hashed_password=get_password_hash(password))
+        db.add(user)
+        db.commit()
+        content = random_markdown(content_size)
+        db.add_all([BlogPost(title=f"Post {i}", content=content, status="completed", owner_id=user.id) for i in range(posts)])
+        db.commit()
+        ids = [row.id for row in db.query(BlogPost.id).filter(BlogPost.owner_id == user.id)]
+        db.expunge(user)
+    finally:
+        db.close()
+    token = client.post("/api/v1/users/login", json={"username": username, "password": password}).json()["access_token"]
+    return user, {"Authorization": f"Bearer {token}"}, ids
+
+def percentile(samples, pct: float) -> float:
+    """
+    Returns the nearest-rank percentile of a list of samples.
+
+    Args:
+        samples (List[float]): Measured values.
+        pct (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile value.
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(samples) -> dict:
+    """
+    Summarizes latency samples given in seconds.
+
+    Args:
+        samples (List[float]): Latencies in seconds.
+
+    Returns:
+        dict: count, p50_ms, p95_ms and p99_ms.
+    """
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
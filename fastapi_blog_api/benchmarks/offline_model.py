@@ -0,0 +1,199 @@
+"""
+Offline stand-in for the LLM behind the generation agents.
+
+OfflineModel answers like a cooperative model playing one role of the
+pipeline (manager, researcher, checker, writer or editor), with a simulated
+latency: a fixed time to first token plus the output length divided by a
+generation speed. It never touches the network and counts its calls and
+tokens, so pipelines can be compared by LLM call count and latency.
+
+use_offline_models() patches every agent of app.core.ai_agent with its own
+OfflineModel and replaces the research tools with offline ones.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+from smolagents import tool
+from smolagents.models import ChatMessage, ChatMessageToolCall, ChatMessageToolCallDefinition, Model
+from smolagents.monitoring import LogLevel
+from app.core import ai_agent
+
+SEARCH_RESULT = "Offline search result: product {n} launched with a 20% faster chip, according to https://example.com/source-{n}."
+
+@tool
+def search_facts_with_jina_ai(query: str) -> str:
+    """Offline replacement of the Jina AI search tool.
+
+    Args:
+        query: The search query string used to find relevant facts and information.
+
+    Returns:
+        str: Canned search results.
+    """
+    return "\n".join(SEARCH_RESULT.format(n=n) for n in range(5))
+
+@tool
+def scrape_page_with_jina_ai(url: str) -> str:
+    """Offline replacement of the Jina AI scraping tool.
+
+    Args:
+        url: The URL of the webpage to scrape.
+
+    Returns:
+        str: Canned page content.
+    """
+    return f"Offline page content of {url}. " * 20
+
+def _role(message) -> str:
+    return getattr(message["role"], "value", message["role"]) # MessageRole members or plain strings
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(element.get("text", "") for element in content if isinstance(element, dict))
+    return str(content or "")
+
+class OfflineModel(Model):
+    """
+    Scripted model for one pipeline role.
+
+    The completion parameters given as keyword arguments are honoured:
+    max_tokens truncates the answer and a call that would take longer than
+    timeout, from the constructor or the call, raises TimeoutError after timeout seconds.
+
+    Attributes:
+        role (str): "manager", "researcher", "checker", "writer" or "editor".
+        latency (float): Seconds to the first token.
+        chars_per_second (float): Simulated generation speed.
+        searches (int): Tool calls the researcher makes before answering.
+        reject_rounds (int): Research rounds the checker rejects before approving.
+        calls (int): Calls made so far.
+        input_tokens (int): Approximate prompt tokens sent so far (4 characters per token).
+    """
+
+    def __init__(self, role: str, latency: float = 0.05, chars_per_second: float = 4000.0, searches: int = 2,
+                 reject_rounds: int = 0, model_id: str = "offline", **kwargs):
+        super().__init__(**kwargs)
+        self.role = role
+        self.model_id = model_id
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.searches = searches
+        self.reject_rounds = reject_rounds
+        self.calls = 0
+        self.input_tokens = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs) -> ChatMessage:
+        prompt = "\n".join(_text(message["content"]) for message in messages)
+        if self.role == "manager":
+            content, tool_call = self._manager(messages), None
+        else:
+            content, tool_call = getattr(self, f"_{self.role}")(messages, prompt, tools_to_call_from)
+        limit = self.kwargs["max_tokens"] * 4 if self.kwargs.get("max_tokens") else None # max_tokens truncates the answer, 4 characters per token
+        if tool_call is None:
+            content = content[:limit]
+        elif tool_call[0] == "final_answer":
+            tool_call = ("final_answer", {"answer": tool_call[1]["answer"][:limit]})
+        output = content if tool_call is None else str(tool_call[1])
+        duration = self.latency + len(output) / self.chars_per_second
+        timeout = kwargs.get("timeout", self.kwargs.get("timeout")) # Per-call timeouts come from the generation deadline
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += len(prompt) // 4
+        if timeout and duration > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"{self.model_id} did not answer within {timeout}s")
+        time.sleep(duration)
+        self.last_input_token_count = len(prompt) // 4
+        self.last_output_token_count = len(output) // 4
+        if tool_call is None:
+            return ChatMessage(role="assistant", content=content)
+        name, arguments = tool_call
+        call = ChatMessageToolCall(function=ChatMessageToolCallDefinition(name=name, arguments=arguments), id=f"call_{self.calls}", type="function")
+        return ChatMessage(role="assistant", content="", tool_calls=[call])
+
+    @staticmethod
+    def _answer(text: str, tools):
+        """Returns a plain answer, or a final_answer tool call inside an agent loop."""
+        if tools:
+            return "", ("final_answer", {"answer": text})
+        return text, None
+
+    def _researcher(self, messages, prompt, tools):
+        done = sum(1 for message in messages if _role(message) == "tool-response")
+        if tools and done < self.searches:
+            return "", ("search_facts_with_jina_ai", {"query": f"research query {done + 1}"})
+        notes = "Findings for this round:\n" + "\n".join(f"- Product {n} ships a faster chip (https://example.com/source-{n})." for n in range(12))
+        return self._answer(notes, tools)
+
+    def _checker(self, messages, prompt, tools):
+        rounds = prompt.count("Findings for this round")
+        verdict = "REJECTED\nNeeds more named products and sources." if rounds <= self.reject_rounds else "APPROVED"
+        return self._answer(verdict, tools)
+
+    def _writer(self, messages, prompt, tools):
+        body = "\n\n".join(f"## Product {n}\n\n" + "Product details and why they matter to AI practitioners. " * 8 for n in range(8))
+        return self._answer(f"# Draft\n\n{body}", tools)
+
+    def _editor(self, messages, prompt, tools):
+        body = "\n\n".join(f"## Product {n}\n\n" + "Polished details and why they matter to AI practitioners. " * 8 for n in range(8))
+        return self._answer(f"# Final post\n\n{body}", tools)
+
+    def _manager(self, messages) -> str:
+        """Writes the next code action of the CodeAgent manager, one managed agent per step."""
+        actions = [_text(message["content"]) for message in messages if _role(message) == "assistant"]
+        last = actions[-1] if actions else ""
+        observation = _text(messages[-1]["content"]) if actions else ""
+        if not actions:
+            code = 'research = super_researcher(request="Research the topic thoroughly, focusing on specific products and sources.")\nprint(research)'
+        elif "research_checker(" in last and "REJECTED" in observation:
+            code = 'research = research + "\\n\\n" + super_researcher(request="The checker rejected the research, research what is missing.")\nprint(research)'
+        elif "super_researcher(" in last:
+            code = 'check = research_checker(request="Is this research relevant and sufficient? Answer APPROVED or REJECTED.\\n" + research)\nprint(check)'
+        elif "research_checker(" in last:
+            code = 'draft = writer(request="Write an engaging blog post from this research:\\n" + research)\nprint(draft)'
+        elif "writer(" in last:
+            code = 'final = editor(request="Edit and polish this blog post:\\n" + draft + "\\n\\nResearch:\\n" + research)\nprint(final)'
+        else:
+            code = "final_answer(final)"
+        return f"Thought: Next step of the plan.\nCode:\n```py\n{code}\n```"
+
+ROLES = {
+    "manager": "blog_manager",
+    "researcher": "research_agent",
+    "checker": "research_checker_agent",
+    "writer": "writer_agent",
+    "editor": "copy_editor_agent",
+}
+
+@contextmanager
+def use_offline_models(models=None, **options):
+    """
+    Runs the pipeline with offline models and tools.
+
+    The staged pipeline reaches the models through the agents, so patching
+    the agents covers both pipelines.
+
+    Args:
+        models (dict, optional): Role -> model, for roles that need a specific
+            model (e.g. a tiered configuration). Other roles get an OfflineModel
+            built with options.
+        **options: OfflineModel options, e.g. latency or reject_rounds.
+
+    Yields:
+        dict: Role -> model used.
+    """
+    models = dict(models or {})
+    for role in ROLES:
+        models.setdefault(role, OfflineModel(role, **options))
+    with ExitStack() as stack:
+        for role, attribute in ROLES.items():
+            agent = getattr(ai_agent, attribute)
+            stack.enter_context(mock.patch.object(agent, "model", models[role]))
+            stack.enter_context(mock.patch.object(agent.logger, "level", LogLevel.ERROR)) # Keep the console quiet
+        stack.enter_context(mock.patch.dict(ai_agent.research_agent.tools, {
+            "search_facts_with_jina_ai": search_facts_with_jina_ai,
+            "scrape_page_with_jina_ai": scrape_page_with_jina_ai,
+        }))
+        yield models
@@ -0,0 +1,49 @@
+"""
+Imports existing markdown posts as completed blog posts, without AI generation.
+
+Usage:
+    python import_posts.py --username alice posts.ndjson
+    python import_posts.py --username alice archive.tar.gz
+"""
+import argparse
+import sys
+from app.database import SessionLocal, engine, Base
+from app.models import User
+from app.core.config import settings
+from app.core.importer import CorruptUpload, import_posts, iter_ndjson_posts, iter_tar_posts
+
+def pick_reader(path: str):
+    """Returns the record reader matching the file name."""
+    if path.endswith((".ndjson", ".jsonl", ".json")):
+        return iter_ndjson_posts
+    return iter_tar_posts # gzip/bz2/xz compression is detected from the content
+
+def main():
+    """Parses the command line and runs the import."""
+    parser = argparse.ArgumentParser(description="Import markdown posts as completed blog posts.")
+    parser.add_argument("path", help="NDJSON file of {title, content} objects or tar archive of .md files")
+    parser.add_argument("--username", required=True, help="Owner of the imported posts")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE, help="Posts per INSERT and transaction")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine) # Make sure the tables exist
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if not user:
+            sys.exit(f"Unknown user: {args.username}")
+        with open(args.path, "rb") as fileobj:
+            result = import_posts(
+                db, user.id, pick_reader(args.path)(fileobj), args.chunk_size,
+                progress=lambda done, seconds: print(f"  {done} posts, {done / seconds:.0f} posts/s", file=sys.stderr),
+            )
+    except CorruptUpload as e:
+        sys.exit(f"{args.path} is truncated or corrupt ({e}), {e.imported} posts were imported before the error")
+    finally:
+        db.close()
+    print(f"Imported {result['imported']} posts in {result['seconds']}s ({result['posts_per_second']} posts/s), skipped {result['skipped']}")
+    for error in result["errors"]:
+        print(f"  skipped {error}")
+
+if __name__ == "__main__":
+    main()
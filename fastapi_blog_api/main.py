@@ -1,23 +1,59 @@
+from contextlib import asynccontextmanager # Import the decorator for the app lifespan
 from fastapi import FastAPI # Import FastAPI to create the app instance
-from app.api.v1.endpoints import users, blogs # Import the user and blog routes
+from fastapi.concurrency import run_in_threadpool # Import threadpool execution for blocking shutdown work
+from app.api.v1.endpoints import users, blogs, metrics, admin # Import the user, blog, metrics and admin routes
 from app.database import engine, Base # Import database engine and base for ORM
+from app.core.compression import CompressionMiddleware # Import brotli/gzip response compression
+from app.core.metrics import MetricsMiddleware, mark_process_dead # Import request latency recording and cross-process metrics
+from app.core.profiling import ProfilingMiddleware # Import opt-in request profiling
+from app.core.cache import profile_reports # Import the store of profiling reports
+from app.core.debug import QueryCountMiddleware # Import per-request SQL statement counting
+from app.core.webhooks import dispatcher # Import the webhook delivery queue
+from app.core.config import settings # Import settings for the generation mode
+from app.core.generation import resume_inline_generations, start_heartbeats # Import the restart of abandoned inline generations and the heartbeats
 import uvicorn # Import uvicorn for running the server
 
 # Create all tables (in production, use Alembic migrations)
 Base.metadata.create_all(bind=engine) # Create all database tables defined in SQLAlchemy models
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: on startup, in "inline" mode, resumes the
+    generations abandoned by stopped processes and starts the heartbeats of
+    this one's; on shutdown, delivers the webhooks still queued in this
+    worker and drops its live gauges from the multiprocess metrics.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    if settings.GENERATION_MODE == "inline": # In "worker" mode, the workers send heartbeats and requeue
+        await run_in_threadpool(resume_inline_generations)
+        start_heartbeats(recover=resume_inline_generations) # Until the process exits, generations may outlive the lifespan
+    yield
+    await run_in_threadpool(dispatcher.stop) # Waits at most WEBHOOK_DRAIN_SECONDS
+    mark_process_dead() # Only with PROMETHEUS_MULTIPROC_DIR, the counters of this worker stay in the totals
+
 app = FastAPI( # Create the FastAPI app instance
     title="AI-Powered Blog Post Creation API", # API title
     description="API for managing users and AI-generated blog posts.", # API description
     version="1.0.0", # API version
     docs_url="/docs",  # Swagger UI URL
     redoc_url="/redoc",  # ReDoc UI URL
-    openapi_url="/openapi.json" # OpenAPI spec URL
+    openapi_url="/openapi.json", # OpenAPI spec URL
+    lifespan=lifespan # Resume inline generations on startup, drain webhooks on shutdown
 )
 
+app.add_middleware(CompressionMiddleware) # Compress large JSON responses negotiated via Accept-Encoding
+app.add_middleware(QueryCountMiddleware) # Report SQL statements per request in X-SQL-Count when DEBUG is set
+app.add_middleware(ProfilingMiddleware, reports=profile_reports) # Profile admin requests flagged with X-Profile or ?profile=1
+app.add_middleware(MetricsMiddleware) # Outermost, so latencies include compression
+
 # Include routers from endpoints
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"]) # Include user router with /api/v1/users prefix and tag
 app.include_router(blogs.router, prefix="/api/v1/blogs", tags=["blogs"]) # Include blog router with /api/v1/blogs prefix and tag
+app.include_router(metrics.router, tags=["metrics"]) # Include metrics router serving /metrics
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"]) # Include admin router with /api/v1/admin prefix and tag
 
 if __name__ == "__main__":
     """
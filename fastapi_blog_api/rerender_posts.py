@@ -0,0 +1,35 @@
+"""
+Renders the stored HTML, table of contents and reading time of existing posts again.
+
+Run it after changing the renderer, or with --missing to render posts
+stored before rendering existed or imported since.
+
+Usage:
+    python rerender_posts.py [--missing] [--workers 4] [--batch-size 500]
+"""
+import argparse
+import sys
+from app.database import SessionLocal
+from app.core.config import settings
+from app.core.rendering import rerender_posts
+
+def main():
+    """Parses the command line and runs the re-render."""
+    parser = argparse.ArgumentParser(description="Render the HTML of existing blog posts again.")
+    parser.add_argument("--missing", action="store_true", help="Only render posts without stored HTML")
+    parser.add_argument("--workers", type=int, default=settings.RENDER_WORKERS, help="Rendering processes, 0 renders in this process")
+    parser.add_argument("--batch-size", type=int, default=settings.RENDER_BATCH_SIZE, help="Posts per read and UPDATE")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rerender_posts(
+            db, workers=args.workers, batch_size=args.batch_size, only_missing=args.missing,
+            progress=lambda done, seconds: print(f"  {done} posts, {done / seconds:.0f} posts/s", file=sys.stderr),
+        )
+    finally:
+        db.close()
+    print(f"Rendered {result['rendered']} posts in {result['seconds']}s ({result['posts_per_second']} posts/s)")
+
+if __name__ == "__main__":
+    main()
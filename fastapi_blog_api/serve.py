@@ -0,0 +1,133 @@
+"""
+Production launcher: N API worker processes plus a separate pool of generation workers.
+
+The API workers are plain uvicorn workers that only store new posts as
+pending rows. The generation workers claim pending rows from the database
+and run the AI agent, so long agent runs never compete with request handling
+and both pools can be sized independently.
+
+Shutdown (Ctrl+C or SIGTERM) stops the API workers first, then lets every
+generation worker finish the post it is writing before exiting. Posts still
+marked "generating" after a crash are put back in the queue on the next start.
+
+Every process writes its metrics to PROMETHEUS_MULTIPROC_DIR (a temporary
+directory unless set), the multiprocess mode of prometheus_client, so
+/metrics on any API worker reports the totals of all API and generation
+workers.
+
+Usage:
+    python serve.py --api-workers 4 --generation-workers 2
+"""
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+
+os.environ["GENERATION_MODE"] = "worker" # API processes must leave generation to the worker pool
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"): # Set once by the launcher before prometheus_client is imported, inherited by the worker processes
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="blog-metrics-")
+    os.environ["METRICS_MULTIPROCESS_TEMPORARY"] = "1"
+
+import uvicorn # Import uvicorn for running the API workers
+from app.core import metrics
+from app.core.config import settings
+from app.core.generation import requeue_abandoned_posts, run_worker
+from app.core.webhooks import dispatcher
+from app.database import engine, Base
+
+logger = logging.getLogger("serve")
+
+def generation_worker(stop_event, poll_interval: float):
+    """
+    Entry point of a generation worker process.
+
+    Ctrl+C is delivered to the whole process group, so the worker ignores
+    SIGINT and only stops through stop_event, after its current job.
+    SIGTERM sent to the worker directly requests the same graceful stop.
+    Webhooks still queued are then delivered for up to WEBHOOK_DRAIN_SECONDS.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    engine.dispose() # Never reuse connections inherited from the parent
+    run_worker(stop_event, poll_interval)
+    dispatcher.stop() # Deliver queued webhooks, child processes skip atexit handlers
+
+def start_generation_workers(count: int, poll_interval: float):
+    """
+    Starts the generation worker processes.
+
+    Args:
+        count (int): Number of processes.
+        poll_interval (float): Idle wait of a worker when the queue is empty.
+
+    Returns:
+        Tuple[Event, List[Process]]: The shared stop event and the started processes.
+    """
+    context = multiprocessing.get_context("spawn") # Fresh interpreters, no forked locks or DB connections
+    stop_event = context.Event()
+    workers = [
+        context.Process(target=generation_worker, args=(stop_event, poll_interval), name=f"generation-worker-{i}")
+        for i in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    return stop_event, workers
+
+def stop_generation_workers(stop_event, workers, drain_seconds: float):
+    """
+    Asks the generation workers to stop and waits for their in-flight jobs.
+
+    Workers still running after drain_seconds are terminated; their posts stay
+    "generating" and are requeued once their heartbeat is stale.
+
+    Args:
+        stop_event (Event): Stop event shared with the workers.
+        workers (List[Process]): Generation worker processes.
+        drain_seconds (float): Maximum time to wait for in-flight jobs.
+    """
+    stop_event.set()
+    deadline = time.monotonic() + drain_seconds # One deadline for all, the workers drain in parallel
+    for worker in workers:
+        worker.join(max(0, deadline - time.monotonic()))
+    for worker in workers:
+        if worker.is_alive():
+            logger.warning("%s did not drain in time, terminating", worker.name)
+            worker.terminate()
+            worker.join()
+    for worker in workers:
+        metrics.mark_process_dead(worker.pid) # Its running generations and queued webhooks are gone, its counters stay
+
+def main():
+    """Parses the command line and runs both worker pools until shutdown."""
+    parser = argparse.ArgumentParser(description="Run the API with separate generation workers.")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--api-workers", type=int, default=settings.API_WORKERS, help="Number of API worker processes")
+    parser.add_argument("--generation-workers", type=int, default=settings.GENERATION_WORKERS, help="Number of generation worker processes")
+    parser.add_argument("--drain-seconds", type=float, default=settings.GENERATION_DRAIN_SECONDS, help="Maximum wait for in-flight generations on shutdown")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    Base.metadata.create_all(bind=engine) # Make sure the tables exist
+    for values in glob.glob(os.path.join(settings.PROMETHEUS_MULTIPROC_DIR, "*.db")): # Metrics restart from zero with the processes
+        os.remove(values)
+    requeue_abandoned_posts() # Only posts without a recent heartbeat, workers on other hosts may still be running theirs
+    engine.dispose() # Do not hand pooled connections to child processes
+
+    stop_event, workers = start_generation_workers(args.generation_workers, settings.WORKER_POLL_SECONDS)
+    try:
+        # Blocks until Ctrl+C or SIGTERM, then shuts the API workers down gracefully
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.api_workers)
+    finally:
+        logger.info("Draining %d generation workers", len(workers))
+        stop_generation_workers(stop_event, workers, args.drain_seconds)
+        if os.environ.get("METRICS_MULTIPROCESS_TEMPORARY"):
+            shutil.rmtree(settings.PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.database import engine
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Asserts that a block executes at most `limit` SQL statements.
+
+    Counts every statement sent through the engine while the block runs, in
+    any thread, so it also covers requests made with TestClient and their
+    background tasks. Use it around a single request to pin the number of
+    queries of an endpoint and catch N+1 regressions.
+
+    Args:
+        limit (int): Maximum number of statements.
+
+    Yields:
+        List[str]: The statements executed so far.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+    assert len(statements) <= limit, f"{len(statements)} queries executed, at most {limit} expected:\n" + "\n".join(statements)
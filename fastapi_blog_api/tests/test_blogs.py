@@ -10,6 +10,8 @@ from app.core.security import get_password_hash
 from unittest.mock import patch
 import time
 import uuid # Import the uuid module
+from datetime import datetime, timedelta
+from .helpers import assert_max_queries
 
 @pytest.fixture(scope="module")
 def test_app():
@@ -237,4 +239,664 @@ def test_delete_blog_post_unauthorized(test_app):
         headers={"Authorization": "Bearer invalid_token"}
     )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
-    assert "Invalid token" in response.json()["detail"]
\ No newline at end of file
+    assert "Invalid token" in response.json()["detail"]
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_get_blog_post_etag_not_modified(mock_write_blog_post, test_app, db_session):
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    access_token = get_access_token(test_app, username=user.username)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    blog_id = test_app.post("/api/v1/blogs", json={"title": "ETag Blog"}, headers=headers).json()["id"]
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    # An edit bumps the version, so the old tag no longer matches
+    test_app.put(f"/api/v1/blogs/{blog_id}", json={"content": "Edited"}, headers=headers)
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert response.json()["content"] == "Edited"
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_get_blog_posts_etag_not_modified(mock_write_blog_post, test_app, db_session):
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    access_token = get_access_token(test_app, username=user.username)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    test_app.post("/api/v1/blogs", json={"title": "ETag List Blog"}, headers=headers)
+    etag = test_app.get("/api/v1/blogs", headers=headers).headers["ETag"]
+
+    response = test_app.get("/api/v1/blogs", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # A new post changes the list tag
+    test_app.post("/api/v1/blogs", json={"title": "Another Blog"}, headers=headers)
+    response = test_app.get("/api/v1/blogs", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_get_blog_post_read_cache_invalidated_on_update(mock_write_blog_post, test_app, db_session):
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    access_token = get_access_token(test_app, username=user.username)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    blog_id = test_app.post("/api/v1/blogs", json={"title": "Cached Blog"}, headers=headers).json()["id"]
+    assert test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).headers["X-Cache"] == "MISS"
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json()["content"] == "This is the blog content from the mock."
+
+    test_app.put(f"/api/v1/blogs/{blog_id}", json={"content": "Edited"}, headers=headers)
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()["content"] == "Edited"
+
+    test_app.delete(f"/api/v1/blogs/{blog_id}", headers=headers)
+    response = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_bulk_delete_blog_posts(mock_write_blog_post, test_app, db_session):
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    other = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    other_headers = {"Authorization": f"Bearer {get_access_token(test_app, username=other.username)}"}
+
+    ids = [test_app.post("/api/v1/blogs", json={"title": f"Bulk {i}"}, headers=headers).json()["id"] for i in range(3)]
+    other_id = test_app.post("/api/v1/blogs", json={"title": "Not yours"}, headers=other_headers).json()["id"]
+
+    response = test_app.post("/api/v1/blogs/bulk-delete", json={"ids": ids[:2] + [other_id]}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["ids"] == sorted(ids[:2])
+
+    remaining = [blog["id"] for blog in test_app.get("/api/v1/blogs", headers=headers).json()]
+    assert remaining == [ids[2]]
+    assert db_session.query(BlogPost).filter(BlogPost.id == other_id).first() is not None
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_bulk_update_blog_posts(mock_write_blog_post, test_app, db_session):
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    ids = [test_app.post("/api/v1/blogs", json={"title": f"Bulk {i}"}, headers=headers).json()["id"] for i in range(2)]
+
+    response = test_app.post("/api/v1/blogs/bulk-update", json={"ids": ids + [999999], "status": "failed", "title": "Obsolete"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["ids"] == sorted(ids)
+    for blog in test_app.get("/api/v1/blogs", headers=headers).json():
+        assert blog["status"] == "failed"
+        assert blog["title"] == "Obsolete"
+
+    response = test_app.post("/api/v1/blogs/bulk-update", json={"ids": ids}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_generation_result_discarded_when_post_no_longer_pending(db_session):
+    from app.api.v1.endpoints.blogs import generate_and_update_blog
+    user = create_user_for_tests(db_session)
+    blog = BlogPost(title="Manually failed", content="kept", status="failed", owner_id=user.id)
+    db_session.add(blog)
+    db_session.commit()
+
+    with patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post") as mock_write_blog_post:
+        generate_and_update_blog(blog.id, blog.title)
+    mock_write_blog_post.assert_not_called()
+    db_session.refresh(blog)
+    assert blog.content == "kept"
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_export_blog_posts_ndjson(mock_write_blog_post, test_app, db_session):
+    import gzip
+    import json
+    mock_write_blog_post.return_value = "This is the blog content from the mock."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    for i in range(3):
+        test_app.post("/api/v1/blogs", json={"title": f"Export {i}"}, headers=headers)
+
+    response = test_app.get("/api/v1/blogs/export", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Export 0", "Export 1", "Export 2"]
+    assert all(row["owner_id"] == user.id for row in rows)
+
+    response = test_app.get("/api/v1/blogs/export?gzip=true", headers=headers)
+    assert response.headers["content-type"] == "application/gzip"
+    assert gzip.decompress(response.content).decode() == "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def test_import_blog_posts_ndjson(test_app, db_session):
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    body = b'{"title": "Imported 1", "content": "# One"}\n{"content": "no title"}\n\n{"title": "Imported 2", "content": "Two"}\n'
+
+    with patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post") as mock_write_blog_post:
+        response = test_app.post("/api/v1/blogs/import", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["imported"] == 2
+    assert response.json()["skipped"] == 1
+    assert "line 2" in response.json()["errors"][0]
+    mock_write_blog_post.assert_not_called()
+
+    blogs = test_app.get("/api/v1/blogs", headers=headers).json()
+    assert [(blog["title"], blog["status"]) for blog in blogs] == [("Imported 1", "completed"), ("Imported 2", "completed")]
+
+
+def test_import_blog_posts_tar_archive(test_app, db_session):
+    import io
+    import tarfile
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for name, text in [("posts/first-post.md", "Body without heading"), ("posts/second.md", "# Second Title\n\nBody"), ("notes.txt", "ignored")]:
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    response = test_app.post("/api/v1/blogs/import", content=archive.getvalue(), headers={**headers, "Content-Type": "application/gzip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["imported"] == 2
+    titles = [blog["title"] for blog in test_app.get("/api/v1/blogs", headers=headers).json()]
+    assert titles == ["first post", "Second Title"]
+
+    response = test_app.post("/api/v1/blogs/import", content=b"x", headers={**headers, "Content-Type": "text/plain"})
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+def test_import_truncated_or_corrupt_archive(test_app, db_session):
+    import io
+    import os
+    import tarfile
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}", "Content-Type": "application/gzip"}
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for number in range(4):
+            data = f"# Post {number}\n\n{os.urandom(4096).hex()}".encode() # Incompressible, each post takes a quarter of the archive
+            info = tarfile.TarInfo(f"post-{number}.md")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    body = archive.getvalue()
+
+    response = test_app.post("/api/v1/blogs/import", content=body[:len(body) * 3 // 4], headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    titles = [blog["title"] for blog in test_app.get("/api/v1/blogs", headers=headers).json()]
+    assert titles and len(titles) < 4
+    assert f"{len(titles)} posts were imported" in response.json()["detail"]
+
+    response = test_app.post("/api/v1/blogs/import", content=b"\x1f\x8bgarbage", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "0 posts were imported" in response.json()["detail"]
+
+def test_cached_principal_invalidated_when_user_deleted(test_app, db_session):
+    from app.core.cache import principal_cache
+    user = create_user_for_tests(db_session)
+    access_token = get_access_token(test_app, username=user.username)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    assert test_app.get("/api/v1/blogs", headers=headers).status_code == status.HTTP_200_OK
+    assert principal_cache.get(access_token).id == user.id
+
+    db_session.delete(user)
+    db_session.flush()
+    assert principal_cache.get(access_token).id == user.id # Not committed yet
+    db_session.rollback()
+    assert principal_cache.get(access_token).id == user.id # Rolled back, still valid
+
+    db_session.delete(user)
+    db_session.commit()
+    assert principal_cache.get(access_token) is None
+    response = test_app.get("/api/v1/blogs", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert "User not found" in response.json()["detail"]
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_worker_mode_leaves_generation_to_worker(mock_write_blog_post, test_app, db_session):
+    from app.core.config import settings
+    from app.core.generation import process_next_post, requeue_abandoned_posts
+    mock_write_blog_post.return_value = "Written by a generation worker."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    with patch.object(settings, "GENERATION_MODE", "worker"):
+        blog_id = test_app.post("/api/v1/blogs", json={"title": "Queued"}, headers=headers).json()["id"]
+    mock_write_blog_post.assert_not_called()
+    assert test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).json()["status"] == "pending"
+
+    # A worker that died mid-job leaves the post "generating" until its heartbeat is stale
+    db_session.query(BlogPost).filter(BlogPost.id == blog_id).update({"status": "generating", "heartbeat_at": datetime.utcnow()})
+    db_session.commit()
+    requeue_abandoned_posts()
+    assert test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).json()["status"] == "generating" # Its worker may be alive
+    db_session.query(BlogPost).filter(BlogPost.id == blog_id).update({"heartbeat_at": datetime.utcnow() - timedelta(hours=1)})
+    db_session.commit()
+    assert requeue_abandoned_posts() >= 1
+
+    while process_next_post(): # Drain the queue
+        pass
+    blog = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).json()
+    assert (blog["status"], blog["content"]) == ("completed", "Written by a generation worker.")
+    assert not process_next_post()
+
+
+def test_fast_serialization_matches_response_model(test_app, db_session):
+    from typing import List
+    from pydantic import TypeAdapter
+    from app.schemas import BlogPostOut
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    db_session.add_all([BlogPost(title=f"Fast {i}", content="Ünïcode ✓ body", status="completed", owner_id=user.id) for i in range(3)])
+    db_session.commit()
+
+    response = test_app.get("/api/v1/blogs", headers=headers)
+    assert response.headers["content-type"] == "application/json"
+    blogs = response.json()
+    validated = TypeAdapter(List[BlogPostOut]).validate_python(blogs)
+    assert [blog.model_dump() for blog in validated] == blogs
+    assert blogs[0]["content"] == "Ünïcode ✓ body"
+
+    single = test_app.get(f"/api/v1/blogs/{blogs[0]['id']}", headers=headers)
+    assert single.json() == blogs[0]
+    assert test_app.get(f"/api/v1/blogs/{blogs[0]['id']}", headers=headers).content == single.content # Cached body is reused as is
+
+
+def test_responses_compressed_by_accept_encoding(test_app, db_session):
+    from app.core.compression import choose_encoding, supported_encodings
+    from app.core.cache import post_cache
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    large = BlogPost(title="Large", content="markdown paragraph " * 500, status="completed", owner_id=user.id)
+    small = BlogPost(title="Small", content="tiny", status="completed", owner_id=user.id)
+    db_session.add_all([large, small])
+    db_session.commit()
+
+    response = test_app.get("/api/v1/blogs", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert [blog["title"] for blog in response.json()] == ["Large", "Small"]
+    assert "content-encoding" not in test_app.get("/api/v1/blogs", headers={**headers, "Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in test_app.get(f"/api/v1/blogs/{small.id}", headers={**headers, "Accept-Encoding": "gzip"}).headers
+
+    post_cache.clear()
+    first = test_app.get(f"/api/v1/blogs/{large.id}", headers={**headers, "Accept-Encoding": "gzip"})
+    second = test_app.get(f"/api/v1/blogs/{large.id}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+    assert second.json()["content"] == large.content
+    assert set(post_cache.get((user.id, large.id))["encoded"]) == {"gzip"} # Compressed once, reused on the hit
+
+    identity = test_app.get(f"/api/v1/blogs/{large.id}", headers={**headers, "Accept-Encoding": "identity"})
+    etag = identity.headers["etag"]
+    assert etag == f'"{large.id}-{large.version}"'
+    assert second.headers["etag"] == f'"{large.id}-{large.version}-gzip"' # One strong validator per representation
+    listed = test_app.get("/api/v1/blogs", headers={**headers, "Accept-Encoding": "gzip"})
+    assert listed.headers["etag"].endswith('-gzip"')
+    for tag in (second.headers["etag"], listed.headers["etag"]): # A compressed copy is still current
+        url = f"/api/v1/blogs/{large.id}" if tag == second.headers["etag"] else "/api/v1/blogs"
+        assert test_app.get(url, headers={**headers, "If-None-Match": tag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    assert choose_encoding("gzip;q=0.5, br;q=0.8") == supported_encodings()[0] # br when brotli is installed
+    assert choose_encoding("gzip;q=0.8, br;q=0.5") == "gzip"
+    assert choose_encoding("gzip, br") == supported_encodings()[0] # Ties go to the server preference
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("gzip;q=abc") is None
+    assert choose_encoding("*") == supported_encodings()[0]
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_blog_endpoints_query_bounds(mock_write_blog_post, test_app, db_session):
+    from app.core.cache import principal_cache, post_cache
+    mock_write_blog_post.return_value = "Generated."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    for posts in (1, 30): # The number of queries must not grow with the number of posts
+        db_session.add_all([BlogPost(title=f"Bounded {i}", content="Body", status="completed", owner_id=user.id) for i in range(posts)])
+        db_session.commit()
+        principal_cache.clear() # Count the user lookup too
+        with assert_max_queries(2): # Auth, posts
+            assert test_app.get("/api/v1/blogs", headers=headers).status_code == status.HTTP_200_OK
+        with assert_max_queries(2): # Ids and versions, then nothing else for a 304
+            etag = test_app.get("/api/v1/blogs", headers=headers).headers["etag"]
+            assert test_app.get("/api/v1/blogs", headers={**headers, "If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+        with assert_max_queries(1): # Export streams every post with one statement
+            test_app.get("/api/v1/blogs/export", headers=headers).content
+    blog_id = db_session.query(BlogPost.id).filter(BlogPost.owner_id == user.id).first().id
+
+    post_cache.clear()
+    with assert_max_queries(1): # Post, principal cached
+        test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    with assert_max_queries(0): # Served from the post cache
+        test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+    with assert_max_queries(3): # Insert, then the generation reads and writes the post
+        test_app.post("/api/v1/blogs", json={"title": "Counted"}, headers=headers)
+    with assert_max_queries(3): # Select, update, refresh
+        test_app.put(f"/api/v1/blogs/{blog_id}", json={"title": "Renamed"}, headers=headers)
+    with assert_max_queries(2): # Delete the post, then its revisions
+        test_app.delete(f"/api/v1/blogs/{blog_id}", headers=headers)
+
+
+def test_sql_count_headers_in_debug_mode(test_app, db_session):
+    from app.core.config import settings
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    assert "x-sql-count" not in test_app.get("/api/v1/blogs", headers=headers).headers
+    with patch.object(settings, "DEBUG", True):
+        response = test_app.get("/api/v1/blogs", headers=headers)
+    assert response.headers["x-sql-count"] == "1" # Principal cached, one query for the posts
+    assert float(response.headers["x-sql-time"]) >= 0
+
+
+def test_generation_past_its_deadline_times_out(test_app, db_session):
+    from app.core import deadline
+
+    def slow_agent(topic, output_file=None):
+        while True: # A looping agent, only stopped by the deadline check of its steps
+            deadline.check("test step")
+            time.sleep(0.01)
+
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    assert test_app.post("/api/v1/blogs", json={"title": "Too slow", "deadline_seconds": 0}, headers=headers).status_code == 422
+    with patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post", side_effect=slow_agent):
+        started = time.perf_counter()
+        blog_id = test_app.post("/api/v1/blogs", json={"title": "Too slow", "deadline_seconds": 1}, headers=headers).json()["id"]
+    assert time.perf_counter() - started < 5
+    blog = test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).json()
+    assert blog["status"] == "timed_out" # Distinct from "failed"
+    assert blog["content"].startswith("Generation timed out")
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_admission_control_rejects_or_queues_over_capacity(mock_write_blog_post, test_app, db_session):
+    from app.core.config import settings
+    from app.core.generation import generation_registry, process_next_post
+    mock_write_blog_post.return_value = "Generated once capacity freed up."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    busy = settings.GENERATION_MAX_ACTIVE
+    for _ in range(busy): # Every generation slot of the process is taken
+        generation_registry.add_scheduled()
+    try:
+        with patch.object(settings, "ADMISSION_POLICY", "reject"):
+            response = test_app.post("/api/v1/blogs", json={"title": "Rejected"}, headers=headers)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["retry-after"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+
+        with patch.object(settings, "ADMISSION_POLICY", "queue"):
+            queued = test_app.post("/api/v1/blogs", json={"title": "Queued"}, headers=headers).json()
+            assert queued["status"] == "queued"
+            with patch.object(settings, "GENERATION_MAX_QUEUED", 1): # The queue is bounded too
+                assert test_app.post("/api/v1/blogs", json={"title": "Overflow"}, headers=headers).status_code == 429
+    finally:
+        for _ in range(busy):
+            generation_registry.remove_scheduled()
+    mock_write_blog_post.assert_not_called()
+    assert not db_session.query(BlogPost).filter(BlogPost.owner_id == user.id, BlogPost.title.in_(("Rejected", "Overflow"))).count()
+
+    with patch.object(settings, "ADMISSION_POLICY", "queue"): # A finishing generation picks up the queued post
+        test_app.post("/api/v1/blogs", json={"title": "Admitted"}, headers=headers)
+    assert test_app.get(f"/api/v1/blogs/{queued['id']}", headers=headers).json()["status"] == "completed"
+    assert generation_registry.scheduled_count() == 0
+    assert not process_next_post()
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_bulk_regeneration_goes_through_admission_control(mock_write_blog_post, test_app, db_session):
+    from app.core.config import settings
+    from app.core.generation import generation_registry
+    mock_write_blog_post.return_value = "Regenerated."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    ids = [test_app.post("/api/v1/blogs", json={"title": f"Regenerate {i}"}, headers=headers).json()["id"] for i in range(4)]
+    test_app.post("/api/v1/blogs/bulk-update", json={"ids": ids, "status": "failed"}, headers=headers)
+    mock_write_blog_post.reset_mock()
+    busy = settings.GENERATION_MAX_ACTIVE - 1 # One generation slot left
+    for _ in range(busy):
+        generation_registry.add_scheduled()
+    try:
+        with patch.object(settings, "ADMISSION_POLICY", "queue"), patch.object(settings, "GENERATION_MAX_QUEUED", 1):
+            response = test_app.post("/api/v1/blogs/bulk-update", json={"ids": ids, "status": "pending"}, headers=headers)
+    finally:
+        for _ in range(busy):
+            generation_registry.remove_scheduled()
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"ids": ids[:2], "rejected": ids[2:]}
+    statuses = [test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers).json()["status"] for blog_id in ids]
+    assert statuses == ["completed", "completed", "failed", "failed"] # Admitted, queued then picked up by the finished generation, rejected and left unchanged
+    assert mock_write_blog_post.call_count == 2
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_inline_generations_resume_on_startup(mock_write_blog_post, test_app, db_session):
+    from app.core.generation import generation_registry, resume_inline_generations
+    mock_write_blog_post.return_value = "Generated after the restart."
+    user = create_user_for_tests(db_session)
+    stale = datetime.utcnow() - timedelta(hours=1)
+    posts = [
+        BlogPost(title=f"Interrupted {state}", content="", status=state, owner_id=user.id, heartbeat_at=heartbeat_at)
+        for state, heartbeat_at in (("generating", stale), ("pending", None), ("queued", None))
+    ]
+    live = BlogPost(title="Generated by another process", content="", status="generating", owner_id=user.id, heartbeat_at=datetime.utcnow())
+    db_session.add_all(posts + [live])
+    db_session.commit()
+
+    assert resume_inline_generations() >= 3
+    for _ in range(100): # Generated by background threads
+        if generation_registry.scheduled_count() == 0:
+            break
+        time.sleep(0.05)
+    for post in posts + [live]:
+        db_session.refresh(post)
+    assert [post.status for post in posts] == ["completed"] * 3
+    assert live.status == "generating" # Its process sends heartbeats, it is not taken over
+    assert mock_write_blog_post.call_count == 3
+
+
+def test_heartbeats_keep_owned_posts_alive(db_session):
+    from app.core.generation import generation_registry, requeue_abandoned_posts, send_heartbeats
+    user = create_user_for_tests(db_session)
+    stale = datetime.utcnow() - timedelta(hours=1)
+    post = BlogPost(title="Scheduled", content="", status="pending", owner_id=user.id, heartbeat_at=stale)
+    db_session.add(post)
+    db_session.commit()
+    version = post.version
+
+    generation_registry.add_scheduled(post.id) # Scheduled, not started yet
+    try:
+        assert post.id in generation_registry.owned_ids()
+        assert send_heartbeats(generation_registry.owned_ids()) >= 1
+        run = generation_registry.start(post.id)
+        generation_registry.finish(run)
+        assert post.id not in generation_registry.owned_ids() # Started and finished
+    finally:
+        generation_registry.remove_scheduled()
+    requeue_abandoned_posts(statuses=("pending",), requeued_status="queued")
+    db_session.refresh(post)
+    assert post.status == "pending" # The heartbeat was recent
+    assert post.heartbeat_at > stale
+    assert post.version == version # Heartbeats do not change the representation
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_rendered_html_stored_on_completion_and_update(mock_write_blog_post, test_app, db_session):
+    from app.core.rendering import rerender_posts
+    mock_write_blog_post.return_value = "# Chips\n\nFast <script>alert(1)</script> [source](https://example.com)\n\n## Benchmarks\n\n## Benchmarks\n"
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    blog_id = test_app.post("/api/v1/blogs", json={"title": "Chips"}, headers=headers).json()["id"]
+
+    response = test_app.get(f"/api/v1/blogs/{blog_id}/html", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    html = response.json()["html"]
+    assert '<h1 id="chips">Chips</h1>' in html and '<h2 id="benchmarks-2">' in html
+    assert "<script>" not in html and "&lt;script&gt;" in html # Raw HTML is escaped
+    assert 'rel="nofollow noopener"' in html
+    assert response.json()["toc"] == [
+        {"level": 1, "id": "chips", "title": "Chips"},
+        {"level": 2, "id": "benchmarks", "title": "Benchmarks"},
+        {"level": 2, "id": "benchmarks-2", "title": "Benchmarks"},
+    ]
+    assert response.json()["reading_time_minutes"] == 1
+    etag = response.headers["etag"]
+    with assert_max_queries(1): # Version only
+        assert test_app.get(f"/api/v1/blogs/{blog_id}/html", headers={**headers, "If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    test_app.put(f"/api/v1/blogs/{blog_id}", json={"content": "# Edited\n\n" + "word " * 450}, headers=headers)
+    response = test_app.get(f"/api/v1/blogs/{blog_id}/html", headers=headers)
+    assert response.json()["toc"] == [{"level": 1, "id": "edited", "title": "Edited"}]
+    assert response.json()["reading_time_minutes"] == 3
+
+    imported = BlogPost(title="Imported", content="## Old post", status="completed", owner_id=user.id) # Stored before rendering existed
+    db_session.add(imported)
+    db_session.commit()
+    version = imported.version
+    assert test_app.get(f"/api/v1/blogs/{imported.id}/html", headers=headers).json()["toc"][0]["id"] == "old-post" # Rendered on first read
+    with assert_max_queries(1): # Stored, not rendered again
+        test_app.get(f"/api/v1/blogs/{imported.id}/html", headers=headers)
+    assert test_app.get(f"/api/v1/blogs/{imported.id}", headers=headers).headers["etag"] == f'"{imported.id}-{version}"'
+
+    db_session.query(BlogPost).filter(BlogPost.owner_id == user.id).update({"content_html": None, "toc": None}, synchronize_session=False)
+    db_session.commit()
+    result = rerender_posts(db_session, workers=2, batch_size=1)
+    assert result["rendered"] >= 2
+    rows = db_session.query(BlogPost.toc, BlogPost.version).filter(BlogPost.owner_id == user.id).order_by(BlogPost.id).all()
+    assert [row.toc[0]["id"] for row in rows] == ["edited", "old-post"]
+    assert rows[1].version == version + 1 # Only the update above bumped it, renders keep the version
+
+
+def test_rendered_html_of_unfinished_post_is_not_stored(test_app, db_session):
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    pending = BlogPost(title="Pending", status="pending", owner_id=user.id) # Generation not finished, no content
+    db_session.add(pending)
+    db_session.commit()
+
+    response = test_app.get(f"/api/v1/blogs/{pending.id}/html", headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    db_session.expire_all()
+    assert db_session.get(BlogPost, pending.id).content_html is None # Rendered once the generation completes
+
+
+def test_get_blog_post_content_ranges(test_app, db_session):
+    from app.core.config import settings
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    content = "# Café\n\n" + "".join(f"Paragraph {n} — naïve résumé.\n\n" for n in range(200))
+    data = content.encode("utf-8")
+    post = BlogPost(title="Ranges", content=content, status="completed", owner_id=user.id)
+    db_session.add(post)
+    db_session.commit()
+    url = f"/api/v1/blogs/{post.id}/content"
+
+    with patch.object(settings, "CONTENT_CHUNK_SIZE", 1000): # Several database reads per response
+        response = test_app.get(url, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == data and response.headers["content-length"] == str(len(data))
+        assert response.headers["content-type"] == "text/markdown; charset=utf-8"
+        assert response.headers["accept-ranges"] == "bytes"
+        etag = response.headers["etag"]
+
+        response = test_app.get(url, headers={**headers, "Range": "bytes=1500-3499"})
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response.content == data[1500:3500]
+        assert response.headers["content-range"] == f"bytes 1500-3499/{len(data)}"
+
+    response = test_app.get(url, headers={**headers, "Range": "bytes=-10"}) # Suffix
+    assert response.content == data[-10:] and response.headers["content-range"] == f"bytes {len(data) - 10}-{len(data) - 1}/{len(data)}"
+    assert test_app.get(url, headers={**headers, "Range": "bytes=100-"}).content == data[100:]
+    assert test_app.get(url, headers={**headers, "Range": "bytes=0-1,5-9"}).status_code == status.HTTP_200_OK # Several ranges, served whole
+
+    response = test_app.get(url, headers={**headers, "Range": f"bytes={len(data)}-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+
+    response = test_app.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    response = test_app.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"0-0"'}) # Stale copy, everything is sent
+    assert response.status_code == status.HTTP_200_OK and response.content == data
+    assert test_app.get(url, headers={**headers, "If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    from app.core.content import read_content
+    assert read_content(db_session, post.id, post.version, 9, 3) == data[9:12]
+    assert read_content(db_session, post.id, post.version - 1, 9, 3) is None # Changed since, the stream stops
+
+    other = create_user_for_tests(db_session)
+    other_headers = {"Authorization": f"Bearer {get_access_token(test_app, username=other.username)}"}
+    assert test_app.get(url, headers=other_headers).status_code == status.HTTP_404_NOT_FOUND
+
+
+@patch('app.core.ai_agent.write_blog_post')
+def test_blog_post_revisions(mock_write_blog_post, test_app, db_session):
+    from app.core.config import settings
+    from app.models import BlogPostRevision
+    mock_write_blog_post.return_value = "# Draft\n\nThe generated draft."
+    user = create_user_for_tests(db_session)
+    headers = {"Authorization": f"Bearer {get_access_token(test_app, username=user.username)}"}
+    blog_id = test_app.post("/api/v1/blogs", json={"title": "History"}, headers=headers).json()["id"]
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions", headers=headers).json() == [] # Not edited yet
+
+    contents = ["# Draft\n\nThe generated draft."]
+    with patch.object(settings, "REVISION_SNAPSHOT_INTERVAL", 4):
+        for n in range(1, 10):
+            contents.append(contents[-1] + f"\n\nEdit number {n}, with a few more words.")
+            assert test_app.put(f"/api/v1/blogs/{blog_id}", json={"content": contents[-1]}, headers=headers).status_code == status.HTTP_200_OK
+        test_app.put(f"/api/v1/blogs/{blog_id}", json={"title": "Renamed", "content": contents[-1]}, headers=headers) # Same content, no revision
+
+    revisions = test_app.get(f"/api/v1/blogs/{blog_id}/revisions", headers=headers).json()
+    assert [r["revision"] for r in revisions] == list(range(10, 0, -1)) # The draft and nine edits, newest first
+    assert [r["kind"] for r in reversed(revisions)] == ["snapshot", "delta", "delta", "delta"] * 2 + ["snapshot", "delta"]
+    for number, content in enumerate(contents, start=1):
+        response = test_app.get(f"/api/v1/blogs/{blog_id}/revisions/{number}", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["content"] == content
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions/11", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    db_session.query(BlogPost).filter(BlogPost.id == blog_id).update({"content": "Regenerated"}) # Written outside PUT
+    db_session.commit()
+    test_app.put(f"/api/v1/blogs/{blog_id}", json={"content": "Regenerated, then edited"}, headers=headers)
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions/11", headers=headers).json()["content"] == "Regenerated"
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions/12", headers=headers).json()["content"] == "Regenerated, then edited"
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions/10", headers=headers).json()["content"] == contents[-1]
+
+    other = create_user_for_tests(db_session)
+    other_headers = {"Authorization": f"Bearer {get_access_token(test_app, username=other.username)}"}
+    assert test_app.get(f"/api/v1/blogs/{blog_id}/revisions/1", headers=other_headers).status_code == status.HTTP_404_NOT_FOUND
+
+    second_id = test_app.post("/api/v1/blogs", json={"title": "Second"}, headers=headers).json()["id"]
+    test_app.put(f"/api/v1/blogs/{second_id}", json={"content": "Edited"}, headers=headers)
+    test_app.delete(f"/api/v1/blogs/{blog_id}", headers=headers)
+    test_app.post("/api/v1/blogs/bulk-delete", json={"ids": [second_id]}, headers=headers)
+    assert db_session.query(BlogPostRevision).filter(BlogPostRevision.blog_id.in_([blog_id, second_id])).count() == 0
+
+
+def test_generation_runs_of_one_post_are_cancelled_separately():
+    from app.core.generation import GenerationRegistry
+    registry = GenerationRegistry()
+    old_run = registry.start(7)
+    assert registry.cancel([7, 8]) == [7] # The post is put back to pending
+    new_run = registry.start(7) # Its new generation starts while the old one still runs
+    assert registry.is_cancelled(old_run) and not registry.is_cancelled(new_run)
+    registry.finish(old_run)
+    assert registry.active_count() == 1 and not registry.is_cancelled(new_run)
+    registry.cancel([7])
+    assert registry.is_cancelled(new_run)
+    registry.finish(new_run)
+    assert registry.active_count() == 0
@@ -0,0 +1,68 @@
+import time
+from app.core.cache import LRUCache, InvalidationChannel
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["hit_ratio"] == 0.75
+
+
+def test_lru_cache_disabled_when_maxsize_is_zero():
+    cache = LRUCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_cache_skips_values_read_before_an_invalidation():
+    cache = LRUCache(maxsize=2)
+    since = cache.snapshot() # A read of "a" starts
+    cache.delete("a") # A newer version is committed and invalidated meanwhile
+    assert cache.set("a", "stale", since=since) is False
+    assert cache.get("a") is None
+    assert cache.set("b", 2, since=since) # Other keys are unaffected
+    assert cache.set("a", "fresh", since=cache.snapshot())
+    assert cache.get("a") == "fresh"
+
+    since = cache.snapshot()
+    for key in ("c", "d", "e"): # More deletes than remembered keys
+        cache.delete(key)
+    assert cache.set("a", "unknown", since=since) is False # Cannot tell whether "a" was deleted, not stored
+
+
+def test_lru_cache_entries_expire():
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_invalidation_channel_delivers_locally():
+    channel = InvalidationChannel()
+    cache = LRUCache(maxsize=2)
+    channel.register("posts", cache.delete)
+    cache.set((1, 2), "post")
+    channel.publish("posts", (1, 2))
+    assert cache.get((1, 2)) is None
+
+
+def test_lru_cache_delete_where():
+    cache = LRUCache(maxsize=3)
+    cache.set("token-a", "alice")
+    cache.set("token-b", "bob")
+    cache.set("token-c", "alice")
+    cache.delete_where(lambda key, value: value == "alice")
+    assert cache.stats()["size"] == 1
+    assert cache.get("token-b") == "bob"
+
+    since = cache.snapshot() # A principal is read
+    cache.delete_where(lambda key, value: value == "bob") # Its user changes meanwhile, under an unknown key
+    assert cache.set("token-d", "bob", since=since) is False
+    assert cache.set("token-d", "bob", since=cache.snapshot())
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+import uuid
+from unittest.mock import patch
+import pytest
+from fastapi.testclient import TestClient
+from fastapi_blog_api.main import app
+from app.database import Base, engine
+from app.core import metrics
+from app.core.config import settings
+
+
+@pytest.fixture(scope="module")
+def test_app():
+    Base.metadata.create_all(bind=engine)
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+
+
+RECORD_IN_PROCESS = """
+from app.core import metrics
+metrics.generations_total.labels("completed").inc(2)
+metrics.generation_duration_seconds.labels("completed").observe(20)
+metrics.generations_active.inc()
+if {exits}:
+    metrics.mark_process_dead()
+"""
+
+def test_metrics_added_up_across_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for exits in (False, True): # A process still running and one that exited
+        subprocess.run([sys.executable, "-c", RECORD_IN_PROCESS.format(exits=exits)], env=env, check=True)
+
+    with patch.object(settings, "PROMETHEUS_MULTIPROC_DIR", str(tmp_path)):
+        lines = metrics.render().decode().splitlines()
+    assert 'blog_generations_total{outcome="completed"} 4.0' in lines # Counters of exited processes are kept
+    assert 'blog_generation_duration_seconds_bucket{le="30.0",outcome="completed"} 2.0' in lines
+    assert "blog_generations_active 1.0" in lines # Only the running process
+
+
+def test_route_label_is_the_route_template(test_app):
+    route = "/api/v1/blogs/{blog_id}/revisions/{revision}"
+    before = metrics.sample_value("http_request_duration_seconds_count", method="GET", route=route, status="401")
+    test_app.get("/api/v1/blogs/5/revisions/5") # Both parameters have the same value
+    assert metrics.sample_value("http_request_duration_seconds_count", method="GET", route=route, status="401") == before + 1
+    before = metrics.sample_value("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    test_app.get("/api/v1/nowhere")
+    assert metrics.sample_value("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") == before + 1
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_metrics_endpoint(mock_write_blog_post, test_app):
+    mock_write_blog_post.return_value = "Generated."
+    credentials = {"username": f"metrics_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+    test_app.post("/api/v1/users/register", json=credentials)
+    token = test_app.post("/api/v1/users/login", json=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    completed_before = metrics.sample_value("blog_generations_total", outcome="completed")
+    latency_before = metrics.sample_value("http_request_duration_seconds_count", method="GET", route="/api/v1/blogs/{blog_id}", status="200")
+
+    blog_id = test_app.post("/api/v1/blogs", json={"title": "Measured"}, headers=headers).json()["id"]
+    test_app.get(f"/api/v1/blogs/{blog_id}", headers=headers)
+
+    response = test_app.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.sample_value("blog_generations_total", outcome="completed") == completed_before + 1
+    assert metrics.sample_value("http_request_duration_seconds_count", method="GET", route="/api/v1/blogs/{blog_id}", status="200") == latency_before + 1
+    text = response.text
+    assert 'blog_posts{status="completed"}' in text
+    assert "blog_generation_queue_depth 0.0" in text
+    assert "blog_generations_active 0.0" in text
+    assert 'db_query_duration_seconds_count{operation="select"}' in text
+    assert 'blog_generation_duration_seconds_count{outcome="completed"}' in text
+
+
+@patch("app.api.v1.endpoints.metrics.count_posts_by_status")
+def test_queue_depth_counts_pending_and_queued_posts(mock_count_posts_by_status, test_app):
+    mock_count_posts_by_status.return_value = {"pending": 2, "queued": 3, "completed": 1}
+    lines = test_app.get("/metrics").text.splitlines()
+    assert "blog_generation_queue_depth 5.0" in lines
+    assert 'blog_posts{status="queued"} 3.0' in lines
+
+    mock_count_posts_by_status.return_value = {"completed": 1} # The queue drained
+    lines = test_app.get("/metrics").text.splitlines()
+    assert "blog_generation_queue_depth 0.0" in lines
+    assert 'blog_posts{status="queued"} 0.0' in lines
+
+
+def register_and_login(test_app, prefix):
+    credentials = {"username": f"{prefix}_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+    test_app.post("/api/v1/users/register", json=credentials)
+    token = test_app.post("/api/v1/users/login", json=credentials).json()["access_token"]
+    return credentials["username"], {"Authorization": f"Bearer {token}"}
+
+
+def test_profiling_only_for_admins(test_app):
+    admin_name, admin_headers = register_and_login(test_app, "admin")
+    _, user_headers = register_and_login(test_app, "user")
+    with patch.object(settings, "ADMIN_USERNAMES", {admin_name}):
+        assert "x-profile-id" not in test_app.get("/api/v1/blogs", headers=admin_headers).headers # Not requested
+        assert "x-profile-id" not in test_app.get("/api/v1/blogs?profile=1", headers=user_headers).headers # Not an admin
+        for query in ("noprofile=1", "profile=10", "profile=0"):
+            assert "x-profile-id" not in test_app.get(f"/api/v1/blogs?{query}", headers=admin_headers).headers, query
+        assert "x-profile-id" in test_app.get("/api/v1/blogs?limit=5&profile=1", headers=admin_headers).headers
+
+        response = test_app.get("/api/v1/blogs", headers={**admin_headers, "X-Profile": "1"})
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        report = test_app.get(f"/api/v1/admin/profiles/{profile_id}", headers=admin_headers).json()
+        assert (report["method"], report["path"], report["status"]) == ("GET", "/api/v1/blogs", 200)
+        assert report["total_ms"] >= report["dependencies_ms"] > 0
+        assert "auth" in report["spans_ms"]
+        assert any("FROM blog_posts" in statement["statement"] for statement in report["sql"]["statements"])
+        assert report["sql"]["count"] == len(report["sql"]["statements"])
+        assert "top_functions" in report["sampling"]
+
+        assert test_app.get(f"/api/v1/admin/profiles/{profile_id}", headers=user_headers).status_code == 403
+        assert test_app.get("/api/v1/admin/profiles/unknown", headers=admin_headers).status_code == 404
@@ -0,0 +1,146 @@
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from smolagents.memory import ActionStep
+from smolagents.models import ChatMessage
+from app.core import ai_agent
+from app.core.config import settings
+from app.core.cache import llm_cache
+from app.core.llm import CachingModel, FallbackModel, build_model, bypass_llm_cache
+
+
+def scripted_model(*answers):
+    model = MagicMock()
+    model.side_effect = [ChatMessage(role="assistant", content=answer) for answer in answers]
+    return model
+
+
+def test_staged_pipeline_runs_stages_in_order():
+    checker = scripted_model("APPROVED")
+    writer = scripted_model("# Draft")
+    editor = scripted_model("# Final")
+    research = MagicMock(return_value="Findings")
+    with patch.object(ai_agent, "new_research_agent", return_value=MagicMock(run=research)), \
+            patch.object(ai_agent.research_checker_agent, "model", checker), \
+            patch.object(ai_agent.writer_agent, "model", writer), \
+            patch.object(ai_agent.copy_editor_agent, "model", editor), \
+            patch.object(ai_agent.blog_manager, "run") as manager, \
+            patch.object(settings, "GENERATION_PIPELINE", "staged"):
+        assert ai_agent.write_blog_post("Chips") == "# Final"
+
+    assert research.call_count == 1
+    assert checker.call_count == writer.call_count == editor.call_count == 1
+    assert "Findings" in str(writer.call_args)
+    assert "# Draft" in str(editor.call_args)
+    manager.assert_not_called()
+
+
+def test_staged_pipeline_bounds_research_rounds():
+    checker = scripted_model("REJECTED\nNo sources.", "REJECTED\nStill no sources.")
+    writer = scripted_model("# Draft")
+    editor = scripted_model("# Final")
+    research = MagicMock(side_effect=["Round 1", "Round 2"])
+    with patch.object(ai_agent, "new_research_agent", return_value=MagicMock(run=research)), \
+            patch.object(ai_agent.research_checker_agent, "model", checker), \
+            patch.object(ai_agent.writer_agent, "model", writer), \
+            patch.object(ai_agent.copy_editor_agent, "model", editor):
+        assert ai_agent.run_staged_pipeline("Chips", max_research_rounds=2) == "# Final"
+
+    assert research.call_count == 2
+    assert "No sources." in research.call_args_list[1].args[0] # The feedback guides the second round
+    assert checker.call_count == 2
+    assert "Round 1" in str(writer.call_args) and "Round 2" in str(writer.call_args) # The writer proceeds with every round
+
+
+def test_interrupted_research_keeps_only_its_own_observations():
+    from app.core.deadline import DeadlineExceeded
+    both_running = threading.Barrier(2)
+
+    def run(agent, task):
+        topic = task.split(": ", 1)[1].split("\n", 1)[0]
+        agent.memory.steps.append(ActionStep(step_number=1, observations=f"Facts about {topic}"))
+        both_running.wait(5) # Both generations are researching at once
+        raise DeadlineExceeded("Research budget spent")
+
+    results = {}
+    with patch.object(ai_agent.DeadlineToolCallingAgent, "run", run):
+        threads = [threading.Thread(target=lambda topic=topic: results.update({topic: ai_agent.research(topic)})) for topic in ("Chips", "Batteries")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+    assert results["Chips"].findings == "Facts about Chips"
+    assert results["Batteries"].findings == "Facts about Batteries"
+    assert not results["Chips"].complete
+    assert not ai_agent.research_agent.memory.steps # The shared agent is not used by the staged pipeline
+
+def test_stage_models_fall_back_on_timeout():
+    built = []
+
+    def factory(model_id, **parameters):
+        model = MagicMock(model_id=model_id, last_input_token_count=10, last_output_token_count=5)
+        model.side_effect = TimeoutError() if model_id == "slow" else ValueError() if model_id == "broken" else None
+        model.return_value = ChatMessage(role="assistant", content=f"from {model_id}")
+        built.append((model_id, parameters))
+        return model
+
+    config = {"model": "slow", "max_tokens": 256, "temperature": 0.0, "fallback_model": "fast"}
+    model = build_model("checker", config, factory=factory)
+    assert model([{"role": "user", "content": "Check"}]).content == "from fast"
+    assert built[0] == ("slow", {"max_tokens": 256, "temperature": 0.0, "timeout": settings.LLM_TIMEOUT_SECONDS})
+    assert model.last_output_token_count == 5
+
+    broken = build_model("checker", dict(config, model="broken"), factory=factory)
+    with pytest.raises(ValueError): # Only timeouts fall back
+        broken([{"role": "user", "content": "Check"}])
+    assert not isinstance(build_model("writer", dict(config, fallback_model=""), factory=factory), FallbackModel)
+
+
+def test_deterministic_stages_reuse_cached_answers():
+    built = []
+
+    def factory(model_id, **parameters):
+        model = MagicMock(model_id=model_id, last_input_token_count=10, last_output_token_count=5)
+        model.side_effect = lambda messages, **kwargs: ChatMessage(role="assistant", content=f"answer {len(built)}")
+        built.append(model)
+        return model
+
+    prompt = [{"role": "user", "content": "Check"}]
+    llm_cache.clear()
+    checker = build_model("checker", {"model": "small", "max_tokens": 256, "temperature": 0.0}, factory=factory)
+    first = checker(prompt)
+    first.content = "modified by the caller"
+    assert checker(prompt).content == "answer 1" # Served from the cache, as a copy
+    assert checker.last_output_token_count == 5
+    assert built[0].call_count == 1
+    checker([{"role": "user", "content": "Check again"}])
+    checker(prompt, use_cache=False)
+    with bypass_llm_cache():
+        checker(prompt)
+    checker(prompt, temperature=0.5) # Sampling makes answers differ, never cached
+    assert built[0].call_count == 5
+
+    writer = build_model("writer", {"model": "small", "max_tokens": 4096, "temperature": 0.7}, factory=factory)
+    assert not isinstance(writer, CachingModel)
+    llm_cache.clear()
+
+
+def test_staged_pipeline_degrades_when_time_runs_short():
+    from benchmarks.offline_model import OfflineModel, use_offline_models
+    from app.core import deadline, metrics
+
+    def factory(role):
+        slow = {"latency": 0.2, "searches": 20} if role == "researcher" else {} # The researcher would need 21 calls, about 4s
+        return lambda model_id, **parameters: OfflineModel(role, model_id=model_id, chars_per_second=40000.0, **slow, **parameters)
+
+    models = {role: build_model(role, dict(config, fallback_model=""), factory=factory(role)) for role, config in settings.STAGE_MODELS.items()}
+    degraded = metrics.sample_value("blog_generation_degraded_total", stage="research")
+    with use_offline_models(models=models), bypass_llm_cache(), deadline.deadline(2.0):
+        post = ai_agent.run_staged_pipeline("Chips")
+        assert deadline.remaining() > 0 # Finished within the deadline
+
+    assert post.startswith("# Final post") # The writer and editor proceeded with partial research
+    researcher = models["researcher"].model # Inside the deadline wrapper, no cache at the default temperature
+    assert 3 <= researcher.calls < 10 # Research stopped at its share of the time
+    assert metrics.sample_value("blog_generation_degraded_total", stage="research") == degraded + 1
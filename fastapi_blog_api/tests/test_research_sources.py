@@ -0,0 +1,135 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+import httpx
+import pytest
+import requests
+from app.core import metrics
+from app.core.smoltools import jinaai
+from app.core.smoltools.duckduckgo import DedupDuckDuckGoSearchTool
+from app.core.smoltools.hedging import HedgeBudget, HedgedClient
+from app.core.smoltools.sources import canonicalize_url, research_sources
+
+ARTICLE = " ".join(f"The new chip runs benchmark {n} about twenty percent faster than its predecessor." for n in range(40))
+
+
+def test_url_variants_share_a_canonical_url():
+    canonical = canonicalize_url("https://example.com/news/chip?id=7")
+    assert canonical == "https://example.com/news/chip?id=7"
+    for variant in (
+        "http://www.example.com/news/chip/?utm_source=feed&id=7#comments",
+        "https://m.example.com/news/chip?fbclid=abc&id=7",
+        "https://example.com/news/chip/amp?id=7",
+        "https://www-example-com.cdn.ampproject.org/c/s/www.example.com/news/chip?id=7",
+        "https://duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.com%2Fnews%2Fchip%3Fid%3D7%26gclid%3Dx",
+    ):
+        assert canonicalize_url(variant) == canonical, variant
+    assert canonicalize_url("https://example.com/news/chip?id=8") != canonical
+    assert canonicalize_url("https://example.com:8080/news/chip?id=7") != canonical
+    for url, other in ( # Parameters and segments with a meaning of their own keep pages apart
+        ("https://example.com/search?q=chip&source=web", "https://example.com/search?q=chip&source=news"),
+        ("https://example.com/report?output=pdf", "https://example.com/report?output=html"),
+        ("https://example.com/compare?ref=main", "https://example.com/compare?ref=v2"),
+        ("https://example.com/amp/guide", "https://example.com/guide"),
+    ):
+        assert canonicalize_url(url) != canonicalize_url(other), url
+    assert canonicalize_url("https://example.com/amp/guide/amp") == "https://example.com/amp/guide"
+
+
+def test_sources_are_deduplicated_across_search_tools():
+    jina = (
+        f"[1] Title: Chip launch\n[1] URL Source: https://example.com/chip\n[1] Markdown Content:\n{ARTICLE}\n\n"
+        f"[2] Title: Chip launch (mirror)\n[2] URL Source: https://mirror.example.org/chip\n[2] Markdown Content:\n{ARTICLE} Share this.\n\n"
+        "[3] Title: Review\n[3] URL Source: https://reviews.example.net/chip\n[3] Description: A review.\n"
+    )
+    ddgs = MagicMock()
+    ddgs.text.return_value = [
+        {"title": "Chip launch", "href": "https://www.example.com/chip?utm_medium=social", "body": "Snippet"},
+        {"title": "Review", "href": "http://reviews.example.net/chip/", "body": "Snippet"},
+        {"title": "Analysis", "href": "https://analysis.example.com/chip", "body": "Snippet"},
+    ]
+    tool = DedupDuckDuckGoSearchTool()
+    tool.ddgs = ddgs
+    before = {kind: metrics.sample_value("blog_research_duplicates_total", kind=kind) for kind in ("search_result", "scrape", "near_duplicate")}
+
+    with patch.object(jinaai.requests, "get", return_value=MagicMock(text=jina)) as get, research_sources() as sources:
+        results = jinaai.search_facts_with_jina_ai("chip")
+        assert "example.com/chip" in results and "reviews.example.net" in results
+        assert "mirror.example.org" not in results # Same content under another URL
+
+        web = tool.forward("chip")
+        assert "analysis.example.com" in web and "Chip launch" not in web and "Review" not in web
+
+        get.return_value = MagicMock(text=f"Title: Chip launch\n\n{ARTICLE}")
+        assert "already retrieved" in jinaai.scrape_page_with_jina_ai("http://example.com/chip/") # Returned with the search results
+        get.return_value = MagicMock(text="Title: Review\n\nA thorough review of the chip, with new measurements.")
+        assert "thorough review" in jinaai.scrape_page_with_jina_ai("https://reviews.example.net/chip")
+        assert "already retrieved" in jinaai.scrape_page_with_jina_ai("https://reviews.example.net/chip?utm_campaign=x")
+        assert get.call_count == 2 # One search, one scrape
+
+    assert sources.summary() == {"sources": 4, "duplicate_results": 2, "scrapes_avoided": 2, "near_duplicates": 1}
+    after = {kind: metrics.sample_value("blog_research_duplicates_total", kind=kind) for kind in before}
+    assert after == {"search_result": before["search_result"] + 2, "scrape": before["scrape"] + 2, "near_duplicate": before["near_duplicate"] + 1}
+
+    with patch.object(jinaai.requests, "get", return_value=MagicMock(text=jina)): # Outside a generation nothing is dropped
+        assert "mirror.example.org" in jinaai.search_facts_with_jina_ai("chip")
+
+
+def test_slow_requests_are_hedged_within_the_budget():
+    received = []
+    cancelled = []
+
+    async def handler(request):
+        received.append(request)
+        try:
+            if len(received) % 2: # Every first attempt is stuck
+                await asyncio.sleep(0.5)
+        except asyncio.CancelledError:
+            cancelled.append(request)
+            raise
+        return httpx.Response(200, text=f"answer {len(received)}")
+
+    client = HedgedClient("scrape", budget_ratio=0.1, initial_delay=0.05, transport=httpx.MockTransport(handler))
+    client.budget = HedgeBudget(0.1, capacity=2)
+    before = {outcome: metrics.sample_value("blog_research_hedges_total", endpoint="scrape", outcome=outcome) for outcome in ("sent", "won", "denied")}
+    try:
+        start = time.perf_counter()
+        assert client.get("https://r.jina.ai/a").text == "answer 2" # The backup wins
+        assert client.get("https://r.jina.ai/b").text == "answer 4"
+        assert time.perf_counter() - start < 0.5
+        assert len(cancelled) == 2 # The stuck attempts were cancelled
+        assert client.get("https://r.jina.ai/c").text == "answer 5" # Budget spent, the slow attempt is awaited
+        assert len(received) == 5
+    finally:
+        client.stop()
+    after = {outcome: metrics.sample_value("blog_research_hedges_total", endpoint="scrape", outcome=outcome) for outcome in before}
+    assert after == {"sent": before["sent"] + 2, "won": before["won"] + 2, "denied": before["denied"] + 1}
+
+
+def test_hedged_requests_end_within_the_timeout():
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request.extensions["timeout"]["read"])
+        await asyncio.sleep(1)
+        return httpx.Response(200, text="late")
+
+    client = HedgedClient("scrape", initial_delay=0.1, transport=httpx.MockTransport(handler))
+    try:
+        start = time.perf_counter()
+        with pytest.raises(httpx.TimeoutException):
+            client.get("https://r.jina.ai/a", timeout=0.3)
+        assert time.perf_counter() - start < 0.6 # Not hedge delay + timeout, nor the 1s answer
+        assert attempts[0] == 0.3 and attempts[1] < 0.25 # The backup only gets the time left
+    finally:
+        client.stop()
+
+
+def test_failed_scrapes_can_be_retried():
+    page = MagicMock(text=f"Title: Chip launch\n\n{ARTICLE}")
+    with patch.object(jinaai.requests, "get", side_effect=[requests.Timeout("slow"), page]) as get, research_sources():
+        with pytest.raises(requests.Timeout):
+            jinaai.scrape_page_with_jina_ai("https://example.com/chip")
+        assert "new chip" in jinaai.scrape_page_with_jina_ai("https://example.com/chip") # Fetched again, not "already retrieved"
+        assert "already retrieved" in jinaai.scrape_page_with_jina_ai("https://example.com/chip")
+        assert get.call_count == 2
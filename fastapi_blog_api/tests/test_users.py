@@ -7,6 +7,7 @@ from app.database import Base, engine
 from sqlalchemy.orm import Session
 from app.core.security import get_password_hash
 from app.models import User
+from .helpers import assert_max_queries
 
 
 @pytest.fixture(scope="module")
@@ -62,4 +63,47 @@ def test_login_invalid_credentials(test_app):
     user_data = {"username": "nonexistent", "password": "wrongpassword"}
     response = test_app.post("/api/v1/users/login", json=user_data)
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
-    assert "Invalid credentials" in response.json()["detail"]
\ No newline at end of file
+    assert "Invalid credentials" in response.json()["detail"]
+
+def test_refresh_token_issues_new_access_token(test_app):
+    user_data = {"username": "refreshuser", "password": "testpassword"}
+    test_app.post("/api/v1/users/register", json=user_data)
+    tokens = test_app.post("/api/v1/users/login", json=user_data).json()
+    assert tokens["refresh_token"]
+
+    # A refresh token cannot authenticate API requests
+    response = test_app.get("/api/v1/blogs", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = test_app.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    response = test_app.get("/api/v1/blogs", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+    assert response.status_code == status.HTTP_200_OK
+
+    # An access token cannot be used as a refresh token
+    response = test_app.post("/api/v1/users/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert "Invalid refresh token" in response.json()["detail"]
+
+
+def test_login_rehashes_password_with_outdated_work_factor(test_app, db_session):
+    from passlib.hash import bcrypt
+    db_session.add(User(username="rehashuser", hashed_password=bcrypt.using(rounds=4).hash("testpassword")))
+    db_session.commit()
+
+    response = test_app.post("/api/v1/users/login", json={"username": "rehashuser", "password": "testpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    db_session.expire_all()
+    db_user = db_session.query(User).filter(User.username == "rehashuser").first()
+    assert not db_user.hashed_password.startswith("$2b$04$")
+    assert test_app.post("/api/v1/users/login", json={"username": "rehashuser", "password": "testpassword"}).status_code == status.HTTP_200_OK
+
+
+def test_user_endpoints_query_bounds(test_app):
+    credentials = {"username": "query_bound_user", "password": "testpassword"}
+    with assert_max_queries(3): # Existence check, insert, refresh
+        test_app.post("/api/v1/users/register", json=credentials)
+    with assert_max_queries(1): # User lookup
+        tokens = test_app.post("/api/v1/users/login", json=credentials).json()
+    with assert_max_queries(1): # User existence check
+        test_app.post("/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]})
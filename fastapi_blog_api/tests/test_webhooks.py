@@ -0,0 +1,212 @@
+import asyncio
+import http.server
+import json
+import socket
+import threading
+import time
+import uuid
+from unittest.mock import patch
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from fastapi_blog_api.main import app
+from app.database import Base, engine
+from app.core import webhooks
+from app.core.webhooks import WebhookDelivery, WebhookDispatcher, verify_signature
+
+
+@pytest.fixture(scope="module")
+def test_app():
+    Base.metadata.create_all(bind=engine)
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+
+
+def recording_transport(statuses, delay=0.0):
+    """Returns a mock transport answering with the given statuses in turn, and the list of requests it received."""
+    received = []
+
+    async def handler(request):
+        received.append(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(statuses[min(len(received), len(statuses)) - 1])
+    return httpx.MockTransport(handler), received
+
+
+def resolving(hosts):
+    """Patches getaddrinfo so that the given host names resolve to the given addresses, other names resolve as usual."""
+    getaddrinfo = socket.getaddrinfo
+
+    def fake(host, port, *args, **kwargs):
+        if host in hosts:
+            family = socket.AF_INET6 if ":" in hosts[host] else socket.AF_INET
+            return [(family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (hosts[host], port))]
+        return getaddrinfo(host, port, *args, **kwargs)
+    return patch.object(socket, "getaddrinfo", fake)
+
+
+def test_dispatcher_retries_with_the_same_delivery_id():
+    transport, received = recording_transport([503, 500, 200])
+    dispatcher = WebhookDispatcher(max_attempts=5, backoff=0.01, backoff_max=0.02, transport=transport)
+    dispatcher.enqueue(WebhookDelivery("http://client.test/hook", "secret", "blog_post.completed", b'{"a": 1}'))
+    dispatcher.stop(timeout=5)
+
+    assert len(received) == 3
+    assert len({request.headers[webhooks.DELIVERY_HEADER] for request in received}) == 1
+    for request in received:
+        assert request.headers[webhooks.EVENT_HEADER] == "blog_post.completed"
+        assert verify_signature("secret", request.content, request.headers[webhooks.SIGNATURE_HEADER])
+    assert not verify_signature("other", received[-1].content, received[-1].headers[webhooks.SIGNATURE_HEADER])
+
+
+def test_dispatcher_gives_up():
+    transport, received = recording_transport([400])
+    dispatcher = WebhookDispatcher(max_attempts=5, backoff=0.01, transport=transport)
+    dispatcher.enqueue(WebhookDelivery("http://client.test/hook", "secret", "blog_post.failed", b"{}"))
+    dispatcher.stop(timeout=5)
+    assert len(received) == 1 # Client errors are final
+
+    transport, received = recording_transport([500])
+    dispatcher = WebhookDispatcher(max_attempts=3, backoff=0.01, transport=transport)
+    dispatcher.enqueue(WebhookDelivery("http://client.test/hook", "secret", "blog_post.failed", b"{}"))
+    dispatcher.stop(timeout=5)
+    assert len(received) == 3
+
+
+def test_enqueue_does_not_wait_for_the_receiver():
+    transport, received = recording_transport([200], delay=0.5)
+    dispatcher = WebhookDispatcher(transport=transport)
+    dispatcher.enqueue(WebhookDelivery("http://client.test/hook", "secret", "blog_post.completed", b"{}")) # Starts the thread
+    start = time.perf_counter()
+    for _ in range(20):
+        dispatcher.enqueue(WebhookDelivery("http://client.test/hook", "secret", "blog_post.completed", b"{}"))
+    assert time.perf_counter() - start < 0.1
+    dispatcher.stop(timeout=10)
+    assert len(received) == 21
+
+
+@patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post")
+def test_generation_sends_signed_webhooks(mock_write_blog_post, test_app):
+    mock_write_blog_post.return_value = "Generated."
+    transport, received = recording_transport([200])
+    dispatcher = WebhookDispatcher(transport=transport)
+    credentials = {"username": f"hook_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+    test_app.post("/api/v1/users/register", json=credentials)
+    token = test_app.post("/api/v1/users/login", json=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with resolving({"client.test": "93.184.216.34"}):
+        response = test_app.put("/api/v1/users/me/webhook", json={"url": "http://client.test/default"}, headers=headers)
+    assert response.status_code == 200
+    secret = response.json()["secret"]
+    assert test_app.get("/api/v1/users/me/webhook", headers=headers).json() == {"url": "http://client.test/default", "secret": secret}
+
+    with patch.object(webhooks, "dispatcher", dispatcher), resolving({"client.test": "93.184.216.34"}):
+        default_id = test_app.post("/api/v1/blogs", json={"title": "Default hook"}, headers=headers).json()["id"]
+        own_id = test_app.post("/api/v1/blogs", json={"title": "Own hook", "callback_url": "http://client.test/own"}, headers=headers).json()["id"]
+    dispatcher.stop(timeout=5)
+
+    deliveries = {str(request.url): request for request in received}
+    assert set(deliveries) == {"http://client.test/default", "http://client.test/own"}
+    for url, blog_id in (("http://client.test/default", default_id), ("http://client.test/own", own_id)):
+        request = deliveries[url]
+        assert verify_signature(secret, request.content, request.headers[webhooks.SIGNATURE_HEADER])
+        payload = json.loads(request.content)
+        assert payload["event"] == "blog_post.completed"
+        assert payload["blog_post"]["id"] == blog_id
+        assert payload["blog_post"]["status"] == "completed"
+
+    rotated = test_app.put("/api/v1/users/me/webhook", json={"url": None, "rotate_secret": True}, headers=headers).json()
+    assert rotated["url"] is None
+    assert rotated["secret"] != secret
+
+
+@pytest.mark.parametrize("url", [
+    "http://localhost/hook",
+    "http://127.0.0.1:8000/hook",
+    "http://10.0.0.1/hook",
+    "http://192.168.1.10/hook",
+    "http://100.64.0.1/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://0.0.0.0/hook",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://[fe80::1]/hook",
+    "http://224.0.0.1/hook",
+    "http://internal.test/hook", # A public-looking name pointing at the internal network
+    "http://unresolvable.invalid/hook",
+    "ftp://93.184.216.34/hook",
+])
+def test_webhook_urls_on_private_networks_are_rejected(url):
+    with resolving({"internal.test": "10.1.2.3"}), pytest.raises(webhooks.UnsafeWebhookURL):
+        webhooks.check_webhook_url(url)
+
+
+def test_public_webhook_urls_are_accepted():
+    with resolving({"hooks.test": "93.184.216.34", "hooks6.test": "2606:2800:220:1::1"}):
+        webhooks.check_webhook_url("https://hooks.test/blog")
+        webhooks.check_webhook_url("http://hooks6.test:8080/blog")
+
+
+def test_api_rejects_private_webhook_urls(test_app):
+    credentials = {"username": f"ssrf_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+    test_app.post("/api/v1/users/register", json=credentials)
+    token = test_app.post("/api/v1/users/login", json=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = test_app.put("/api/v1/users/me/webhook", json={"url": "http://169.254.169.254/latest/meta-data/"}, headers=headers)
+    assert response.status_code == 400
+    assert test_app.get("/api/v1/users/me/webhook", headers=headers).json()["url"] is None
+
+    with patch("app.api.v1.endpoints.blogs.ai_agent.write_blog_post") as mock_write_blog_post:
+        response = test_app.post("/api/v1/blogs", json={"title": "Internal hook", "callback_url": "http://127.0.0.1:8000/admin"}, headers=headers)
+    assert response.status_code == 400
+    mock_write_blog_post.assert_not_called()
+    assert all(post["title"] != "Internal hook" for post in test_app.get("/api/v1/blogs", headers=headers).json())
+
+
+def test_dispatcher_checks_the_address_it_connects_to():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    server.settimeout(0.5)
+    port = server.getsockname()[1]
+    dispatcher = WebhookDispatcher(max_attempts=3, backoff=0.01)
+    delivery = WebhookDelivery(f"http://rebind.test:{port}/hook", "secret", "blog_post.completed", b"{}")
+    with resolving({"rebind.test": "127.0.0.1"}): # Public when registered, loopback when sent
+        dispatcher.enqueue(delivery)
+        dispatcher.stop(timeout=5)
+
+    assert delivery.attempts == 1 # Refused for good, not retried
+    with pytest.raises(socket.timeout): # Nothing connected to the local server
+        server.accept()
+    server.close()
+
+
+def test_public_transport_delivers_and_maps_errors():
+    received = []
+
+    class Receiver(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(self.rfile.read(int(self.headers["Content-Length"])))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+    server = http.server.HTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def send(url):
+        async with httpx.AsyncClient(transport=webhooks.PublicTransport(httpx.Limits()), timeout=2) as client:
+            return await client.post(url, content=b'{"a": 1}')
+
+    with patch.object(webhooks, "is_public_address", lambda address: True): # Let the local receiver through
+        response = asyncio.run(send(f"http://localhost:{server.server_port}/hook"))
+        assert response.status_code == 204
+        assert received == [b'{"a": 1}']
+        server.shutdown()
+        server.server_close()
+        with pytest.raises(httpx.ConnectError): # Raised as httpx errors, retried by the dispatcher
+            asyncio.run(send(f"http://localhost:{server.server_port}/hook"))